@@ -0,0 +1,194 @@
+"""
+Offline replay benchmark for the Instamart JSON-LD mapping: no browser, no network.
+
+In a live run JSON_LD_PRODUCTS_JS collects the ItemList products in the page and
+InstamartScraper._products_from_json_ld maps them to ProductItems. Here json_ld_items()
+(a Python copy of the in-page script) turns recorded pages into the same payload, and the
+Python side (parse_payload + _products_from_json_ld) is timed on:
+  - saved category pages in benchmarks/fixtures/*.html, e.g.
+        open("benchmarks/fixtures/fresh_vegetables.html", "w").write(await page.content())
+  - a synthetic category page (--products N) so the suite also runs on a fresh checkout.
+
+Per page it reports throughput (products/s over the median of --repeat runs), peak traced
+memory, and the blocks/KB allocated by one run that are still alive when it returns (tracemalloc).
+Results go to --out as JSON, tagged with the git commit; --compare prints the change against
+an earlier results file.
+
+Usage:
+    python benchmarks/bench_extractors.py [--products 2000] [--repeat 5] [--out results.json] [--compare old.json]
+"""
+import argparse
+import gc
+import glob
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scrapers.instamart import InstamartScraper
+from scrapers.extractors import ExtractionStats, parse_payload
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LD_JSON_SCRIPT = re.compile(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.DOTALL)
+CATEGORY_URL = "https://www.swiggy.com/instamart/category-listing?categoryName=Fresh%20Vegetables&custom_back=true"
+SCRAPER = InstamartScraper(headless=True)  # Never started: only its mapping method is used
+STATS = ExtractionStats()  # Keeps the benchmark out of the run-wide counters
+
+
+def synthetic_page(n_products: int) -> str:
+    """Category page with one schema.org ItemList of `n_products` products, plus unrelated JSON-LD."""
+    products = [{
+        "@type": "Product", "name": f"Product {i} {250 * (1 + i % 4)} g", "sku": str(500000 + i),
+        "image": [f"https://media.example.com/{500000 + i}.jpg"], "brand": {"@type": "Brand", "name": f"Brand{i % 40}"},
+        "offers": {"@type": "Offer", "price": str(20 + i % 400), "priceCurrency": "INR",
+                   "availability": "https://schema.org/InStock" if i % 6 else "https://schema.org/OutOfStock"},
+    } for i in range(n_products)]
+    blocks = [
+        {"@context": "https://schema.org", "@type": "Organization", "name": "Swiggy Instamart"},
+        {"@context": "https://schema.org", "@type": "BreadcrumbList", "itemListElement": []},
+        {"@context": "https://schema.org", "@type": "ItemList", "itemListElement": products},
+    ]
+    scripts = "".join(f'<script type="application/ld+json">{json.dumps(b)}</script>' for b in blocks)
+    markup = "".join(f"<div data-testid='item'><span>Product {i}</span></div>" for i in range(n_products))
+    return f"<html><head>{scripts}</head><body>{markup}</body></html>"
+
+
+def json_ld_items(html: str) -> str:
+    """Python copy of JSON_LD_PRODUCTS_JS: the JSON string the in-page script would return."""
+    out = []
+    for text in LD_JSON_SCRIPT.findall(html):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        if not isinstance(data, dict) or data.get("@type") != "ItemList" or not isinstance(data.get("itemListElement"), list):
+            continue
+        for item in data["itemListElement"]:
+            if not isinstance(item, dict) or item.get("@type") != "Product":
+                continue
+            offers = item.get("offers")
+            offer = (offers[0] if offers else {}) if isinstance(offers, list) else (offers or {})
+            image = item["image"][0] if isinstance(item.get("image"), list) and item["image"] else item.get("image")
+            brand = item.get("brand")
+            out.append({
+                "sku": item.get("sku") or None,
+                "name": item.get("name") or "Unknown",
+                "price": offer.get("price", 0),
+                "availability": offer.get("availability") or "Unknown",
+                "image": image or "N/A",
+                "brand": (brand.get("name") if isinstance(brand, dict) else None) or "Unknown",
+            })
+    return json.dumps(out)
+
+
+def load_payloads(n_products: int):
+    payloads = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            payloads[os.path.basename(path)] = json_ld_items(f.read())
+    payloads[f"synthetic_category_{n_products}"] = json_ld_items(synthetic_page(n_products))
+    return payloads
+
+
+def json_ld_mapping(raw: str):
+    return SCRAPER._products_from_json_ld(parse_payload(raw, STATS), CATEGORY_URL, "560001")
+
+
+EXTRACTORS = {"json_ld_mapping": json_ld_mapping}
+
+
+def measure(fn, payload, repeat: int) -> dict:
+    """Median/min wall time over `repeat` runs, then one more run under tracemalloc for memory."""
+    runs = []
+    products = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        products = len(fn(payload))
+        runs.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn(payload)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    del result
+
+    median = statistics.median(runs)
+    return {
+        "products": products,
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(min(runs) * 1000, 2),
+        "products_per_s": round(products / median) if median else None,
+        "peak_kb": round(peak / 1024, 1),
+        "alloc_blocks": sum(s.count_diff for s in diff),
+        "alloc_kb": round(sum(s.size_diff for s in diff) / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["payload"], r["extractor"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    for r in results:
+        b = old.get((r["payload"], r["extractor"]))
+        if not b or not b["products_per_s"] or not r["products_per_s"]:
+            continue
+        speed = (r["products_per_s"] / b["products_per_s"] - 1) * 100
+        print(f"  {r['payload']:<36} {r['extractor']:<16} {speed:+6.1f}% products/s, "
+              f"peak {b['peak_kb']:.0f} -> {r['peak_kb']:.0f} KB, blocks {b['alloc_blocks']} -> {r['alloc_blocks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Instamart JSON-LD mapping")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # scrapers.base configures INFO logging on import
+
+    results = []
+    for name, payload in load_payloads(args.products).items():
+        print(f"\n{name} ({len(payload.encode('utf-8')) / 1_000_000:.2f} MB)")
+        for extractor, fn in EXTRACTORS.items():
+            row = {"payload": name, "extractor": extractor, "bytes": len(payload.encode("utf-8")),
+                   **measure(fn, payload, args.repeat)}
+            results.append(row)
+            print(f"  {extractor:<16} {row['median_ms']:>9.2f} ms  {row['products']:>6} products  "
+                  f"{row['products_per_s'] or 0:>9,} products/s  peak {row['peak_kb']:>8.1f} KB  {row['alloc_blocks']:>6} blocks")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"suite": "instamart_extractors", "commit": git_commit(), "created_at": datetime.now().isoformat(),
+                       "python": platform.python_version(), "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,851 @@
+"""
+Local mock of the Blinkit, Zepto and Instamart storefronts, for load-testing the real scrapers
+and runners on one box without touching the live sites (stdlib only).
+
+Each storefront listens on its own port (--port for Blinkit, +1 for Zepto, +2 for Instamart),
+so every site keeps the paths its scraper already uses:
+  Blinkit    /                                   location bar + search modal, /cn/ links, __NEXT_DATA__ buildId
+             /cn/<slug>/cid/<cid>/<scid>         category page, products in __NEXT_DATA__
+             /_next/data/<buildId>/cn/....json   Next.js data route (404 once the buildId rotates)
+             /prn/<slug>/prid/<id>               product page
+  Zepto      /                                   "Select Location" modal, /cn/.../cid/<id>/scid/<id> links
+             /cn/...                             category page: inline __next_f chunks, client RSC fetch
+                                                 (the same URL with an `RSC: 1` header is the Flight stream)
+             /lms/api/v2/get_page                category API, pages of cardData, hasReachedEnd
+             /pn/<slug>/pvid/<id>                product page
+  Instamart  /instamart                          header location trigger + search modal, category links
+             /instamart/category-listing?...     schema.org ItemList in JSON-LD
+             /instamart/item/<id>                schema.org Product in JSON-LD
+
+Picking a location sets a cookie with the pincode. The pincode maps to a store (crc32 over
+--stores, or an explicit --store-map JSON of pincode -> store number), and prices and stock
+are seeded by (store, category), so repeated runs see the same catalogue. --latency-ms and
+--jitter-ms delay every page and data response; --page-kb pads them to at least that size;
+--block-rate answers that share of them like a WAF (403, 429 or a challenge header).
+--rotate-build-s changes Blinkit's buildId on that period. Request counters are printed on
+exit and served as JSON at /__stats.
+
+Usage:
+    python benchmarks/mock_storefront.py [--port 8765] [--sites blinkit,zepto,instamart]
+        [--categories 40] [--products 120] [--stores 20] [--store-map stores.json]
+        [--latency-ms 150] [--jitter-ms 100] [--page-kb 0] [--block-rate 0.0] [--rotate-build-s 0]
+
+then point a runner at it, e.g.
+    python run_blinkit_assortment_parallel.py --base-url http://localhost:8765 --no-human-delay --workers 32
+"""
+import argparse
+import functools
+import html
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+SITES = ["blinkit", "zepto", "instamart"]  # Port offsets from --port, in this order
+ZEPTO_PAGE_SIZE = 24  # Cards per category API page
+DEPARTMENTS = [
+    ("Vegetables & Fruits", ["Fresh Vegetables", "Fresh Fruits", "Exotics", "Herbs & Seasonings", "Cuts & Sprouts"]),
+    ("Dairy & Breakfast", ["Milk", "Bread & Pav", "Eggs", "Butter & Cheese", "Curd & Yogurt"]),
+    ("Munchies", ["Chips & Crisps", "Namkeen", "Popcorn", "Nachos", "Healthy Snacks"]),
+    ("Cold Drinks & Juices", ["Soft Drinks", "Fruit Juices", "Energy Drinks", "Soda & Mixers", "Water"]),
+    ("Instant & Frozen Food", ["Noodles", "Frozen Veg", "Ready to Eat", "Pasta", "Soups"]),
+    ("Tea, Coffee & Health Drinks", ["Tea", "Coffee", "Health Drinks", "Green Tea", "Milk Drinks"]),
+    ("Bakery & Biscuits", ["Cookies", "Cream Biscuits", "Rusk", "Cakes", "Glucose Biscuits"]),
+    ("Atta, Rice & Dal", ["Atta", "Rice", "Toor Dal", "Moong Dal", "Besan"]),
+    ("Masala, Oil & More", ["Cooking Oil", "Ghee", "Whole Spices", "Powdered Masala", "Salt & Sugar"]),
+    ("Cleaning Essentials", ["Detergents", "Dishwash", "Floor Cleaners", "Toilet Cleaners", "Fresheners"]),
+]
+BRANDS = ["Amul", "Tata", "Britannia", "Haldiram's", "Parle", "Nestle", "Aashirvaad", "Fortune", "Dabur",
+          "Mother Dairy", "Surf Excel", "Vim", "Lay's", "Kurkure", "Maggi", "Catch", "MDH", "Patanjali"]
+SIZES = ["200 g", "500 g", "1 kg", "250 ml", "500 ml", "1 l", "6 pcs", "12 pcs", "100 g", "2 x 500 g"]
+LOREM = ("fresh daily essentials delivered in minutes from your neighbourhood store with the best prices on "
+         "groceries fruits vegetables dairy snacks beverages and household needs ")
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+@functools.lru_cache(maxsize=64)
+def filler(n_bytes: int) -> str:
+    """Deterministic ASCII text of exactly `n_bytes` (page padding)."""
+    return (LOREM * (n_bytes // len(LOREM) + 1))[:n_bytes]
+
+
+def script_json(value) -> str:
+    """JSON for an inline <script>; '</' is escaped so a value can't close the tag."""
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
+class Catalogue:
+    """
+    Categories and products shared by the three storefronts.
+
+    Category i is sub-category i % 5 of parent listing i // 5; product j of a category is
+    the same item in every store, while its price and stock depend on (store, category).
+    """
+
+    def __init__(self, n_categories: int, n_products: int):
+        self.n_categories = n_categories
+        self.n_products = min(n_products, 999)  # Product ids reserve three digits per category
+
+    def category(self, i: int) -> dict:
+        round_no, slot = divmod(i // 5, len(DEPARTMENTS))
+        department, subs = DEPARTMENTS[slot]
+        suffix = f" {round_no + 1}" if round_no else ""
+        return {"index": i, "parent": i // 5, "name": f"{department}{suffix}", "sub": f"{subs[i % 5]}{suffix}"}
+
+    def categories(self) -> list:
+        return [self.category(i) for i in range(self.n_categories)]
+
+    def valid(self, i: int) -> bool:
+        return 0 <= i < self.n_categories
+
+    @functools.lru_cache(maxsize=8192)
+    def products(self, i: int, store: int) -> tuple:
+        category = self.category(i)
+        rng = random.Random(f"{store}:{i}")
+        items = []
+        for j in range(self.n_products):
+            mrp = 20 + (i * 37 + j * 13) % 480
+            discount = rng.choice((0, 0, 0, 5, 10, 15, 20))
+            items.append({
+                "index": j,
+                "name": f"{BRANDS[(i * 7 + j) % len(BRANDS)]} {category['sub']} {SIZES[j % len(SIZES)]}",
+                "brand": BRANDS[(i * 7 + j) % len(BRANDS)],
+                "size": SIZES[j % len(SIZES)],
+                "mrp": mrp,
+                "price": round(mrp * (100 - discount) / 100),
+                "inventory": 0 if rng.random() < 0.08 else rng.randint(1, 50),
+                "shelf_life_hours": (24, 72, 720, 4320)[j % 4],
+            })
+        return tuple(items)
+
+
+class StoreAssignment:
+    """Pincode -> store number: an explicit map where given, else crc32 over `n_stores`."""
+
+    def __init__(self, n_stores: int, mapping: dict = None):
+        self.n_stores = max(1, n_stores)
+        self.mapping = {str(k): int(v) for k, v in (mapping or {}).items()}
+
+    def store(self, pincode: str) -> int:
+        if pincode in self.mapping:
+            return self.mapping[pincode]
+        return zlib.crc32(pincode.encode()) % self.n_stores
+
+    @staticmethod
+    def eta(store: int) -> int:
+        return 6 + store % 15
+
+    @staticmethod
+    def coordinates(pincode: str) -> tuple:
+        n = int(pincode) if pincode.isdigit() else zlib.crc32(pincode.encode())
+        return round(12.8 + (n % 997) / 2000, 6), round(77.4 + (n % 991) / 2000, 6)
+
+
+class Stats:
+    """Request counters per (site, kind), thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.started = time.time()
+
+    def record(self, site: str, kind: str, status: int, size: int, blocked: bool):
+        with self.lock:
+            c = self.counts.setdefault(f"{site}/{kind}", {"requests": 0, "blocked": 0, "errors": 0, "mb": 0.0})
+            c["requests"] += 1
+            c["blocked"] += blocked
+            c["errors"] += status >= 400 and not blocked
+            c["mb"] += size / 1_000_000
+
+    def summary(self) -> dict:
+        with self.lock:
+            elapsed = time.time() - self.started
+            total = sum(c["requests"] for c in self.counts.values())
+            return {
+                "uptime_s": round(elapsed, 1),
+                "requests": total,
+                "requests_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+                "by_route": {k: {**c, "mb": round(c["mb"], 2)} for k, c in sorted(self.counts.items())},
+            }
+
+
+class MockStorefront:
+    """Renders the three storefronts; the HTTP handler only parses the request and writes the result."""
+
+    def __init__(self, catalogue: Catalogue, stores: StoreAssignment, latency_ms: float = 150.0,
+                 jitter_ms: float = 100.0, page_kb: float = 0.0, block_rate: float = 0.0, rotate_build_s: float = 0.0):
+        self.catalogue = catalogue
+        self.stores = stores
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.page_bytes = int(page_kb * 1024)
+        self.block_rate = block_rate
+        self.rotate_build_s = rotate_build_s
+        self.stats = Stats()
+
+    # --- Request plumbing ---
+
+    def handle(self, site: str, path: str, query: dict, headers) -> tuple:
+        """(status, content type, body bytes, extra headers) for one GET."""
+        if path == "/__stats":
+            return 200, "application/json", json.dumps(self.stats.summary(), indent=2).encode(), {}
+        if path.startswith("/static/"):
+            script = CLIENT_JS.get(path[len("/static/"):-len(".js")]) if path.endswith(".js") else None
+            if script is None:
+                return self._not_found(site, "static")
+            self.stats.record(site, "static", 200, len(script), False)
+            return 200, "application/javascript", script.encode(), {}
+
+        route = getattr(self, f"_route_{site}")(path, query, headers)
+        if route is None:
+            return self._not_found(site, "unknown")
+        kind, render = route
+        self._delay()
+        if kind in ("page", "data", "api", "rsc") and self.block_rate and random.random() < self.block_rate:
+            return self._blocked(site, kind)
+        status, content_type, body = render()
+        body = body.encode("utf-8")
+        self.stats.record(site, kind, status, len(body), False)
+        return status, content_type, body, {}
+
+    def _delay(self):
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _blocked(self, site: str, kind: str) -> tuple:
+        # The three shapes circuit_breaker.block_reason recognises
+        status, extra = random.choice([(403, {}), (429, {"Retry-After": "30"}), (403, {"cf-mitigated": "challenge"})])
+        body = b"<html><body><h1>Access Denied</h1></body></html>"
+        self.stats.record(site, kind, status, len(body), True)
+        return status, "text/html; charset=utf-8", body, extra
+
+    def _not_found(self, site: str, kind: str) -> tuple:
+        body = b"<html><body><h1>404</h1></body></html>"
+        self.stats.record(site, kind, 404, len(body), False)
+        return 404, "text/html; charset=utf-8", body, {}
+
+    def _location(self, headers) -> tuple:
+        """(pincode, store) from the location cookie; (None, 0) before a location is set."""
+        cookie = SimpleCookie()
+        try:
+            cookie.load(headers.get("Cookie", ""))
+        except Exception:
+            pass
+        pincode = cookie["mock_pincode"].value if "mock_pincode" in cookie else None
+        return pincode, self.stores.store(pincode) if pincode else 0
+
+    def _suggestions(self, query: dict) -> str:
+        q = query.get("q", [""])[0].strip()
+        if not (q.isdigit() and len(q) == 6):
+            return "[]"
+        store = self.stores.store(q)
+        lat, lng = self.stores.coordinates(q)
+        return json.dumps([
+            {"pincode": q, "label": f"{q}, {area}", "secondary": "Bengaluru, Karnataka", "store": store,
+             "eta": self.stores.eta(store), "lat": lat, "lng": lng}
+            for area in ("Main Road", "Market Area", "Railway Colony")
+        ])
+
+    def _pad_html(self, body: str) -> str:
+        missing = self.page_bytes - len(body)
+        if missing <= 0:
+            return body
+        return body.replace("</body>", f'<div hidden class="seo">{filler(missing)}</div></body>', 1)
+
+    def _pad_json(self, data: dict) -> str:
+        text = json.dumps(data, separators=(",", ":"))
+        missing = self.page_bytes - len(text)
+        if missing <= 0:
+            return text
+        data = dict(data, seo=filler(missing))
+        return json.dumps(data, separators=(",", ":"))
+
+    def _page(self, title: str, body: str, site: str, head: str = "") -> str:
+        return self._pad_html(
+            f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(title)}</title>{head}</head>'
+            f'<body>{body}<script src="/static/{site}.js"></script></body></html>'
+        )
+
+    # --- Blinkit ---
+
+    def build_id(self) -> str:
+        if self.rotate_build_s:
+            return f"mock-build-{int(time.time() // self.rotate_build_s)}"
+        return "mock-build-1"
+
+    @staticmethod
+    def _blinkit_pid(i: int, j: int) -> int:
+        return 100000 + i * 1000 + j
+
+    def _blinkit_record(self, i: int, p: dict, store: int) -> dict:
+        pid = self._blinkit_pid(i, p["index"])
+        merchant_id = 30000 + store
+        return {
+            "product_id": pid, "name": p["name"], "product_name": p["name"], "display_name": p["name"],
+            "brand": p["brand"], "price": p["price"], "mrp": p["mrp"], "inventory": p["inventory"],
+            "unavailable_quantity": 0 if p["inventory"] else 1, "unit": p["size"],
+            "group_id": 50000 + i * 1000 + p["index"] // 3, "merchant_id": merchant_id, "merchant_type": "express",
+            "merchant": {"id": merchant_id, "type": "express"}, "shelf_life_hours": p["shelf_life_hours"],
+            "image_url": f"/static/img/{pid}.jpg",
+        }
+
+    def _blinkit_category_url(self, category: dict, parent: bool = False) -> str:
+        if parent:
+            return f"/cn/{slugify(category['name'])}/cid/{1400 + category['parent']}"
+        return f"/cn/{slugify(category['sub'])}/cid/{1400 + category['parent']}/{5000 + category['index']}"
+
+    def _blinkit_listing(self, cid: int, scid) -> list:
+        """Category indexes behind a (cid, scid) listing; a parent listing holds all its sub-categories."""
+        parent = cid - 1400
+        if scid is not None:
+            i = int(scid) - 5000
+            return [i] if self.catalogue.valid(i) and i // 5 == parent else []
+        return [i for i in range(parent * 5, parent * 5 + 5) if self.catalogue.valid(i)]
+
+    def _blinkit_page_props(self, indexes: list, store: int) -> dict:
+        widgets = [{"widget_type": "product_card", "tracking": {"impression": f"imp-{i}-{p['index']}"},
+                    "data": self._blinkit_record(i, p, store)}
+                   for i in indexes for p in self.catalogue.products(i, store)]
+        return {"initialState": {
+            "ui": {"theme": "light", "banners": [{"id": b, "image": f"/static/img/banner-{b}.jpg"} for b in range(6)]},
+            "listing": {"sections": [{"id": s, "widgets": widgets[s::4]} for s in range(4)]},
+        }}
+
+    def _blinkit_next_data(self, page: str, page_props: dict) -> str:
+        data = {"props": {"pageProps": page_props}, "page": page, "buildId": self.build_id()}
+        return f'<script id="__NEXT_DATA__" type="application/json">{script_json(data)}</script>'
+
+    def _blinkit_header(self, pincode, store) -> str:
+        if pincode:
+            title = f"Delivery in {self.stores.eta(store)} minutes"
+            subtitle = f"{pincode}, Bengaluru"
+        else:
+            title, subtitle = "Select your location", "Set a delivery location to see products"
+        return (
+            '<header><div class="LocationBar__Container-sc-mock">'
+            f'<div class="LocationBar__Title-sc-mock">{html.escape(title)}</div>'
+            f'<div class="LocationBar__Subtitle-sc-mock">{html.escape(subtitle)}</div></div></header>'
+            '<div id="location-modal" style="display:none">'
+            '<input name="search" placeholder="search delivery location" autocomplete="off">'
+            '<div class="LocationSearchList__Container-sc-mock"></div></div>'
+        )
+
+    def _route_blinkit(self, path: str, query: dict, headers):
+        pincode, store = self._location(headers)
+        if path == "/":
+            def render():
+                links = []
+                for c in self.catalogue.categories():
+                    url = self._blinkit_category_url(c)
+                    links.append(f'<a href="{url}">{html.escape(c["sub"])}</a>')
+                    if c["index"] % 5 == 0:
+                        # Parent listings and repeated links, like the live homepage
+                        links.append(f'<a href="{self._blinkit_category_url(c, parent=True)}">{html.escape(c["name"])}</a>')
+                        links.append(f'<a href="{url}?source=banner">{html.escape(c["sub"])}</a>')
+                body = self._blinkit_header(pincode, store) + f'<nav>{"".join(links)}</nav>' + \
+                    self._blinkit_next_data("/", {"initialState": {"ui": {"theme": "light"}}})
+                return 200, "text/html; charset=utf-8", self._page("Blinkit", body, "blinkit")
+            return "page", render
+
+        m = re.fullmatch(r"/cn/[^/]+/cid/(\d+)(?:/(\d+))?/?", path)
+        if m:
+            indexes = self._blinkit_listing(int(m.group(1)), m.group(2))
+            if not indexes:
+                return None
+
+            def render():
+                c = self.catalogue.category(indexes[0])
+                body = self._blinkit_header(pincode, store) + f'<h1>{html.escape(c["sub"])}</h1>' + \
+                    self._blinkit_next_data("/cn/[slug]/cid/[l0]/[l1]", self._blinkit_page_props(indexes, store))
+                return 200, "text/html; charset=utf-8", self._page(c["sub"], body, "blinkit")
+            return "page", render
+
+        m = re.fullmatch(r"/_next/data/([^/]+)/cn/[^/]+/cid/(\d+)(?:/(\d+))?\.json", path)
+        if m:
+            if m.group(1) != self.build_id():
+                return None
+            indexes = self._blinkit_listing(int(m.group(2)), m.group(3))
+            if not indexes:
+                return None
+            return "data", lambda: (200, "application/json",
+                                    self._pad_json({"pageProps": self._blinkit_page_props(indexes, store), "__N_SSG": True}))
+
+        m = re.fullmatch(r"/prn/[^/]+/prid/(\d+)/?", path)
+        if m:
+            i, j = divmod(int(m.group(1)) - 100000, 1000)
+            if not self.catalogue.valid(i) or j >= self.catalogue.n_products:
+                return None
+
+            def render():
+                p = self.catalogue.products(i, store)[j]
+                body = (
+                    self._blinkit_header(pincode, store) + f'<h1>{html.escape(p["name"])}</h1>'
+                    f'<div class="ProductDetails"><p>Manufacturer Details<br>{html.escape(p["brand"])} Foods Pvt Ltd, Bengaluru</p>'
+                    f'<p>Marketed By<br>{html.escape(p["brand"])} Marketing Ltd</p>'
+                    f'<p>Sold By<br>Mock Retail Store {store}</p></div>'
+                    + self._blinkit_next_data("/prn/[slug]/prid/[id]", {"product": self._blinkit_record(i, p, store)})
+                )
+                return 200, "text/html; charset=utf-8", self._page(p["name"], body, "blinkit")
+            return "page", render
+
+        if path == "/mapi/location/search":
+            return "location", lambda: (200, "application/json", self._suggestions(query))
+        return None
+
+    # --- Zepto ---
+
+    @staticmethod
+    def _zepto_ids(i: int, j: int) -> tuple:
+        """(card id, variant id) of product j in category i; both decode back to (i, j)."""
+        return f"{i:08x}-{j:04x}-4000-8000-00000000c0de", f"{i:08x}-{j:04x}-4000-9000-00000000c0de"
+
+    @staticmethod
+    def _zepto_store(store: int) -> str:
+        return f"5702e000-0000-4000-8000-{store:012x}"
+
+    def _zepto_category_url(self, category: dict) -> str:
+        cid = f"{category['parent']:08x}-0000-4000-a000-00000000c1d0"
+        scid = f"{category['index']:08x}-0000-4000-b000-00000000c1d0"
+        return f"/cn/{slugify(category['name'])}/{slugify(category['sub'])}/cid/{cid}/scid/{scid}"
+
+    def _zepto_card(self, i: int, p: dict, store: int) -> dict:
+        card_id, variant_id = self._zepto_ids(i, p["index"])
+        slug = slugify(p["name"])
+        return {
+            "id": card_id,
+            "product": {"name": p["name"], "brand": p["brand"], "slug": slug},
+            "productVariant": {"id": variant_id, "slug": slug, "mrp": p["mrp"] * 100,
+                               "formattedPacksize": p["size"], "shelfLifeInHours": str(p["shelf_life_hours"])},
+            "sellingPrice": p["price"] * 100,
+            "discountedSellingPrice": p["price"] * 100,
+            "mrp": p["mrp"] * 100,
+            "availableQuantity": p["inventory"],
+            "storeId": self._zepto_store(store),
+        }
+
+    def _zepto_flight(self, cards: list, pad: bool = True) -> str:
+        """Flight rows for a product grid; every fifth card points at a product row instead of inlining it."""
+        dumps = lambda v: json.dumps(v, separators=(",", ":"))
+        rows = ['0:["$","$L1",null,{"children":"$2"}]', '1:I["4512",["static/chunks/4512.js"],"ProductGrid"]']
+        next_id = 3
+        items = []
+        for n, card in enumerate(cards):
+            if n % 5 == 0:
+                rows.append(f"{next_id:x}:" + dumps(card["product"]))
+                card = dict(card, product=f"${next_id:x}")
+                next_id += 1
+            items.append({"cardData": card})
+        rows.append(f"2:" + dumps(["$", "div", None, {"items": items}]))
+        text = "\n".join(rows) + "\n"
+        missing = self.page_bytes - len(text) if pad else 0
+        if missing > 0:
+            seo = filler(missing)
+            text += f"{next_id:x}:T{len(seo):x},{seo}"
+        return text
+
+    def _zepto_inline_flight(self, flight: str) -> str:
+        """The stream as SSR pages embed it: self.__next_f.push chunks of ~8 KB."""
+        scripts = ["<script>(self.__next_f=self.__next_f||[]).push([0])</script>"]
+        for start in range(0, len(flight), 8192):
+            scripts.append(f"<script>self.__next_f.push([1,{script_json(flight[start:start + 8192])}])</script>")
+        return "".join(scripts)
+
+    def _zepto_header(self, pincode, store) -> str:
+        located = ""
+        if pincode:
+            lat, lng = self.stores.coordinates(pincode)
+            state = {"storeId": self._zepto_store(store), "latitude": lat, "longitude": lng}
+            located = (f'<div data-testid="eta-container">{self.stores.eta(store)} mins</div>'
+                       f'<script id="store-state" type="application/json">{script_json(state)}</script>')
+        return (
+            f'<header><button aria-label="Select Location">Select Location</button>{located}</header>'
+            '<div id="location-modal" style="display:none">'
+            '<input type="text" placeholder="Search a new address" autocomplete="off">'
+            '<div id="address-results"></div></div>'
+        )
+
+    def _zepto_category(self, path: str):
+        m = re.fullmatch(r"/cn/[^/]+/[^/]+/cid/([^/]+)/scid/([^/]+)/?", path)
+        if not m:
+            return None
+        try:
+            i = int(m.group(2).split("-")[0], 16)
+        except ValueError:
+            return None
+        if not self.catalogue.valid(i) or self._zepto_category_url(self.catalogue.category(i)) != path.rstrip("/"):
+            return None
+        return i
+
+    def _route_zepto(self, path: str, query: dict, headers):
+        pincode, store = self._location(headers)
+        if path == "/":
+            def render():
+                links = "".join(f'<a href="{self._zepto_category_url(c)}">{html.escape(c["sub"])}</a>'
+                                for c in self.catalogue.categories())
+                body = self._zepto_header(pincode, store) + f"<nav>{links}</nav>"
+                return 200, "text/html; charset=utf-8", self._page("Zepto", body, "zepto")
+            return "page", render
+
+        i = self._zepto_category(path)
+        if i is not None:
+            cards = lambda: [self._zepto_card(i, p, store) for p in self.catalogue.products(i, store)]
+            if headers.get("RSC") == "1":
+                return "rsc", lambda: (200, "text/x-component", self._zepto_flight(cards()))
+
+            def render():
+                c = self.catalogue.category(i)
+                # SSR carries the first grid page; the client then fetches the full RSC payload
+                body = self._zepto_header(pincode, store) + f'<h1>{html.escape(c["sub"])}</h1>' + \
+                    self._zepto_inline_flight(self._zepto_flight(cards()[:ZEPTO_PAGE_SIZE], pad=False))
+                return 200, "text/html; charset=utf-8", self._page(c["sub"], body, "zepto")
+            return "page", render
+
+        if path == "/lms/api/v2/get_page":
+            store_id = headers.get("storeid") or headers.get("store_id")
+            if store_id:
+                try:
+                    store = int(store_id.split(",")[0].rsplit("-", 1)[1], 16)
+                except (IndexError, ValueError):
+                    pass
+
+            def render():
+                scid = query.get("scid", [""])[0]
+                page_no = int(query.get("page_number", ["0"])[0] or 0)
+                try:
+                    i = int(scid.split("-")[0], 16)
+                except ValueError:
+                    i = -1
+                if query.get("page_type", [""])[0] != "SUBCATEGORY" or not self.catalogue.valid(i):
+                    return 200, "application/json", self._pad_json({"layout": [], "hasReachedEnd": True})
+                products = self.catalogue.products(i, store)
+                page = products[page_no * ZEPTO_PAGE_SIZE:(page_no + 1) * ZEPTO_PAGE_SIZE]
+                items = [{"cardData": self._zepto_card(i, p, store)} for p in page]
+                return 200, "application/json", self._pad_json({
+                    "layout": [{"widgetId": "PRODUCT_GRID", "data": {"resolver": {"data": {"items": items}}}}],
+                    "hasReachedEnd": (page_no + 1) * ZEPTO_PAGE_SIZE >= len(products),
+                    "storeId": self._zepto_store(store),
+                })
+            return "api", render
+
+        m = re.fullmatch(r"/pn/[^/]+/pvid/([^/]+)/?", path)
+        if m:
+            try:
+                i, j = (int(x, 16) for x in m.group(1).split("-")[:2])
+            except ValueError:
+                return None
+            if not self.catalogue.valid(i) or j >= self.catalogue.n_products:
+                return None
+
+            def render():
+                p = self.catalogue.products(i, store)[j]
+                stock = '<p>Out of Stock</p>' if not p["inventory"] else '<button aria-label="Add to cart">Add</button>'
+                body = (
+                    self._zepto_header(pincode, store) + f'<h1>{html.escape(p["name"])}</h1>'
+                    f'<span data-testid="product-price">₹{p["price"]}</span>'
+                    f'<span data-testid="product-mrp">₹{p["mrp"]}</span>'
+                    f'<span data-testid="product-quantity">{p["size"]}</span>{stock}'
+                    + self._zepto_inline_flight(self._zepto_flight([self._zepto_card(i, p, store)], pad=False))
+                )
+                return 200, "text/html; charset=utf-8", self._page(p["name"], body, "zepto")
+            return "page", render
+
+        if path == "/api/v1/maps/autocomplete":
+            return "location", lambda: (200, "application/json", self._suggestions(query))
+        return None
+
+    # --- Instamart ---
+
+    def _instamart_category_url(self, category: dict) -> str:
+        return (f"/instamart/category-listing?categoryName={quote(category['name'])}&custom_back=true"
+                f"&taxonomyType=CategoryListing&taxonomyId={1400 + category['parent']}"
+                f"&filterId={9000 + category['index']}&filterName={quote(category['sub'])}")
+
+    def _instamart_header(self, pincode, store) -> str:
+        text = f"Delivery in {self.stores.eta(store)} MINS · {pincode}" if pincode else "Setup your location"
+        eta = f'<div data-testid="header-delivery-eta">Delivery in {self.stores.eta(store)} mins</div>' if pincode else ""
+        return (
+            f'<header><div data-testid="header-location-container"><span>{html.escape(text)}</span></div>{eta}</header>'
+            '<div id="location-modal" style="display:none">'
+            '<input data-testid="search-input" placeholder="Search for area, street name..." autocomplete="off">'
+            '<div id="location-results"></div></div>'
+        )
+
+    def _route_instamart(self, path: str, query: dict, headers):
+        pincode, store = self._location(headers)
+        if path in ("/instamart", "/instamart/"):
+            def render():
+                links = "".join(f'<a href="{html.escape(self._instamart_category_url(c))}">{html.escape(c["sub"])}</a>'
+                                for c in self.catalogue.categories())
+                body = self._instamart_header(pincode, store) + f"<nav>{links}</nav>"
+                return 200, "text/html; charset=utf-8", self._page("Instamart", body, "instamart")
+            return "page", render
+
+        if path == "/instamart/category-listing":
+            try:
+                i = int(query.get("filterId", ["-1"])[0]) - 9000
+            except ValueError:
+                return None
+            if not self.catalogue.valid(i):
+                return None
+
+            def render():
+                c = self.catalogue.category(i)
+                items = [{
+                    "@type": "Product", "sku": str(700000 + i * 1000 + p["index"]), "name": p["name"],
+                    "image": [f"/static/img/{700000 + i * 1000 + p['index']}.jpg"],
+                    "brand": {"@type": "Brand", "name": p["brand"]},
+                    "offers": {"@type": "Offer", "price": str(p["price"]), "priceCurrency": "INR",
+                               "availability": "https://schema.org/" + ("InStock" if p["inventory"] else "OutOfStock")},
+                } for p in self.catalogue.products(i, store)]
+                ld = {"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items}
+                body = (self._instamart_header(pincode, store) + f'<h1>{html.escape(c["sub"])}</h1>'
+                        f'<script type="application/ld+json">{script_json(ld)}</script>')
+                return 200, "text/html; charset=utf-8", self._page(c["sub"], body, "instamart")
+            return "page", render
+
+        m = re.fullmatch(r"/instamart/item/(\d+)/?", path)
+        if m:
+            i, j = divmod(int(m.group(1)) - 700000, 1000)
+            if not self.catalogue.valid(i) or j >= self.catalogue.n_products:
+                return None
+
+            def render():
+                p = self.catalogue.products(i, store)[j]
+                ld = {"@context": "https://schema.org", "@type": "Product", "name": p["name"], "sku": m.group(1),
+                      "brand": {"@type": "Brand", "name": p["brand"]}, "description": f"{p['name']} from {p['brand']}",
+                      "offers": {"@type": "Offer", "price": str(p["price"]), "priceCurrency": "INR",
+                                 "availability": "https://schema.org/" + ("InStock" if p["inventory"] else "OutOfStock")}}
+                variants = "".join(f'<div data-testid="variant-container">{s}</div>' for s in SIZES[:1 + j % 3])
+                body = (
+                    self._instamart_header(pincode, store) + f'<h1>{html.escape(p["name"])}</h1>{variants}'
+                    f'<p>Marketed By<br>{html.escape(p["brand"])} Marketing Ltd</p>'
+                    f'<p>Seller Details<br>Mock Instamart Store {store}</p>'
+                    f'<script type="application/ld+json">{script_json(ld)}</script>'
+                )
+                return 200, "text/html; charset=utf-8", self._page(p["name"], body, "instamart")
+            return "page", render
+
+        if path == "/api/instamart/location/search":
+            return "location", lambda: (200, "application/json", self._suggestions(query))
+        return None
+
+
+# Client scripts, kept out of the pages so page.content() never sees their identifiers. Picking a
+# suggestion updates the page in the same click handler (cookie, header, store state), so a scraper
+# running without human delays reads the located page straight away.
+CLIENT_JS = {
+    "blinkit": """(() => {
+    const bar = document.querySelector("div[class*='LocationBar__Container']");
+    const modal = document.getElementById('location-modal');
+    const input = modal.querySelector("input[name='search']");
+    const list = modal.querySelector("div[class*='LocationSearchList__Container']");
+    bar.addEventListener('click', () => { modal.style.display = 'block'; input.focus(); });
+    let seq = 0;
+    input.addEventListener('input', async () => {
+        const mine = ++seq;
+        const res = await fetch('/mapi/location/search?q=' + encodeURIComponent(input.value.trim()));
+        const items = await res.json();
+        if (mine !== seq) return;
+        list.innerHTML = '';
+        for (const item of items) {
+            const row = document.createElement('div');
+            row.className = 'LocationSearchList__Item-sc-mock';
+            row.dataset.location = JSON.stringify(item);
+            row.innerHTML = '<div></div><div></div>';
+            row.children[0].textContent = item.label;
+            row.children[1].textContent = item.secondary;
+            list.appendChild(row);
+        }
+    });
+    list.addEventListener('click', (event) => {
+        const row = event.target.closest('[data-location]');
+        if (!row) return;
+        const loc = JSON.parse(row.dataset.location);
+        const merchant = 30000 + loc.store;
+        document.cookie = 'mock_pincode=' + loc.pincode + '; path=/';
+        document.cookie = 'merchant_id=' + merchant + '; path=/';
+        localStorage.setItem('location', JSON.stringify({pincode: loc.pincode, merchant_id: String(merchant)}));
+        document.querySelector("div[class*='LocationBar__Title']").textContent = 'Delivery in ' + loc.eta + ' minutes';
+        document.querySelector("div[class*='LocationBar__Subtitle']").textContent = loc.label;
+        modal.style.display = 'none';
+    });
+})();""",
+    "zepto": """(() => {
+    const trigger = document.querySelector("button[aria-label='Select Location']");
+    const modal = document.getElementById('location-modal');
+    const input = modal.querySelector("input[type='text']");
+    const list = document.getElementById('address-results');
+    trigger.addEventListener('click', () => { modal.style.display = 'block'; input.focus(); });
+    let seq = 0;
+    input.addEventListener('input', async () => {
+        const mine = ++seq;
+        const res = await fetch('/api/v1/maps/autocomplete?q=' + encodeURIComponent(input.value.trim()));
+        const items = await res.json();
+        if (mine !== seq) return;
+        list.innerHTML = '';
+        for (const item of items) {
+            const row = document.createElement('div');
+            row.dataset.testid = 'address-search-item';
+            row.dataset.location = JSON.stringify(item);
+            row.innerHTML = '<div></div><div></div>';
+            row.children[0].textContent = item.label;
+            row.children[1].textContent = item.secondary;
+            list.appendChild(row);
+        }
+    });
+    list.addEventListener('click', (event) => {
+        const row = event.target.closest('[data-location]');
+        if (!row) return;
+        const loc = JSON.parse(row.dataset.location);
+        const store = '5702e000-0000-4000-8000-' + loc.store.toString(16).padStart(12, '0');
+        document.cookie = 'mock_pincode=' + loc.pincode + '; path=/';
+        const header = document.querySelector('header');
+        const eta = document.createElement('div');
+        eta.dataset.testid = 'eta-container';
+        eta.textContent = loc.eta + ' mins';
+        header.appendChild(eta);
+        const state = document.createElement('script');
+        state.type = 'application/json';
+        state.id = 'store-state';
+        state.textContent = JSON.stringify({['store' + 'Id']: store, latitude: loc.lat, longitude: loc.lng});
+        header.appendChild(state);
+        modal.style.display = 'none';
+        // The web app's first API call after locating carries the store context in its headers
+        fetch('/lms/api/v2/get_page?page_type=HOME&version=v2&latitude=' + loc.lat + '&longitude=' + loc.lng,
+              {credentials: 'include', headers: {['store' + 'id']: store, app_version: 'mock', platform: 'WEB'}});
+    });
+    // Category pages hydrate from the RSC payload, as Next.js client navigation does
+    if (location.pathname.startsWith('/cn/')) {
+        fetch(location.pathname, {credentials: 'include', headers: {RSC: '1'}}).then(r => r.text()).catch(() => null);
+    }
+})();""",
+    "instamart": """(() => {
+    const trigger = document.querySelector("div[data-testid='header-location-container']");
+    const modal = document.getElementById('location-modal');
+    const input = modal.querySelector("input[data-testid='search-input']");
+    const list = document.getElementById('location-results');
+    trigger.addEventListener('click', () => { modal.style.display = 'block'; input.focus(); });
+    let seq = 0;
+    input.addEventListener('input', async () => {
+        const mine = ++seq;
+        const res = await fetch('/api/instamart/location/search?q=' + encodeURIComponent(input.value.trim()));
+        const items = await res.json();
+        if (mine !== seq) return;
+        list.innerHTML = '';
+        for (const item of items) {
+            const row = document.createElement('div');
+            row.dataset.testid = 'location-search-result';
+            row.dataset.location = JSON.stringify(item);
+            row.textContent = item.label;
+            list.appendChild(row);
+        }
+    });
+    list.addEventListener('click', (event) => {
+        const row = event.target.closest('[data-location]');
+        if (!row) return;
+        const loc = JSON.parse(row.dataset.location);
+        document.cookie = 'mock_pincode=' + loc.pincode + '; path=/';
+        trigger.querySelector('span').textContent = 'Delivery in ' + loc.eta + ' MINS · ' + loc.pincode;
+        modal.style.display = 'none';
+    });
+})();""",
+}
+
+
+class StorefrontHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as browsers expect
+    site = None
+    app: MockStorefront = None
+    verbose = False
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        try:
+            status, content_type, body, extra = self.app.handle(self.site, parsed.path, parse_qs(parsed.query), self.headers)
+        except Exception as e:
+            status, content_type, body, extra = 500, "text/plain", f"mock error: {e}".encode(), {}
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            for name, value in extra.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The scraper closed the tab mid-response
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Dozens of browser contexts connect at once during a load test
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Blinkit, Zepto and Instamart storefronts")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Blinkit's port; Zepto and Instamart use the next two")
+    parser.add_argument("--sites", default=",".join(SITES), help="Comma-separated storefronts to serve")
+    parser.add_argument("--categories", type=int, default=40, help="Sub-category listings per storefront")
+    parser.add_argument("--products", type=int, default=120, help="Products per listing (max 999)")
+    parser.add_argument("--stores", type=int, default=20, help="Dark stores the pincodes are spread over")
+    parser.add_argument("--store-map", help="JSON file of pincode -> store number, overriding the spread")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Base delay of every page/data response")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Extra uniform random delay on top")
+    parser.add_argument("--page-kb", type=float, default=0.0, help="Pad pages and data responses to at least this size")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Share of page/data responses answered as a WAF block")
+    parser.add_argument("--rotate-build-s", type=float, default=0.0, help="Rotate Blinkit's Next.js buildId this often")
+    parser.add_argument("--seed", type=int, help="Seed latency jitter and block decisions")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    mapping = None
+    if args.store_map:
+        with open(args.store_map, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+    app = MockStorefront(Catalogue(args.categories, args.products), StoreAssignment(args.stores, mapping),
+                         latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, page_kb=args.page_kb,
+                         block_rate=args.block_rate, rotate_build_s=args.rotate_build_s)
+
+    servers = []
+    for offset, site in enumerate(SITES):
+        if site not in args.sites.split(","):
+            continue
+        handler = type(f"{site.title()}Handler", (StorefrontHandler,), {"site": site, "app": app, "verbose": args.verbose})
+        server = MockServer((args.host, args.port + offset), handler)
+        threading.Thread(target=server.serve_forever, name=site, daemon=True).start()
+        servers.append(server)
+        home = "/instamart" if site == "instamart" else "/"
+        print(f"{site:<10} http://localhost:{args.port + offset}{home}")
+    print(f"{args.categories} listings x {args.products} products, {args.stores} stores, "
+          f"latency {args.latency_ms:.0f}+{args.jitter_ms:.0f} ms, block rate {args.block_rate:.1%}. Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+        print(json.dumps(app.stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
+import argparse
 import asyncio
 import logging
 import csv
 from datetime import datetime
 from scrapers.instamart import InstamartScraper
+from scrapers.blocking import DEFAULT_POLICY
+from scrapers.extractors import EXTRACTION_STATS
+from scrapers.readiness import READINESS_STATS
+from scrapers.storefront import DEFAULT_STOREFRONT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -31,23 +36,26 @@ async def main():
                 logger.info(f"Processing Pincode: {pincode}")
                 await scraper.set_location(pincode)
                 
+                target_url = DEFAULT_STOREFRONT.url(TARGET_URL)
                 urls_to_scrape = []
-                if "category-listing" in TARGET_URL or "collection" in TARGET_URL:
-                    urls_to_scrape = [TARGET_URL]
-                elif TARGET_URL == "https://www.swiggy.com/instamart" or TARGET_URL == "https://www.swiggy.com/instamart/":
+                if "category-listing" in target_url or "collection" in target_url:
+                    urls_to_scrape = [target_url]
+                elif target_url.rstrip("/") == scraper.base_url:
                      logger.info("Target is homepage, discovering all categories...")
                      urls_to_scrape = await scraper.get_categories()
                      # If discovery fails, fallback to a sensible default or error?
                      if not urls_to_scrape:
                          logger.warning("No categories found on homepage. Using default/sample category.")
                          # Fallback/Sample
-                         urls_to_scrape = ["https://www.swiggy.com/instamart/category-listing?categoryName=Fresh%20Vegetables&custom_back=true&taxonomyType=CategoryListing&taxonomyId=1483"]
+                         urls_to_scrape = [DEFAULT_STOREFRONT.url("https://www.swiggy.com/instamart/category-listing?categoryName=Fresh%20Vegetables&custom_back=true&taxonomyType=CategoryListing&taxonomyId=1483")]
                 else:
-                    urls_to_scrape = [TARGET_URL]
+                    urls_to_scrape = [target_url]
 
                 logger.info(f"Will scrape {len(urls_to_scrape)} category URLs for pincode {pincode}")
                 
                 for cat_url in urls_to_scrape:
+                    # Fresh context every few hundred pages (location restored) keeps Chromium's memory flat
+                    await scraper.maybe_recycle()
                     logger.info(f"Scraping URL: {cat_url}")
                     results = await scraper.scrape_assortment(cat_url, pincode=pincode)
                     
@@ -76,6 +84,17 @@ async def main():
         logger.error(f"Scraping failed: {e}", exc_info=True)
     finally:
         await scraper.stop()
+        blocking = DEFAULT_POLICY.summary()
+        logger.info(f"🚫 Blocked {blocking['requests_blocked']} requests in-browser (~{blocking['mb_saved_estimate']} MB saved)")
+        extraction = EXTRACTION_STATS.summary()
+        logger.info(f"📦 {extraction['evaluate_calls']} extraction evaluates, {extraction['payload_mb']} MB over IPC, {extraction['parse_ms']} ms parsing")
+        readiness = READINESS_STATS.summary()
+        logger.info(f"⏩ {readiness['ready_early']}/{readiness['waits']} readiness waits resolved early, {readiness['saved_s']}s of fixed waits saved")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Instamart assortment scraper")
+    parser.add_argument("--base-url", help="Scrape this origin instead of swiggy.com, e.g. benchmarks/mock_storefront.py")
+    parser.add_argument("--no-human-delay", action="store_true", help="Benchmark mode: skip human-like pauses")
+    args = parser.parse_args()
+    DEFAULT_STOREFRONT.configure(args.base_url, human_delays=not args.no_human_delay)
     asyncio.run(main())
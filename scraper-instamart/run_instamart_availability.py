@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import logging
 import csv
@@ -5,6 +6,10 @@ import os
 from datetime import datetime
 from utils.excel_reader import read_input_excel
 from scrapers.instamart import InstamartScraper
+from scrapers.blocking import DEFAULT_POLICY
+from scrapers.extractors import EXTRACTION_STATS
+from scrapers.readiness import READINESS_STATS
+from scrapers.storefront import DEFAULT_STOREFRONT
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Instamart_Availability_Runner")
@@ -47,7 +52,9 @@ async def main():
             
             for url in urls:
                 try:
-                    res = await scraper.scrape_availability(url)
+                    # Fresh context every few hundred pages (location restored) keeps Chromium's memory flat
+                    await scraper.maybe_recycle()
+                    res = await scraper.scrape_availability(DEFAULT_STOREFRONT.url(url))
                     res["input_pincode"] = pincode
                     results.append(res)
                 except Exception as e:
@@ -57,6 +64,12 @@ async def main():
         logger.error(f"Global error: {e}", exc_info=True)
     finally:
         await scraper.stop()
+        blocking = DEFAULT_POLICY.summary()
+        logger.info(f"🚫 Blocked {blocking['requests_blocked']} requests in-browser (~{blocking['mb_saved_estimate']} MB saved)")
+        extraction = EXTRACTION_STATS.summary()
+        logger.info(f"📦 {extraction['evaluate_calls']} extraction evaluates, {extraction['payload_mb']} MB over IPC, {extraction['parse_ms']} ms parsing")
+        readiness = READINESS_STATS.summary()
+        logger.info(f"⏩ {readiness['ready_early']}/{readiness['waits']} readiness waits resolved early, {readiness['saved_s']}s of fixed waits saved")
         
     # 3. Save Output
     if results:
@@ -70,4 +83,9 @@ async def main():
         logger.warning("No results to save.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Instamart availability scraper")
+    parser.add_argument("--base-url", help="Scrape this origin instead of swiggy.com, e.g. benchmarks/mock_storefront.py")
+    parser.add_argument("--no-human-delay", action="store_true", help="Benchmark mode: skip human-like pauses")
+    args = parser.parse_args()
+    DEFAULT_STOREFRONT.configure(args.base_url, human_delays=not args.no_human_delay)
     asyncio.run(main())
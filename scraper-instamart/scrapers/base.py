@@ -2,23 +2,42 @@ import asyncio
 from playwright.async_api import async_playwright, Page, BrowserContext
 from abc import ABC, abstractmethod
 import logging
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from .models import ProductItem, AvailabilityResult
+from .blocking import BlockingPolicy, DEFAULT_POLICY
+from .rate_limit import RateLimiter, DEFAULT_LIMITER
+from .readiness import READINESS_STATS
+from .recycling import RecyclePolicy, DEFAULT_RECYCLE_POLICY
+from .storefront import Storefront, DEFAULT_STOREFRONT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BaseScraper(ABC):
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, blocking_policy: BlockingPolicy = None, rate_limiter: RateLimiter = None,
+                 recycle_policy: RecyclePolicy = None, storefront: Storefront = None):
         self.headless = headless
+        self.blocking_policy = blocking_policy or DEFAULT_POLICY
+        self.rate_limiter = rate_limiter or DEFAULT_LIMITER # Paces navigations/fetches per site instead of fixed sleeps
+        self.recycle_policy = recycle_policy or DEFAULT_RECYCLE_POLICY # When to swap a context/browser for a fresh one
+        self.navigations = 0 # goto()s on the current context
+        self.storefront = storefront or DEFAULT_STOREFRONT # Live site or a local mock; human delays on/off
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self.session_cache = None # Subclasses set a SessionCache to persist located sessions
+        self.category_cache = None # Subclasses set a CategoryCache to reuse discovered category trees
+        self.current_pincode = None
 
     async def start(self):
         self.playwright = await async_playwright().start()
-        
+        self.browser = await self._launch_browser()
+        await self._create_context()
+
+    async def _launch_browser(self):
+        """Launches system Edge, then Chrome, then the bundled Chromium as a fallback."""
         # Try to launch system edge, then chrome, then bundled chromium
         browsers_to_try = [
             {'channel': 'msedge'},
@@ -42,19 +61,25 @@ class BaseScraper(ABC):
             browser_kwargs['args'] = browser_kwargs.get('args', []) + stealth_args
             
             try:
-                self.browser = await self.playwright.chromium.launch(headless=self.headless, **browser_kwargs)
+                browser = await self.playwright.chromium.launch(headless=self.headless, **browser_kwargs)
                 logger.info(f"Launched browser with kwargs: {browser_kwargs}")
-                break
+                return browser
             except Exception as e:
                 logger.warning(f"Failed to launch browser with {browser_kwargs}: {e}")
-        
-        if not self.browser:
-            raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+
+        raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+
+    async def _create_context(self, storage_state: dict = None):
+        """Creates a fresh stealth context. `storage_state` restores a cached, located session."""
+        if self.context:
+            await self.context.close()
 
         self.context = await self.browser.new_context(
              viewport={'width': 1920, 'height': 1080},
-             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+             storage_state=storage_state
         )
+        self.navigations = 0
         
         # KEY STEALTH SCRIPT: Remove navigator.webdriver property
         await self.context.add_init_script("""
@@ -63,7 +88,156 @@ class BaseScraper(ABC):
             });
         """)
         
-        self.page = await self.context.new_page()
+        self.page = await self.new_page()
+
+    async def new_page(self) -> Page:
+        """Opens a tab in the current context with the blocking policy installed before any navigation."""
+        page = await self.context.new_page()
+        # PERFORMANCE OPTIMIZATION: heavy resources and trackers are dropped inside the browser
+        await self.blocking_policy.apply(self.context, page)
+        return page
+
+    async def throttle(self, url: str, cost: int = 1):
+        """Waits on the shared per-domain rate limiter before `cost` requests to `url`'s site."""
+        await self.rate_limiter.acquire(url, cost)
+
+    async def goto(self, url: str, page=None, **kwargs):
+        """page.goto (main page by default) paced by the per-domain rate limiter."""
+        await self.throttle(url)
+        self.navigations += 1
+        return await (page or self.page).goto(url, **kwargs)
+
+    async def wait_until_ready(self, condition, ceiling_ms: int, label: str, page=None) -> bool:
+        """
+        Waits until `condition` holds, but never longer than `ceiling_ms` (the old fixed stall).
+
+        `condition` is a JS predicate polled in the page (see readiness.py), or an awaitable
+        such as `event.wait()` on an asyncio.Event a response listener sets. Time saved
+        against the ceiling is recorded per `label` in READINESS_STATS.
+        """
+        started = time.perf_counter()
+        try:
+            if isinstance(condition, str):
+                await (page or self.page).wait_for_function(condition, timeout=ceiling_ms, polling=100)
+            else:
+                await asyncio.wait_for(condition, ceiling_ms / 1000)
+            ready = True
+        except Exception:
+            # Timed out (or the page navigated away): same outcome as the old fixed wait
+            ready = False
+        READINESS_STATS.record(label, time.perf_counter() - started, ceiling_ms / 1000, ready)
+        return ready
+
+    async def restore_session(self, pincode: str) -> bool:
+        """
+        Restores a cached session for this pincode into a fresh context.
+        Returns True only if the restored location still checks out.
+        """
+        if not self.session_cache:
+            return False
+        entry = self.session_cache.load(pincode)
+        if not entry:
+            return False
+
+        logger.info(f"♻️ Restoring cached session for {pincode}")
+        await self._create_context(storage_state=entry["storage_state"])
+        self._apply_session_meta(entry.get("meta") or {})
+
+        try:
+            if await self._is_location_valid(pincode):
+                return True
+        except Exception as e:
+            logger.warning(f"Cached session check failed for {pincode}: {e}")
+
+        logger.info(f"Cached session for {pincode} is stale. Falling back to full location flow.")
+        self.session_cache.invalidate(pincode)
+        return False
+
+    async def save_session(self, pincode: str):
+        """Saves the current (verified) location session for later runs."""
+        if not self.session_cache or not self.context:
+            return
+        try:
+            storage_state = await self.context.storage_state()
+            self.session_cache.save(pincode, storage_state, self._session_meta())
+        except Exception as e:
+            logger.warning(f"Could not capture storage state for {pincode}: {e}")
+
+    def _session_meta(self) -> dict:
+        """Scraper fields saved alongside the storage state (ETA, store id...)."""
+        return {}
+
+    def _apply_session_meta(self, meta: dict):
+        pass
+
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """Cheap platform check that a restored session is still located. Override per platform."""
+        return False
+
+    def _category_cache_key(self) -> Optional[str]:
+        """Category trees are per store; fall back to the pincode when the store is unknown."""
+        store_id = getattr(self, "store_id", None)
+        if store_id and store_id not in ("N/A", "Unknown"):
+            return f"store_{store_id}"
+        if self.current_pincode:
+            return f"pin_{self.current_pincode}"
+        return None
+
+    async def maybe_recycle(self, relocate: bool = True) -> bool:
+        """
+        Checkpoint between units of work: recycles the context (or the browser) when the
+        recycle policy says it has done too many navigations or the browser tree uses
+        too much memory. Returns True if it recycled.
+
+        `relocate=False` skips restoring the location, for callers about to set a new one.
+        """
+        reason, restart_browser = self.recycle_policy.check(self.navigations)
+        if not reason:
+            return False
+        await self.recycle(reason, restart_browser, relocate)
+        return True
+
+    async def recycle(self, reason: str, restart_browser: bool = False, relocate: bool = True):
+        """
+        Replaces the context (and with `restart_browser` the browser) with a fresh one that
+        carries the same cookies/localStorage and session meta, so the location survives.
+        """
+        logger.info(f"♻️ Recycling {'browser' if restart_browser else 'context'} after {reason}")
+        pincode = self.current_pincode if relocate else None
+        storage_state = None
+        if pincode and self.context:
+            try:
+                storage_state = await self.context.storage_state()
+            except Exception as e:
+                logger.warning(f"Could not capture storage state before recycling: {e}")
+        meta = self._session_meta()
+
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.warning(f"Error closing context: {e}")
+            self.context = None
+
+        if restart_browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+            self.browser = await self._launch_browser()
+
+        await self._create_context(storage_state=storage_state)
+        self._apply_session_meta(meta)
+        self.recycle_policy.record(restart_browser)
+
+        if pincode:
+            try:
+                if await self._is_location_valid(pincode):
+                    return
+            except Exception as e:
+                logger.warning(f"Location check after recycling failed for {pincode}: {e}")
+            logger.info(f"Recycled session lost its location ({pincode}). Re-locating.")
+            await self.set_location(pincode)
 
     async def stop(self):
         if self.context:
@@ -0,0 +1,74 @@
+import json
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# schema.org ItemList products from every JSON-LD block, trimmed to the fields mapped into
+# ProductItem, as one JSON string (one evaluate instead of an inner_text() round trip per script)
+JSON_LD_PRODUCTS_JS = """() => {
+    const out = [];
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        let data;
+        try { data = JSON.parse(script.textContent); } catch (e) { continue; }
+        if (!data || data['@type'] !== 'ItemList' || !Array.isArray(data.itemListElement)) continue;
+        for (const item of data.itemListElement) {
+            if (!item || item['@type'] !== 'Product') continue;
+            const offer = Array.isArray(item.offers) ? (item.offers[0] || {}) : (item.offers || {});
+            const image = Array.isArray(item.image) ? item.image[0] : item.image;
+            out.push({
+                sku: item.sku || null,
+                name: item.name || 'Unknown',
+                price: offer.price !== undefined ? offer.price : 0,
+                availability: offer.availability || 'Unknown',
+                image: image || 'N/A',
+                brand: (item.brand && item.brand.name) || 'Unknown'
+            });
+        }
+    }
+    return JSON.stringify(out);
+}"""
+
+
+class ExtractionStats:
+    """Run-wide counters for in-page extraction: evaluate calls, payload bytes, Python parse time."""
+
+    def __init__(self):
+        self.calls = 0
+        self.payload_bytes = 0
+        self.parse_seconds = 0.0
+        self.records = 0
+
+    def record(self, payload_bytes: int, parse_seconds: float, records: int):
+        self.calls += 1
+        self.payload_bytes += payload_bytes
+        self.parse_seconds += parse_seconds
+        self.records += records
+
+    def summary(self) -> dict:
+        return {
+            "evaluate_calls": self.calls,
+            "payload_mb": round(self.payload_bytes / 1_000_000, 2),
+            "avg_payload_kb": round(self.payload_bytes / self.calls / 1000, 1) if self.calls else 0.0,
+            "parse_ms": round(self.parse_seconds * 1000, 1),
+            "records": self.records,
+        }
+
+# Shared by every scraper in the process, so the counters cover the whole run
+EXTRACTION_STATS = ExtractionStats()
+
+
+def parse_payload(raw: Optional[str], stats: ExtractionStats = EXTRACTION_STATS) -> Optional[list]:
+    """Decodes a JSON string returned by an extraction script and records its cost."""
+    if raw is None:
+        return None
+    t0 = time.perf_counter()
+    records = json.loads(raw)
+    stats.record(len(raw), time.perf_counter() - t0, len(records))
+    return records
+
+
+async def run_extractor(page, script: str, stats: ExtractionStats = EXTRACTION_STATS) -> Optional[list]:
+    """Runs an extraction script in the page; returns its records, or None if the page had no data."""
+    return parse_payload(await page.evaluate(script), stats)
@@ -4,17 +4,24 @@ import json
 import re
 import time
 from typing import List
+from urllib.parse import urlparse
 from .base import BaseScraper
+from .session_cache import SessionCache
+from .category_tree import CategoryTree, CategoryCache
+from .readiness import JSON_LD_READY, HEADER_READY, LOCATION_ETA_READY, CATEGORY_LINKS_READY
+from .extractors import JSON_LD_PRODUCTS_JS, run_extractor
 from .models import ProductItem, AvailabilityResult
 from playwright.async_api import TimeoutError
 
 logger = logging.getLogger(__name__)
 
 class InstamartScraper(BaseScraper):
-    def __init__(self, headless=False):
-        super().__init__(headless)
-        self.base_url = "https://www.swiggy.com/instamart"
+    def __init__(self, headless=False, blocking_policy=None):
+        super().__init__(headless, blocking_policy)
+        self.base_url = self.storefront.url("https://www.swiggy.com/instamart")
         self.delivery_eta = "N/A"
+        self.session_cache = SessionCache(self.storefront.namespace("instamart"))
+        self.category_cache = CategoryCache(self.storefront.namespace("instamart"))
 
     async def start(self):
         # We need to customize the context creation to include permissions
@@ -25,7 +32,10 @@ class InstamartScraper(BaseScraper):
         
         from playwright.async_api import async_playwright
         self.playwright = await async_playwright().start()
-        
+        self.browser = await self._launch_browser()
+        await self._create_context()
+
+    async def _launch_browser(self):
         # Launch browser (similar to BaseScraper but we can simple it down or use same logic)
         # For simplicity, just launch chromium/msedge
         browsers_to_try = [
@@ -36,16 +46,18 @@ class InstamartScraper(BaseScraper):
         
         for browser_kwargs in browsers_to_try:
             try:
-                self.browser = await self.playwright.chromium.launch(
+                return await self.playwright.chromium.launch(
                     headless=self.headless, 
                     **browser_kwargs
                 )
-                break
             except Exception:
                 continue
                 
-        if not self.browser:
-            raise Exception("Failed to launch any browser")
+        raise Exception("Failed to launch any browser")
+
+    async def _create_context(self, storage_state: dict = None):
+        if self.context:
+            await self.context.close()
 
         # Create context with Geolocation
         self.context = await self.browser.new_context(
@@ -53,24 +65,45 @@ class InstamartScraper(BaseScraper):
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             permissions=['geolocation'],
             geolocation={'latitude': 12.9716, 'longitude': 77.5946}, # Bangalore
-            locale='en-IN'
+            locale='en-IN',
+            storage_state=storage_state
         )
-        self.page = await self.context.new_page()
-        
-        # Resource blocking
-        await self.page.route("**/*", self._handle_route)
+        self.navigations = 0
+        # Resource blocking is enforced in-browser by the CDP blocking policy
+        self.page = await self.new_page()
+
+    def _session_meta(self) -> dict:
+        return {"delivery_eta": self.delivery_eta}
+
+    def _apply_session_meta(self, meta: dict):
+        self.delivery_eta = meta.get("delivery_eta", self.delivery_eta)
 
-    async def _handle_route(self, route):
-        if route.request.resource_type in ["image", "media", "font"]:
-            await route.abort()
-        else:
-            await route.continue_()
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """A located Instamart session shows the delivery ETA in the header."""
+        await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+        try:
+            await self.page.wait_for_selector("header", timeout=5000)
+            header_text = await self.page.inner_text("header")
+        except Exception:
+            return False
+        match = re.search(r'(\d+\s*MINS?)', header_text, re.IGNORECASE)
+        if match:
+            self.delivery_eta = match.group(1)
+            return True
+        return False
 
     async def set_location(self, pincode: str):
         logger.info(f"Setting location to {pincode}")
+        self.current_pincode = pincode
+
+        # Fast path: reuse a cached, already-located session
+        if await self.restore_session(pincode):
+            logger.info(f"Location restored from session cache for {pincode} (ETA: {self.delivery_eta})")
+            return
+
         try:
-            await self.page.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
-            await self.page.wait_for_timeout(3000)
+            await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+            await self.wait_until_ready(HEADER_READY, 3000, "home_header")
 
             # Debugging: Screenshot before interaction
             # await self.page.screenshot(path="debug_instamart_pre_click.png")
@@ -149,8 +182,8 @@ class InstamartScraper(BaseScraper):
             # Click first
             await self.page.click(f"{suggestion} >> nth=0")
             
-            # 4. Wait for redirect/reload
-            await self.page.wait_for_timeout(3000) 
+            # 4. Wait for redirect/reload (done once the header shows the new ETA)
+            await self.wait_until_ready(LOCATION_ETA_READY, 3000, "location_eta")
             
             # 5. Extract ETA from header
             try:
@@ -159,6 +192,8 @@ class InstamartScraper(BaseScraper):
                 if match:
                     self.delivery_eta = match.group(1)
                     logger.info(f"Captured Instamart ETA: {self.delivery_eta}")
+                    # An ETA in the header means the location took; cache the session
+                    await self.save_session(pincode)
             except Exception as e:
                 logger.warning(f"Could not extract ETA: {e}")
 
@@ -203,21 +238,32 @@ class InstamartScraper(BaseScraper):
 
     async def get_categories(self) -> List[str]:
         """
-        Scrapes all category URLs from the homepage.
+        Scrapes all category URLs from the homepage (cached per location).
         """
+        cache_key = self._category_cache_key()
+        tree = self.category_cache.load(cache_key) if cache_key else None
+        if tree:
+            cached = tree.listings()
+            logger.info(f"Loaded {len(cached)} categories from cache ({cache_key}).")
+            return cached
+
         logger.info("Discovering categories from homepage...")
         categories = set()
         try:
             # Ensure we are at base_url
             if self.page.url != self.base_url:
-                await self.page.goto(self.base_url, timeout=30000, wait_until='domcontentloaded')
-                await self.page.wait_for_timeout(3000)
+                await self.goto(self.base_url, timeout=30000, wait_until='domcontentloaded')
+                await self.wait_until_ready(CATEGORY_LINKS_READY, 3000, "category_links")
             
             # Look for category links. Instamart typically uses links with 'category-listing' or 'collection'
             # We'll scroll down a bit to ensure lazy load
             for _ in range(3):
                 await self.page.evaluate("window.scrollBy(0, 500)")
-                await self.page.wait_for_timeout(500)
+                if self.storefront.human_delays:
+                    await self.page.wait_for_timeout(500)
+            # Relative links resolve against the site's origin
+            parsed = urlparse(self.base_url)
+            origin = f"{parsed.scheme}://{parsed.netloc}"
             
             # Selectors for category links
             # Try 1: Links with 'category-listing' in href
@@ -226,7 +272,7 @@ class InstamartScraper(BaseScraper):
                 href = await link.get_attribute("href")
                 if href:
                     if href.startswith("/"):
-                        href = "https://www.swiggy.com" + href
+                        href = origin + href
                     categories.add(href)
             
             # Try 2: specific nav bars often have categories
@@ -236,138 +282,131 @@ class InstamartScraper(BaseScraper):
                    href = await link.get_attribute("href")
                    if href:
                         if href.startswith("/"):
-                            href = "https://www.swiggy.com" + href
+                            href = origin + href
                         categories.add(href)
 
-            logger.info(f"Found {len(categories)} categories.")
-            return list(categories)
+            # One listing per taxonomyId (+ filter); drops repeats of the same listing
+            tree = CategoryTree.from_urls("instamart", list(categories))
+            listings = tree.listings()
+            logger.info(f"Found {len(listings)} categories ({len(categories)} links, {tree.stats['parents_dropped']} parent listings dropped).")
+            if cache_key and listings:
+                self.category_cache.save(cache_key, tree)
+            return listings
             
         except Exception as e:
             logger.error(f"Error discovering categories: {e}")
             return []
 
 
+    def _products_from_json_ld(self, items: list, category_url: str, pincode: str) -> List[ProductItem]:
+        """Maps the JSON-LD ItemList products collected by JSON_LD_PRODUCTS_JS to ProductItems (no browser needed)."""
+        results: List[ProductItem] = []
+        products_map = {}
+        try:
+            for item in items:
+                p_name = item['name']
+                p_id = item['sku'] or str(abs(hash(p_name)))
+                price = float(item['price'] or 0)
+                products_map[p_id] = {
+                    'id': p_id,
+                    'name': p_name,
+                    'price': price,
+                    'mrp': price, 
+                    'image': item['image'],
+                    'brand': item['brand'],
+                    'availability': item['availability']
+                }
+        except Exception as e:
+            logger.warning(f"JSON-LD mapping failed: {e}")
+
+        logger.info(f"Extracted {len(products_map)} unique products from JSON-LD")
+
+        # Extract category and subcategory from URL
+        category = "N/A"
+        subcategory = "N/A"
+        try:
+            if "categoryName=" in category_url:
+                category = category_url.split("categoryName=")[1].split("&")[0].replace("%20", " ")
+                subcategory = category  # Instamart URLs don't seem to have separate subcategories
+        except:
+            pass
+        
+        clicked_label = f"{category} > {subcategory}" if subcategory != "N/A" else category
+
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        
+        for pid, p in products_map.items():
+            try:
+                # Enrich Weight from Name
+                name = p['name']
+                weight = "N/A"
+                w_match = re.search(r'(\d+[\.\d]*\s*[kgmlKGML]+)', name)
+                if w_match:
+                    weight = w_match.group(1)
+                
+                availability = "In Stock" if "InStock" in str(p['availability']) else "Out of Stock"
+                
+                # Placeholder for detail fields (requires PDP for Instamart usually)
+                # To get these, we would need to visit each product_url.
+                # For Assortment (Catalog) speed, we default to None.
+                
+                item: ProductItem = {
+                    "platform": "instamart",
+                    "category": category,
+                    "subcategory": subcategory,
+                    "clicked_label": clicked_label,
+                    "name": name,
+                    "brand": p['brand'],
+                    "base_product_id": pid,
+                    "product_id": pid,
+                    "group_id": None,
+                    "merchant_type": None,
+                    "mrp": p['mrp'], 
+                    "price": p['price'],
+                    "weight": weight,
+                    "shelf_life_in_hours": None,
+                    "shelf_life": None,
+                    "seller_details": None,
+                    "manufacturer_details": None,
+                    "marketer_details": None,
+                    "merchant_id": None,
+                    "availability": availability,
+                    "inventory": None,
+                    "variant_count": None,
+                    "variant_in_stock_count": None,
+                    "store_id": "Unknown",
+                    "eta": self.delivery_eta, 
+                    "product_url": f"{self.base_url}/item/{pid}",
+                    "image_url": p['image'],
+                    "scraped_at": timestamp,
+                    "pincode_input": pincode
+                }
+                results.append(item)
+            except Exception as e:
+                pass
+        
+        return results
+
     async def scrape_assortment(self, category_url: str, pincode: str = "N/A") -> List[ProductItem]:
         logger.info(f"Scraping assortment from {category_url}")
         
         results: List[ProductItem] = []
         try:
-            await self.page.goto(category_url, timeout=60000, wait_until="domcontentloaded")
-            await self.page.wait_for_timeout(2000) 
+            await self.goto(category_url, timeout=60000, wait_until="domcontentloaded")
+            await self.wait_until_ready(JSON_LD_READY, 2000, "category_json_ld")
 
             # Scrape ETA using the new robust method
             self.delivery_eta = await self.scrape_delivery_eta()
             logger.info(f"Scraped Assortment ETA: {self.delivery_eta}")
             
-            products_map = {}
-            
-            # Strategy: JSON-LD (Schema.org)
+            # Strategy: JSON-LD (Schema.org), collected in-page in a single evaluate
+            items = []
             try:
-                ld_scripts = await self.page.query_selector_all('script[type="application/ld+json"]')
-                for script in ld_scripts:
-                    try:
-                        text = await script.inner_text()
-                        data = json.loads(text)
-                        
-                        if isinstance(data, dict) and data.get('@type') == 'ItemList' and 'itemListElement' in data:
-                            for item in data['itemListElement']:
-                                if item.get('@type') == 'Product':
-                                    p_name = item.get('name', 'Unknown')
-                                    p_id = item.get('sku') or str(abs(hash(p_name)))
-                                    
-                                    price = 0.0
-                                    offer = item.get('offers', {})
-                                    if isinstance(offer, dict):
-                                        price = float(offer.get('price', 0))
-                                    elif isinstance(offer, list) and offer:
-                                        price = float(offer[0].get('price', 0))
-                                        
-                                    image = "N/A"
-                                    if item.get('image'):
-                                        imgs = item.get('image')
-                                        if isinstance(imgs, list) and imgs: image = imgs[0]
-                                        elif isinstance(imgs, str): image = imgs
-                                    
-                                    products_map[p_id] = {
-                                        'id': p_id,
-                                        'name': p_name,
-                                        'price': price,
-                                        'mrp': price, 
-                                        'image': image,
-                                        'brand': item.get('brand', {}).get('name', 'Unknown'),
-                                        'availability': offer.get('availability', 'Unknown')
-                                    }
-                    except:
-                        continue
+                items = await run_extractor(self.page, JSON_LD_PRODUCTS_JS) or []
             except Exception as e:
                 logger.warning(f"JSON-LD extraction failed: {e}")
+            results = self._products_from_json_ld(items, category_url, pincode)
 
-            logger.info(f"Extracted {len(products_map)} unique products from JSON-LD")
-
-            # Extract category and subcategory from URL
-            category = "N/A"
-            subcategory = "N/A"
-            try:
-                if "categoryName=" in category_url:
-                    category = category_url.split("categoryName=")[1].split("&")[0].replace("%20", " ")
-                    subcategory = category  # Instamart URLs don't seem to have separate subcategories
-            except:
-                pass
-            
-            clicked_label = f"{category} > {subcategory}" if subcategory != "N/A" else category
-
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            
-            for pid, p in products_map.items():
-                try:
-                    # Enrich Weight from Name
-                    name = p['name']
-                    weight = "N/A"
-                    w_match = re.search(r'(\d+[\.\d]*\s*[kgmlKGML]+)', name)
-                    if w_match:
-                        weight = w_match.group(1)
-                    
-                    availability = "In Stock" if "InStock" in str(p['availability']) else "Out of Stock"
-                    
-                    # Placeholder for detail fields (requires PDP for Instamart usually)
-                    # To get these, we would need to visit each product_url.
-                    # For Assortment (Catalog) speed, we default to None.
-                    
-                    item: ProductItem = {
-                        "platform": "instamart",
-                        "category": category,
-                        "subcategory": subcategory,
-                        "clicked_label": clicked_label,
-                        "name": name,
-                        "brand": p['brand'],
-                        "base_product_id": pid,
-                        "product_id": pid,
-                        "group_id": None,
-                        "merchant_type": None,
-                        "mrp": p['mrp'], 
-                        "price": p['price'],
-                        "weight": weight,
-                        "shelf_life_in_hours": None,
-                        "shelf_life": None,
-                        "seller_details": None,
-                        "manufacturer_details": None,
-                        "marketer_details": None,
-                        "merchant_id": None,
-                        "availability": availability,
-                        "inventory": None,
-                        "variant_count": None,
-                        "variant_in_stock_count": None,
-                        "store_id": "Unknown",
-                        "eta": self.delivery_eta, 
-                        "product_url": f"{self.base_url}/item/{pid}",
-                        "image_url": p['image'],
-                        "scraped_at": timestamp,
-                        "pincode_input": pincode
-                    }
-                    results.append(item)
-                except Exception as e:
-                    pass
-            
             logger.info(f"Generated {len(results)} items")
                     
         except Exception as e:
@@ -398,8 +437,8 @@ class InstamartScraper(BaseScraper):
         }
         
         try:
-            await self.page.goto(product_url, timeout=60000, wait_until="domcontentloaded")
-            await self.page.wait_for_timeout(3000)
+            await self.goto(product_url, timeout=60000, wait_until="domcontentloaded")
+            await self.wait_until_ready(JSON_LD_READY, 3000, "product_json_ld")
 
             # 1. JSON-LD Strategy
             try:
@@ -0,0 +1,120 @@
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def tree_rss_mb() -> Optional[float]:
+    """
+    Summed RSS (MB) of every process below this one: the Playwright driver and all
+    Chromium browser/renderer/GPU processes. Shared pages are counted once per
+    process, so this overstates real usage; thresholds should allow for that.
+    Returns None where it can't be measured (no psutil and no /proc).
+    """
+    if psutil is not None:
+        try:
+            total = 0
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return total / 1024 / 1024
+        except Exception:
+            return None
+
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            # The command name may contain spaces or parentheses; ppid comes after the last ')'
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / 1024 / 1024
+
+
+class RecyclePolicy:
+    """
+    When a scraper should throw away its browser context (and maybe its browser).
+
+    - After `max_navigations` goto()s on one context, the context is recycled.
+    - Every `check_interval_s` one scraper (the first to ask) measures the RSS of
+      the whole browser process tree. Over `max_rss_mb`, that scraper restarts its
+      browser (or hands its pool browser back for relaunch). Only one scraper acts
+      per measurement, so workers don't all restart at once.
+      Contexts younger than `min_navigations` are never recycled for memory.
+
+    Scrapers ask at their own checkpoints (BaseScraper.maybe_recycle), between units
+    of work, never in the middle of a page.
+    """
+
+    def __init__(self, max_navigations: int = 250, max_rss_mb: Optional[float] = 4096,
+                 min_navigations: int = 20, check_interval_s: float = 15.0):
+        self.max_navigations = max_navigations
+        self.max_rss_mb = max_rss_mb
+        self.min_navigations = min_navigations
+        self.check_interval_s = check_interval_s
+        self.last_rss_mb: Optional[float] = None
+        self.peak_rss_mb = 0.0
+        self.context_recycles = 0
+        self.browser_restarts = 0
+        self._next_check = 0.0
+
+    def check(self, navigations: int) -> Tuple[Optional[str], bool]:
+        """(reason, restart_browser) for a context that has done `navigations`; reason None = keep it."""
+        if self.max_navigations and navigations >= self.max_navigations:
+            return f"{navigations} navigations", False
+        if self.max_rss_mb and navigations >= self.min_navigations:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval_s
+                rss = tree_rss_mb()
+                if rss is not None:
+                    self.last_rss_mb = rss
+                    self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                    if rss > self.max_rss_mb:
+                        return f"browser RSS {rss:.0f} MB > {self.max_rss_mb:.0f} MB", True
+        return None, False
+
+    def record(self, restart_browser: bool):
+        if restart_browser:
+            self.browser_restarts += 1
+        else:
+            self.context_recycles += 1
+
+    def summary(self) -> dict:
+        return {
+            "context_recycles": self.context_recycles,
+            "browser_restarts": self.browser_restarts,
+            "last_rss_mb": round(self.last_rss_mb) if self.last_rss_mb is not None else None,
+            "peak_rss_mb": round(self.peak_rss_mb),
+        }
+
+# Shared by every scraper in the process, so the memory check is made once per interval, not per worker
+DEFAULT_RECYCLE_POLICY = RecyclePolicy()
@@ -0,0 +1,193 @@
+"""
+Offline replay benchmark for the Python side of the Blinkit extractors: no browser, no network.
+
+Runs BlinkitScraper._extract_products_from_next_data (JSON decode + product walk) over:
+  - recorded pages in benchmarks/fixtures/:
+      *.next_data.json  raw __NEXT_DATA__ blobs, e.g.
+          open("benchmarks/fixtures/fruits.next_data.json", "w").write(
+              await page.evaluate("() => JSON.stringify(window.__NEXT_DATA__)"))
+      *.html            saved category pages (the __NEXT_DATA__ script is replayed)
+      *.pdp.html        saved product pages (their Flight chunks are decoded into rows)
+  - a synthetic category blob (--products N) and the synthetic PDP from bench_pdp_extractor,
+    so the suite also runs on a fresh checkout.
+
+Per page it reports throughput (products/s over the median of --repeat runs), peak traced
+memory, and the blocks/KB allocated by one run that are still alive when it returns (tracemalloc).
+Results go to --out as JSON, tagged with the git commit; --compare prints the change against
+an earlier results file.
+
+Usage:
+    python benchmarks/bench_extractors.py [--products 2000] [--repeat 5] [--out results.json] [--compare old.json]
+"""
+import argparse
+import gc
+import glob
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scrapers.blinkit import BlinkitScraper
+from bench_pdp_extractor import synthetic_pdp
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+NEXT_DATA_SCRIPT = re.compile(r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+NEXT_F_PUSH = re.compile(r'self\.__next_f\.push\(\[1,"((?:[^"\\]|\\.)*)"\]\)')
+
+
+def synthetic_next_data(n_products: int) -> str:
+    """Category-sized __NEXT_DATA__: product snippets nested in layout widgets, with noise around them."""
+    snippets = []
+    for i in range(n_products):
+        pid = 100000 + i
+        snippets.append({"widget_type": "product_card", "tracking": {"impression": f"imp-{i}"}, "data": {
+            "product_id": pid, "name": f"Product {i} 500 g", "brand": f"Brand{i % 40}",
+            "price": 50 + i % 300, "mrp": 60 + i % 300, "inventory": i % 9, "unit": "500 g",
+            "group_id": i % 700, "merchant": {"id": 30000 + i % 4, "type": "express"},
+            "image_url": f"https://cdn.example.com/{pid}.jpg",
+            "variants": [{"id": pid * 10 + v, "unit": f"{v + 1} x 500 g"} for v in range(i % 3)],
+        }})
+    data = {"props": {"pageProps": {"initialState": {
+        "ui": {"theme": "light", "banners": [{"id": b, "image": f"banner-{b}.jpg"} for b in range(20)]},
+        "listing": {"sections": [{"id": s, "widgets": snippets[s::8]} for s in range(8)]},
+    }}}, "page": "/cn/[slug]/cid/[l0]/[l1]", "buildId": "synthetic"}
+    return json.dumps(data, separators=(",", ":"))
+
+
+def page_data(html: str) -> str:
+    """JSON text of a saved page's data: the __NEXT_DATA__ script, else its decoded Flight rows."""
+    match = NEXT_DATA_SCRIPT.search(html)
+    if match:
+        return match.group(1)
+    rows = []
+    for chunk in NEXT_F_PUSH.findall(html):
+        try:
+            text = json.loads(f'"{chunk}"')
+        except ValueError:
+            continue
+        for line in text.split("\n"):
+            # Rows are "<id>:<json>"; some chunks carry bare JSON
+            for candidate in (line, line.partition(":")[2]):
+                try:
+                    rows.append(json.loads(candidate))
+                    break
+                except ValueError:
+                    continue
+    return json.dumps(rows)
+
+
+def load_payloads(n_products: int):
+    payloads = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.next_data.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            payloads[os.path.basename(path)] = f.read()
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            payloads[os.path.basename(path)] = page_data(f.read())
+    payloads[f"synthetic_category_{n_products}"] = synthetic_next_data(n_products)
+    payloads["synthetic_pdp_150"] = page_data(synthetic_pdp(150)[0])
+    return payloads
+
+
+def next_data_walk(raw: str):
+    return BlinkitScraper._extract_products_from_next_data(json.loads(raw))
+
+
+EXTRACTORS = {"next_data_walk": next_data_walk}
+
+
+def measure(fn, payload, repeat: int) -> dict:
+    """Median/min wall time over `repeat` runs, then one more run under tracemalloc for memory."""
+    runs = []
+    products = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        products = len(fn(payload))
+        runs.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn(payload)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    del result
+
+    median = statistics.median(runs)
+    return {
+        "products": products,
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(min(runs) * 1000, 2),
+        "products_per_s": round(products / median) if median else None,
+        "peak_kb": round(peak / 1024, 1),
+        "alloc_blocks": sum(s.count_diff for s in diff),
+        "alloc_kb": round(sum(s.size_diff for s in diff) / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["payload"], r["extractor"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    for r in results:
+        b = old.get((r["payload"], r["extractor"]))
+        if not b or not b["products_per_s"] or not r["products_per_s"]:
+            continue
+        speed = (r["products_per_s"] / b["products_per_s"] - 1) * 100
+        print(f"  {r['payload']:<36} {r['extractor']:<16} {speed:+6.1f}% products/s, "
+              f"peak {b['peak_kb']:.0f} -> {r['peak_kb']:.0f} KB, blocks {b['alloc_blocks']} -> {r['alloc_blocks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Blinkit extractors")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # scrapers.base configures INFO logging on import
+
+    results = []
+    for name, payload in load_payloads(args.products).items():
+        print(f"\n{name} ({len(payload.encode('utf-8')) / 1_000_000:.2f} MB)")
+        for extractor, fn in EXTRACTORS.items():
+            row = {"payload": name, "extractor": extractor, "bytes": len(payload.encode("utf-8")),
+                   **measure(fn, payload, args.repeat)}
+            results.append(row)
+            print(f"  {extractor:<16} {row['median_ms']:>9.2f} ms  {row['products']:>6} products  "
+                  f"{row['products_per_s'] or 0:>9,} products/s  peak {row['peak_kb']:>8.1f} KB  {row['alloc_blocks']:>6} blocks")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"suite": "blinkit_extractors", "commit": git_commit(), "created_at": datetime.now().isoformat(),
+                       "python": platform.python_version(), "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmark: single-evaluate PDP extractor (PDP_DETAILS_JS) vs the page.content() + inner_text path it replaced.
+
+Pages:
+  - every saved product page in benchmarks/fixtures/*.pdp.html. Save one from a live session with e.g.
+        open("benchmarks/fixtures/amul_butter_10031.pdp.html", "w").write(await page.content())
+    The digits at the end of the name are the prid; without them the first product_id in the page is used.
+  - a synthetic PDP (--products N embedded product records, target in the middle), so the
+    benchmark also runs on a fresh checkout.
+
+With Playwright installed each page is loaded into Chromium and both paths are timed end to end
+(IPC + parsing). Without it (or when Chromium cannot launch) only the Python side of the legacy path is timed.
+
+Usage:
+    python benchmarks/bench_pdp_extractor.py [--products 150] [--repeat 5] [--no-browser] [--out results.json]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scrapers.extractors import PDP_DETAILS_JS, apply_pdp_details
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SECTIONS_TEXT = ("Manufacturer Details\nHindustan Foods Ltd, Plot 12\nMumbai 400001\n\n"
+                 "Marketed By\nBrand Consumer Products Pvt Ltd\n\n"
+                 "Sold By\nKemexel Ecommerce Private Limited\n\n")
+
+
+def synthetic_pdp(n_products: int):
+    """(html, body_text, target_id): escaped product records in Flight chunks, like the live PDPs."""
+    records = []
+    for i in range(n_products):
+        records.append({
+            "product_id": 100000 + i, "name": f"Product {i} 500 g", "brand": f"Brand{i % 30}",
+            "price": 50 + i, "mrp": 60 + i, "inventory": i % 9, "unit": "500 g",
+            "image_url": f"https://cdn.example.com/{i}.jpg", "description": "Lorem ipsum " * 20,
+            "attributes": [{"key": "Shelf Life", "value": "6 months"}, {"key": "Type", "value": "Veg"}],
+        })
+    target_id = str(100000 + n_products // 2)
+    chunks = []
+    for start in range(0, len(records), 10):
+        payload = json.dumps(records[start:start + 10])
+        escaped = payload.replace("\\", "\\\\").replace('"', '\\"')
+        chunks.append(f'<script>self.__next_f.push([1,"{escaped}"])</script>')
+    body_text = f"Product {n_products // 2} 500 g\nAdd to cart\n\n" + SECTIONS_TEXT + "Similar products\n" * 50
+    markup = "".join(f"<div class='ProductCard'><span>Card {i}</span></div>" for i in range(n_products))
+    html = (f"<html><head>{''.join(chunks)}</head><body><h1>Product {n_products // 2} 500 g</h1>"
+            f"<pre>{body_text}</pre>{markup}</body></html>")
+    return html, body_text, target_id
+
+
+def legacy_parse(content: str, text_content: str, target_id: str) -> dict:
+    """scrape_availability before the extractor: unescape whole HTML, raw_decode every product_id, regex per section."""
+    normalized_content = content.replace(r'\"', '"').replace(r'\\', '\\')
+    decoder = json.JSONDecoder()
+    target_data = None
+    for match in re.finditer(r'\{"product_id":', normalized_content):
+        try:
+            p_data, _ = decoder.raw_decode(normalized_content, match.start())
+            if isinstance(p_data, dict) and str(p_data.get('product_id')) == target_id:
+                target_data = p_data
+                break
+        except Exception:
+            continue
+
+    def extract_section(keyword):
+        match = re.search(f"{keyword}\\n(.*?)(?:\\n\\n|\\Z)", text_content, re.IGNORECASE | re.DOTALL)
+        return match.group(1).strip() if match else None
+
+    return {
+        "product": target_data,
+        "manufacturer": extract_section("Manufacturer Details"),
+        "marketer": extract_section("Marketed By"),
+        "seller": extract_section("Seller Details") or extract_section("Sold By"),
+    }
+
+
+def load_pages(n_products: int):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.pdp.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        name = os.path.basename(path)
+        m = re.search(r'_(\d+)\.pdp\.html$', name) or re.search(r'\\?"product_id\\?":\s*(\d+)', html)
+        # Offline approximation of inner_text("body"); the browser run uses the real one
+        body_text = re.sub(r'<[^>]+>', '\n', html)
+        pages[name] = (html, body_text, m.group(1) if m else "")
+    pages[f"synthetic_{n_products}"] = synthetic_pdp(n_products)
+    return pages
+
+
+def summarize(runs, extra):
+    return {"median_ms": round(statistics.median(runs) * 1000, 2), "min_ms": round(min(runs) * 1000, 2), **extra}
+
+
+def bench_offline(html, body_text, target_id, repeat):
+    runs = []
+    found = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        found = legacy_parse(html, body_text, target_id)
+        runs.append(time.perf_counter() - t0)
+    return {"legacy_python": summarize(runs, {"ipc_bytes": len(html.encode()) + len(body_text.encode()),
+                                              "found": bool(found["product"])})}
+
+
+async def bench_browser(pages, repeat):
+    from playwright.async_api import async_playwright
+
+    results = {}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for name, (html, _, target_id) in pages.items():
+            await page.set_content(html)
+            legacy_runs, new_runs = [], []
+            legacy_bytes = new_bytes = 0
+            legacy = new = {}
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                content = await page.content()
+                text_content = await page.inner_text("body")
+                legacy = legacy_parse(content, text_content, target_id)
+                legacy_runs.append(time.perf_counter() - t0)
+                legacy_bytes = len(content.encode()) + len(text_content.encode())
+
+                t0 = time.perf_counter()
+                raw = await page.evaluate(PDP_DETAILS_JS, target_id)
+                new = json.loads(raw)
+                new_runs.append(time.perf_counter() - t0)
+                new_bytes = len(raw.encode())
+
+            same = (apply_pdp_details({"availability": "Unknown"}, new)
+                    == apply_pdp_details({"availability": "Unknown"}, legacy))
+            results[name] = {
+                "legacy": summarize(legacy_runs, {"ipc_bytes": legacy_bytes, "found": bool(legacy["product"])}),
+                "extractor": summarize(new_runs, {"ipc_bytes": new_bytes, "found": bool(new["product"])}),
+                "same_result": same,
+            }
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the single-evaluate PDP extractor")
+    parser.add_argument("--products", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-browser", action="store_true", help="Only time the legacy Python parsing")
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    pages = load_pages(args.products)
+    browser_results = None
+    if not args.no_browser:
+        try:
+            browser_results = asyncio.run(bench_browser(pages, args.repeat))
+        except ImportError:
+            print("Playwright not installed: timing the legacy Python side only.")
+        except Exception as e:
+            # e.g. Playwright installed without a browser binary (`playwright install chromium`)
+            reason = (str(e).strip().splitlines() or [type(e).__name__])[0]
+            print(f"Could not launch Chromium ({reason}): timing the legacy Python side only.")
+
+    results = []
+    for name, (html, body_text, target_id) in pages.items():
+        row = {"page": name, "html_bytes": len(html.encode()), "target_id": target_id}
+        if browser_results:
+            row.update(browser_results[name])
+        else:
+            row.update(bench_offline(html, body_text, target_id, args.repeat))
+        results.append(row)
+
+        print(f"\n{name} ({row['html_bytes'] / 1_000_000:.2f} MB, prid {target_id or '?'})")
+        for key in ("legacy", "extractor", "legacy_python"):
+            if key in row:
+                r = row[key]
+                print(f"  {key:<14} {r['median_ms']:>9.2f} ms  {r['ipc_bytes'] / 1000:>9.1f} KB over IPC  found={r['found']}")
+        if "same_result" in row:
+            print(f"  same result: {row['same_result']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
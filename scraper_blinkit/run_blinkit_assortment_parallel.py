@@ -1,16 +1,45 @@
+import argparse
 import asyncio
 import logging
+import math
 import random
 import os
-import csv
+import collections
+import time
 from datetime import datetime
 import pandas as pd
 from scrapers.blinkit import BlinkitScraper
+from scrapers.browser_pool import BrowserPool
+from scrapers.blocking import DEFAULT_POLICY
+from scrapers.extractors import EXTRACTION_STATS
+from scrapers.rate_limit import DEFAULT_LIMITER
+from scrapers.readiness import READINESS_STATS
+from scrapers.proxy_manager import DEFAULT_PROXY_MANAGER
+from scrapers.circuit_breaker import DEFAULT_BREAKER
+from scrapers.recycling import DEFAULT_RECYCLE_POLICY
+from scrapers.storefront import DEFAULT_STOREFRONT
+from scrapers.concurrency import AIMDController, AdaptiveSemaphore, classify, OK, BLOCKED
+from utils.store_dedup import StoreMap, resolve_stores, group_by_store, fan_out
+from utils.run_journal import RunJournal, split_by_progress
+from utils.sinks import SINKS, DEFAULT_ROW_GROUP_SIZE, open_sink
+from uploader import BulkUploader, DatabaseSink, PostgrestClient
+from upload_blinkit_data import clean_csv_keys, DEAD_LETTER_FILE
 
 # Configuration
 INPUT_FILE = "pin_codes.xlsx"
 OUTPUT_FILE = f"blinkit_assortment_parallel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-MAX_WORKERS = 2  # Reduced from 12 to prevent MemoryError
+MAX_WORKERS = 10  # Workers share POOL_BROWSERS Chromium processes (was 2 with one browser per worker)
+POOL_BROWSERS = 2
+USE_NEXT_DATA_ROUTE = True  # Fetch /_next/data JSON instead of rendering each category page
+DEDUP_BY_STORE = True  # Crawl each dark store (merchant) once and copy rows to the pincodes it serves
+ADAPTIVE_CONCURRENCY = True  # AIMD-tune active workers and tabs per worker (fixed at the values below when off)
+INITIAL_WORKERS = 3  # Grows towards max_workers while latency and block rates stay healthy
+TAB_CONCURRENCY = 4  # Initial tabs per worker
+MAX_TAB_CONCURRENCY = 12
+OUTPUT_FORMAT = "csv"  # "parquet" writes a dictionary-encoded Parquet dataset (needs pyarrow)
+ROW_GROUP_SIZE = DEFAULT_ROW_GROUP_SIZE  # Rows per Parquet row group / part file
+STREAM_TO_DB = False  # Upload batches while scraping instead of re-reading the output file afterwards
+DB_TABLE = "blinkit_products"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -21,68 +50,116 @@ logger = logging.getLogger("Parallel_Assortment_Runner")
 # Given memory constraints for huge datasets, let's have each worker write to its own temp file or use a thread-safe queue.
 # Simple approach: Workers put results into a thread-safe Async Queue, separate Writer task saves them.
 
-async def writer_task(queue: asyncio.Queue, filename: str):
-    """Listens for data batches and appends to CSV."""
-    file_initialized = False
+async def writer_task(queue: asyncio.Queue, sink, journal: RunJournal = None, db_sink: DatabaseSink = None):
+    """
+    Listens for (rows, units) batches and writes the rows to the output sink
+    (and, with a db_sink, streams them to the database as well).
+    Finished units are journalled with the sink position after their rows (see RunJournal),
+    once those rows are actually in the output (a Parquet sink buffers a row group first).
+    """
     total_count = 0
-    
+    held = collections.deque()  # (units, position) waiting for their rows to reach the output
+
+    def commit_ready():
+        while held and held[0][1] <= sink.position():
+            units, position = held.popleft()
+            journal.record(units, position)
+        if journal.due():
+            # Rows must be on disk before the journal says they are
+            sink.sync()
+            journal.flush()
+
     while True:
         try:
-            batch = await queue.get()
-            if batch is None: # Poison pill
+            item = await queue.get()
+            if item is None: # Poison pill
                 queue.task_done()
                 break
+            batch, units = item
                 
             # Filter dummy status messages (dictionaries with only status)
             valid_products = [p for p in batch if 'price' in p or 'mrp' in p]
             
+            position = sink.write(valid_products)
+            if db_sink:
+                await db_sink.put(valid_products)
             if valid_products:
-                mode = 'a' if file_initialized else 'w'
-                with open(filename, mode, newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=valid_products[0].keys())
-                    if not file_initialized:
-                        writer.writeheader()
-                        file_initialized = True
-                    writer.writerows(valid_products)
                 count = len(valid_products)
                 total_count += count
                 logger.info(f"💾 Saved {count} products. Total: {total_count}")
+
+            if journal:
+                if units:
+                    held.append((units, position))
+                commit_ready()
             
             queue.task_done()
         except Exception as e:
             logger.error(f"Writer task error: {e}")
+
+    sink.close() # Writes a Parquet sink's last row group and fsyncs
+    if db_sink:
+        stats = await db_sink.close()
+        logger.info(f"📤 Streamed {stats['uploaded']}/{stats['rows']} rows to {db_sink.table} ({stats['dead_lettered']} dead-lettered)")
+    if journal:
+        commit_ready()
+        journal.flush()
             
     return total_count
 
-async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queue, proxy=None):
+async def worker(name: str, store_queue: asyncio.Queue, result_queue: asyncio.Queue, proxy=None, pool: BrowserPool = None,
+                 journal: RunJournal = None, done: dict = None,
+                 worker_gate: AdaptiveSemaphore = None, tab_controller: AIMDController = None):
     """
     Worker:
-    1. Gets Pincode
-    2. Scrapes *All* Categories for that pincode
-    3. Pushes data to Result Queue
+    1. Gets a StoreGroup (one store + the pincodes it serves)
+    2. Scrapes *All* Categories once, located at the group's first pincode
+    3. Pushes a copy of the data per served pincode to Result Queue
+
+    `done` maps pincode -> categories already finished in the run being resumed.
+    `worker_gate` caps how many workers crawl at once; the rest wait (without a browser
+    context) until its controller raises the limit or another worker finishes a store.
     """
     logger.info(f"Worker {name} starting...")
-    scraper = BlinkitScraper(headless=True, proxy=proxy)
+    done = done or {}
+    scraper = BlinkitScraper(headless=True, proxy=proxy, pool=pool, tab_controller=tab_controller)
     
     try:
-        await scraper.start()
-        
         while True:
             try:
-                pincode = pin_queue.get_nowait()
+                group = store_queue.get_nowait()
             except asyncio.QueueEmpty:
                 break
+
+            if worker_gate:
+                await worker_gate.acquire()
+            group_started = time.perf_counter()
+            outcome = OK
+            categories = []
             
-            logger.info(f"[{name}] Starting Pincode: {pincode}")
+            pincode = group.pincode
+            logger.info(f"[{name}] Starting Pincode: {pincode} (store {group.store_id}, serves {len(group.pincodes)} pincodes)")
             
             try:
-                # 1. Set Location
+                if not scraper.browser:
+                    await scraper.start()
+                # 1. Set Location (a recycle that is due happens first; no need to restore the old location)
+                await scraper.maybe_recycle(relocate=False)
                 await scraper.set_location(pincode)
                 
                 # 2. Get Categories
-                await asyncio.sleep(2)
+                if DEFAULT_STOREFRONT.human_delays:
+                    await asyncio.sleep(2)
                 categories = await scraper.get_all_categories()
                 logger.info(f"[{name}] Found {len(categories)} categories to scrape for {pincode}")
+                if journal:
+                    for served_pincode in group.pincodes:
+                        journal.plan(served_pincode, categories)
+                # Resumed group: all its pincodes share the same finished categories
+                finished = done.get(pincode, set())
+                if finished:
+                    categories = [c for c in categories if c not in finished]
+                    logger.info(f"[{name}] Resuming {pincode}: {len(finished)} categories already done, {len(categories)} left")
                 
                 # Limit categories for speed if testing (Check if we want ALL or Top 5)
                 # User asked for equivalent of 'assortment' functionality which is usually ALL.
@@ -94,28 +171,47 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
                 
                 # We can batch categories if needed, but the method handles semaphore
                 # However, for 6 workers * 4 tabs = 24 concurrent tabs total. Safe.
-                products = await scraper.scrape_categories_parallel(list(categories), pincode=pincode, concurrency=4)
+                if USE_NEXT_DATA_ROUTE:
+                    # JSON-only fetches from the located tab; falls back to tabs if the buildId rotates
+                    products = await scraper.scrape_categories_next_data(list(categories), pincode=pincode)
+                    if scraper.blocked:
+                        # Rows scraped before the block are kept; the rest stay unjournalled for the resume
+                        outcome = BLOCKED
+                        logger.error(f"🛑 [{name}] BLOCKED by WAF on {pincode}: {scraper.blocked}. Keeping the categories scraped so far.")
+                else:
+                    products = await scraper.scrape_categories_parallel(list(categories), pincode=pincode, concurrency=TAB_CONCURRENCY)
                 
+                # Scraped categories (even empty ones) are finished for every served pincode;
+                # failed ones stay unjournalled so a resume retries them
+                failed = set(scraper.failed_category_urls)
+                finished_now = [c for c in categories if c not in failed]
+                rows_by_pincode = fan_out(products, group) if products else {p: [] for p in group.pincodes}
+                for served_pincode, rows in rows_by_pincode.items():
+                    await result_queue.put((rows, [(served_pincode, c) for c in finished_now]))
                 if products:
-                    await result_queue.put(products)
-                    logger.info(f"[{name}] Pincode {pincode} complete. Scraped {len(products)} total items.")
+                    logger.info(f"[{name}] Pincode {pincode} complete. Scraped {len(products)} total items "
+                                f"(copied to {len(group.pincodes)} pincodes).")
                 
                 # No need for per-category loop delay anymore
                 
                 
             except Exception as e:
-                if "BLOCKED_BY_WAF" in str(e):
-                    logger.error(f"🛑 CRITICAL: Worker {name} BLOCKED by WAF. Terminating worker.")
-                    # Optionally signal global stop, for now just break this worker
-                    break
-                logger.error(f"[{name}] Failed processing {pincode}: {e}")
+                outcome = classify(e)
+                if outcome == BLOCKED:
+                    # The circuit breaker has paused every worker on the site and will resume them
+                    # after a clean canary; this group's categories stay unjournalled for the resume
+                    logger.error(f"🛑 [{name}] BLOCKED by WAF on {pincode}: {e}. Moving on once the site reopens.")
+                else:
+                    logger.error(f"[{name}] Failed processing {pincode}: {e}")
+            finally:
+                # Always hand the slot back (cancellation included), or the gate shrinks for good
+                if worker_gate:
+                    # Latency per category, so large and small stores compare fairly
+                    elapsed = time.perf_counter() - group_started
+                    worker_gate.controller.record(elapsed / max(1, len(categories)), outcome)
+                    worker_gate.release()
                 
-            pin_queue.task_done()
-            
-            # Anti-ban break
-            delay = random.uniform(10, 20)
-            logger.info(f"[{name}] Use finished {pincode}. Cooling down for {delay:.0f}s...")
-            await asyncio.sleep(delay)
+            store_queue.task_done()
                 
     except Exception as e:
         logger.error(f"[{name}] Crashed: {e}")
@@ -124,16 +220,27 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
         logger.info(f"Worker {name} retired.")
 
 
-async def run_scraping(input_file="pin_codes.xlsx", max_workers=6):
+async def run_scraping(input_file="pin_codes.xlsx", max_workers=6, pool_browsers=POOL_BROWSERS, resume_run_id=None,
+                       output_format=OUTPUT_FORMAT, stream_to_db=STREAM_TO_DB):
     """
     Main entry point for scraping. 
-    Returns the path to the output CSV file if successful, else None.
+    Returns the path to the output file (CSV, or a Parquet dataset directory) if successful, else None.
+
+    `resume_run_id` (the timestamp in a previous output file name) continues a
+    crashed run from its journal instead of starting over (with the same output_format).
+    `stream_to_db` uploads rows to DB_TABLE as they are written, so no upload pass is needed afterwards.
     """
     if not os.path.exists(input_file):
         logger.error(f"Input file {input_file} not found.")
         return None
 
-    output_file = f"blinkit_assortment_parallel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    run_id = resume_run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+    sink_cls = SINKS[output_format]
+    output_file = f"blinkit_assortment_parallel_{run_id}{sink_cls.extension}"
+    journal_file = RunJournal.path_for(output_file)
+    if resume_run_id and not os.path.exists(journal_file):
+        logger.error(f"No journal found for run {resume_run_id} ({journal_file})")
+        return None
 
     # 1. Read Inputs
     try:
@@ -160,37 +267,92 @@ async def run_scraping(input_file="pin_codes.xlsx", max_workers=6):
         logger.error(f"Failed to read input: {e}")
         return None
 
+    # Resume: drop rows after the last committed offset, skip finished pincodes
+    journal = RunJournal(journal_file)
+    done = {}
+    if resume_run_id:
+        sink_cls.truncate(output_file, journal.committed_offset())
+        completed = journal.completed_pincodes()
+        done = journal.done_categories()
+        pincodes = [p for p in pincodes if p not in completed]
+        logger.info(f"♻️ Resuming run {run_id}: {len(completed)} pincodes complete, {len(pincodes)} to go")
+    else:
+        journal.set_meta("input_file", input_file)
+    if not pincodes:
+        journal.close()
+        logger.info(f"Nothing left to scrape. Output: {output_file}")
+        return output_file
+
     import time
     start_time = time.time()
     
     # 2. Setup Queues
-    pin_queue = asyncio.Queue()
+    store_queue = asyncio.Queue()
     result_queue = asyncio.Queue()
-    
-    for p in pincodes:
-        pin_queue.put_nowait(p)
+
+    db_sink = None
+    if stream_to_db:
+        client = PostgrestClient.from_env()
+        if client:
+            db_sink = DatabaseSink(BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE), DB_TABLE, transform=clean_csv_keys)
+        else:
+            logger.warning("Streaming needs SUPABASE_URL/SUPABASE_KEY or POSTGREST_URL; rows are only written to the output file.")
 
     # 3. Launch Writer
-    writer = asyncio.create_task(writer_task(result_queue, output_file))
+    writer = asyncio.create_task(writer_task(result_queue, open_sink(output_format, output_file, ROW_GROUP_SIZE),
+                                             journal, db_sink))
 
     # 4. Launch Workers
     workers = []
     # If list is small, don't spin up too many workers
     actual_workers = min(max_workers, len(pincodes))
-    
-    logger.info(f"Starting scraping with {actual_workers} workers...")
 
-    for i in range(actual_workers):
-        w = asyncio.create_task(worker(f"W-{i+1}", pin_queue, result_queue))
-        workers.append(w)
-        await asyncio.sleep(random.uniform(2, 5))
+    # Shared browsers: each worker leases an isolated context instead of launching Chromium
+    pool = BrowserPool(headless=True, size=min(pool_browsers, actual_workers),
+                       max_contexts_per_browser=math.ceil(actual_workers / pool_browsers))
+    await pool.start()
 
-    # Wait for workers
-    await asyncio.gather(*workers)
+    try:
+        # Resolve pincode -> store first so every store is crawled only once
+        if DEDUP_BY_STORE:
+            stores = await resolve_stores(pincodes, lambda: BlinkitScraper(headless=True, pool=pool),
+                                          StoreMap(DEFAULT_STOREFRONT.namespace("blinkit")), concurrency=actual_workers)
+        else:
+            stores = {p: None for p in pincodes}
+        groups = group_by_store(stores)
+        if done:
+            groups = split_by_progress(groups, done)
+        for g in groups:
+            store_queue.put_nowait(g)
+
+        actual_workers = min(actual_workers, len(groups))
+        # max_workers is the ceiling; the controllers decide how much of it is used
+        if ADAPTIVE_CONCURRENCY:
+            worker_controller = AIMDController("workers", INITIAL_WORKERS, maximum=actual_workers, window=max(2, actual_workers))
+            tab_controller = AIMDController("tabs", TAB_CONCURRENCY, maximum=MAX_TAB_CONCURRENCY)
+        else:
+            worker_controller = AIMDController("workers", actual_workers, minimum=actual_workers, maximum=actual_workers)
+            tab_controller = AIMDController("tabs", TAB_CONCURRENCY, minimum=TAB_CONCURRENCY, maximum=TAB_CONCURRENCY)
+        worker_gate = worker_controller.semaphore()
+        logger.info(f"Starting scraping with up to {actual_workers} workers ({worker_controller.limit} active) on {pool.size} browsers...")
+
+        for i in range(actual_workers):
+            w = asyncio.create_task(worker(f"W-{i+1}", store_queue, result_queue, pool=pool,
+                                           journal=journal, done=done,
+                                           worker_gate=worker_gate, tab_controller=tab_controller))
+            workers.append(w)
+            if DEFAULT_STOREFRONT.human_delays:
+                await asyncio.sleep(random.uniform(2, 5))
+
+        # Wait for workers
+        await asyncio.gather(*workers)
+    finally:
+        await pool.stop()
     
     # Signal writer to stop
     await result_queue.put(None)
     total_products = await writer
+    journal.close()
     
     end_time = time.time()
     duration_seconds = end_time - start_time
@@ -199,31 +361,86 @@ async def run_scraping(input_file="pin_codes.xlsx", max_workers=6):
     logger.info(f"All done! Output saved to: {output_file}")
     
     # --- Performance Reporting ---
+    blocking = DEFAULT_POLICY.summary()
+    logger.info(f"🚫 Blocked {blocking['requests_blocked']} requests in-browser (~{blocking['mb_saved_estimate']} MB saved): {blocking['by_type']}")
+    extraction = EXTRACTION_STATS.summary()
+    logger.info(f"📦 {extraction['evaluate_calls']} extraction evaluates, {extraction['payload_mb']} MB over IPC "
+                f"(avg {extraction['avg_payload_kb']} KB), {extraction['parse_ms']} ms parsing")
+    readiness = READINESS_STATS.summary()
+    logger.info(f"⏩ {readiness['ready_early']}/{readiness['waits']} readiness waits resolved early, {readiness['saved_s']}s of fixed waits saved")
+    pacing = DEFAULT_LIMITER.summary()
+    for domain, s in pacing.items():
+        logger.info(f"⏱️ {domain}: {s['requests']} requests, waited {s['wait_seconds']}s in the rate limiter ({s['waits']} waits)")
+    for domain, c in DEFAULT_BREAKER.summary().items():
+        if c["trips"]:
+            logger.info(f"🛑 {domain}: circuit tripped {c['trips']} times, {c['canaries']} canaries, paused {c['paused_s']}s (now {c['state']})")
+    recycling = DEFAULT_RECYCLE_POLICY.summary()
+    logger.info(f"♻️ Recycled {recycling['context_recycles']} contexts and {recycling['browser_restarts']} browsers "
+                f"(browser tree RSS peak {recycling['peak_rss_mb']} MB)")
+    proxies = DEFAULT_PROXY_MANAGER.summary()
+    if proxies["proxies"]:
+        logger.info(f"🌐 Proxies: {proxies['benched']}/{proxies['proxies']} benched, {proxies['bans']} bans, "
+                    f"{proxies['sticky_sessions']} sticky sessions, best {proxies['best']}")
+    workers_aimd = worker_controller.summary()
+    tabs_aimd = tab_controller.summary()
+    logger.info(f"🎚️ Concurrency: workers {workers_aimd['limit']} (peak {workers_aimd['peak']}), "
+                f"tabs {tabs_aimd['limit']} (peak {tabs_aimd['peak']}), "
+                f"{workers_aimd['changes'] + tabs_aimd['changes']} adjustments")
     try:
         metrics = {
             "Metric": [
                 "Total Pincodes Processed",
+                "Unique Stores Crawled",
                 "Total Products Scraped",
                 "Total Time (Seconds)",
                 "Total Time (Minutes)",
                 "Average Time per Pincode (s)",
                 "Scraping Speed (Products/Min)",
+                "Requests Blocked (CDP)",
+                "Est. MB Saved by Blocking",
+                "Extraction Payload (MB)",
+                "Extraction Parse Time (ms)",
+                "Worker Concurrency (Final / Peak)",
+                "Tab Concurrency (Final / Peak)",
+                "Concurrency Adjustments",
+                "Rate Limiter Wait (s)",
+                "Readiness Waits Resolved Early",
+                "Fixed-Wait Time Saved (s)",
+                "Blocks / Timeouts Seen",
                 "Output File"
             ],
             "Value": [
                 len(pincodes),
+                len(groups),
                 total_products,
                 f"{duration_seconds:.2f}",
                 f"{duration_minutes:.2f}",
                 f"{duration_seconds / len(pincodes) if pincodes else 0:.2f}",
                 f"{total_products / duration_minutes if duration_minutes > 0 else 0:.2f}",
+                blocking['requests_blocked'],
+                blocking['mb_saved_estimate'],
+                extraction['payload_mb'],
+                extraction['parse_ms'],
+                f"{workers_aimd['limit']} / {workers_aimd['peak']}",
+                f"{tabs_aimd['limit']} / {tabs_aimd['peak']}",
+                workers_aimd['changes'] + tabs_aimd['changes'],
+                round(sum(s['wait_seconds'] for s in pacing.values()), 1),
+                f"{readiness['ready_early']} / {readiness['waits']}",
+                readiness['saved_s'],
+                f"{workers_aimd['blocked'] + tabs_aimd['blocked']} / {workers_aimd['timeout'] + tabs_aimd['timeout']}",
                 output_file
             ]
         }
         
         perf_df = pd.DataFrame(metrics)
         perf_file = f"performance_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        perf_df.to_excel(perf_file, index=False)
+        decisions = worker_controller.decisions + tab_controller.decisions
+        with pd.ExcelWriter(perf_file) as xls:
+            perf_df.to_excel(xls, sheet_name="Summary", index=False)
+            if decisions:
+                # Every AIMD step with its reason, in the order they happened
+                decisions_df = pd.DataFrame(decisions).sort_values("time", kind="stable")
+                decisions_df.to_excel(xls, sheet_name="Concurrency Decisions", index=False)
         logger.info(f"📊 Performance report saved to: {perf_file}")
         
     except Exception as e:
@@ -232,6 +449,20 @@ async def run_scraping(input_file="pin_codes.xlsx", max_workers=6):
     return output_file
 
 if __name__ == "__main__":
-    # For backward compatibility
-    asyncio.run(run_scraping(INPUT_FILE, MAX_WORKERS))
+    parser = argparse.ArgumentParser(description="Blinkit parallel assortment scraper")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a crashed run, e.g. 20250101_120000 from blinkit_assortment_parallel_20250101_120000.csv")
+    parser.add_argument("--format", choices=sorted(SINKS), default=OUTPUT_FORMAT,
+                        help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--stream-db", action="store_true", default=STREAM_TO_DB,
+                        help="Upload rows to the database while scraping")
+    parser.add_argument("--base-url", help="Scrape this origin instead of blinkit.com, e.g. benchmarks/mock_storefront.py")
+    parser.add_argument("--no-human-delay", action="store_true",
+                        help="Benchmark mode: skip human-like pauses and start-up staggers")
+    args = parser.parse_args()
+    DEFAULT_STOREFRONT.configure(args.base_url, human_delays=not args.no_human_delay)
+    asyncio.run(run_scraping(args.input, args.workers, resume_run_id=args.resume, output_format=args.format,
+                             stream_to_db=args.stream_db))
 
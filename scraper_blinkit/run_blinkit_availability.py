@@ -59,13 +59,8 @@ async def main():
     try:
         await scraper.start()
         
+        # Pacing comes from the scraper's per-domain rate limiter instead of coffee breaks
         for i, pincode in enumerate(pincodes):
-            # Batching / Coffee Break Logic
-            if i > 0 and i % 15 == 0:
-                rest_time = random.uniform(45, 90)
-                logger.info(f"☕ COFFEE BREAK: Pausing for {rest_time:.0f}s to avoid bot detection...")
-                await asyncio.sleep(rest_time)
-
             logger.info(f"[{i+1}/{len(pincodes)}] Processing Pincode: {pincode}")
             
             try:
@@ -77,16 +72,12 @@ async def main():
                         res = await scraper.scrape_availability(url)
                         res["input_pincode"] = pincode
                         results.append(res)
-                        await scraper.human_delay(1, 3) 
                 else: 
                      # If just verifying pincode works/assortment
                      pass
                      
             except Exception as e:
                 logger.error(f"Failed to process {pincode}: {e}")
-                
-            # Random delay between pincodes
-            await scraper.human_delay(3, 8)
                     
     except Exception as e:
         logger.error(f"Global scraping error: {e}", exc_info=True)
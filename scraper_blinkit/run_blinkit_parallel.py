@@ -1,27 +1,40 @@
 import asyncio
 import logging
+import math
 import random
 import os
 from datetime import datetime
 import pandas as pd
 from scrapers.blinkit import BlinkitScraper
+from scrapers.browser_pool import BrowserPool
+from scrapers.blocking import DEFAULT_POLICY
+from scrapers.extractors import EXTRACTION_STATS
+from scrapers.readiness import READINESS_STATS
+from scrapers.proxy_manager import DEFAULT_PROXY_MANAGER
+from scrapers.circuit_breaker import DEFAULT_BREAKER
+from scrapers.recycling import DEFAULT_RECYCLE_POLICY
+from scrapers.rate_limit import DEFAULT_LIMITER
 
 # Configuration
 INPUT_FILE = "pin_codes_100.xlsx"
 OUTPUT_FILE = f"blinkit_availability_parallel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 MAX_WORKERS = 2  # Reduced from 4 to avoid blocking
+POOL_BROWSERS = 1  # Workers lease contexts from a single shared Chromium process
+AVAILABILITY_TABS = 4  # Product pages checked at once per located worker
+TAB_TIMEOUT_S = 45  # Per-tab ceiling so one slow PDP can't hold up the batch
+RECYCLE_CHECK_EVERY = 100  # URLs between context recycle checkpoints
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Parallel_Runner")
 
-async def worker(name: str, queue: asyncio.Queue, urls: list, results: list):
+async def worker(name: str, queue: asyncio.Queue, urls: list, results: list, pool: BrowserPool = None):
     """
     Worker pulling pincodes from queue and processing them.
-    Each worker gets its own Scraper (Browser) instance.
+    Each worker gets its own Scraper (isolated context on a pooled browser).
     """
     logger.info(f"Worker {name} starting...")
-    scraper = BlinkitScraper(headless=True) 
+    scraper = BlinkitScraper(headless=True, pool=pool)
     
     try:
         await scraper.start()
@@ -35,22 +48,24 @@ async def worker(name: str, queue: asyncio.Queue, urls: list, results: list):
             logger.info(f"[{name}] Processing Pincode: {pincode}")
             
             try:
-                # 1. Set Location
+                # 1. Set Location (a recycle that is due happens first; no need to restore the old location)
+                await scraper.maybe_recycle(relocate=False)
                 await scraper.set_location(pincode)
                 
                 # 2. Scrape Data
                 if urls:
-                    for url in urls:
-                        try:
-                            # Random delay between products
-                            await asyncio.sleep(random.uniform(1, 3))
-                            
-                            res = await scraper.scrape_availability(url)
-                            res["input_pincode"] = pincode
-                            results.append(res)
-                            logger.info(f"[{name}] Scraped {url}")
-                        except Exception as e:
-                            logger.error(f"[{name}] Failed URL {url}: {e}")
+                    # All URLs through a bounded set of tabs in this located context
+                    # (pacing comes from the scraper's per-domain rate limiter, not sleeps),
+                    # in chunks so the context can be recycled (location restored) in between
+                    checked = []
+                    for start in range(0, len(urls), RECYCLE_CHECK_EVERY):
+                        await scraper.maybe_recycle()
+                        checked += await scraper.scrape_availability_parallel(
+                            urls[start:start + RECYCLE_CHECK_EVERY], pincode=pincode,
+                            concurrency=AVAILABILITY_TABS, tab_timeout=TAB_TIMEOUT_S)
+                    results.extend(checked)
+                    failed = sum(1 for r in checked if r["error"])
+                    logger.info(f"[{name}] Checked {len(checked)} URLs for {pincode} ({failed} failed)")
                 else:
                     # Just logging location success if no URLs
                     results.append({
@@ -63,16 +78,6 @@ async def worker(name: str, queue: asyncio.Queue, urls: list, results: list):
                 logger.error(f"[{name}] Failed pincode {pincode}: {e}")
                 
             queue.task_done()
-            
-            # Anti-ban break between tasks for this worker
-            delay = random.uniform(15, 30)
-            await asyncio.sleep(delay)
-            
-            # Occasional Long Break (Coffee P break per worker)
-            if random.random() < 0.1: # 10% chance
-                long_break = random.uniform(30, 60)
-                logger.info(f"[{name}] Taking a short rest for {long_break:.0f}s...")
-                await asyncio.sleep(long_break)
                 
     except Exception as e:
         logger.error(f"[{name}] Crashed: {e}")
@@ -114,15 +119,21 @@ async def main():
     # 3. Launch Workers
     results = []
     workers = []
-    for i in range(MAX_WORKERS):
-        w = asyncio.create_task(worker(f"W-{i+1}", queue, urls_to_check, results))
-        workers.append(w)
-        # Stagger start times slightly
-        await asyncio.sleep(random.uniform(2, 5))
+    pool = BrowserPool(headless=True, size=POOL_BROWSERS,
+                       max_contexts_per_browser=math.ceil(MAX_WORKERS / POOL_BROWSERS))
+    await pool.start()
+    try:
+        for i in range(MAX_WORKERS):
+            w = asyncio.create_task(worker(f"W-{i+1}", queue, urls_to_check, results, pool=pool))
+            workers.append(w)
+            # Stagger start times slightly
+            await asyncio.sleep(random.uniform(2, 5))
 
-    # Wait for completion
-    logger.info("All systems go. Scraping in progress...")
-    await asyncio.gather(*workers)
+        # Wait for completion
+        logger.info("All systems go. Scraping in progress...")
+        await asyncio.gather(*workers)
+    finally:
+        await pool.stop()
     
     # 4. Save Output (CSV)
     if results:
@@ -131,5 +142,24 @@ async def main():
     else:
         logger.warning("No results to save.")
 
+    blocking = DEFAULT_POLICY.summary()
+    logger.info(f"🚫 Blocked {blocking['requests_blocked']} requests in-browser (~{blocking['mb_saved_estimate']} MB saved)")
+    extraction = EXTRACTION_STATS.summary()
+    logger.info(f"📦 {extraction['evaluate_calls']} extraction evaluates, {extraction['payload_mb']} MB over IPC, {extraction['parse_ms']} ms parsing")
+    readiness = READINESS_STATS.summary()
+    logger.info(f"⏩ {readiness['ready_early']}/{readiness['waits']} readiness waits resolved early, {readiness['saved_s']}s of fixed waits saved")
+    for domain, s in DEFAULT_LIMITER.summary().items():
+        logger.info(f"⏱️ {domain}: {s['requests']} requests, waited {s['wait_seconds']}s in the rate limiter ({s['waits']} waits)")
+    for domain, c in DEFAULT_BREAKER.summary().items():
+        if c["trips"]:
+            logger.info(f"🛑 {domain}: circuit tripped {c['trips']} times, {c['canaries']} canaries, paused {c['paused_s']}s (now {c['state']})")
+    recycling = DEFAULT_RECYCLE_POLICY.summary()
+    logger.info(f"♻️ Recycled {recycling['context_recycles']} contexts and {recycling['browser_restarts']} browsers "
+                f"(browser tree RSS peak {recycling['peak_rss_mb']} MB)")
+    proxies = DEFAULT_PROXY_MANAGER.summary()
+    if proxies["proxies"]:
+        logger.info(f"🌐 Proxies: {proxies['benched']}/{proxies['proxies']} benched, {proxies['bans']} bans, "
+                    f"{proxies['sticky_sessions']} sticky sessions, best {proxies['best']}")
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,15 +2,18 @@ import asyncio
 import logging
 import random
 import os
-import csv
 from datetime import datetime
 import pandas as pd
 from scrapers.blinkit import BlinkitScraper
+from scrapers.concurrency import AIMDController
+from utils.sinks import CsvSink
 import time
 
 # Configuration
 OUTPUT_FILE = f"blinkit_perf_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 MAX_WORKERS = 2 # 1 worker per pincode for this test
+TAB_CONCURRENCY = 5 # Initial tabs per worker; AIMD-tuned between 1 and MAX_TAB_CONCURRENCY
+MAX_TAB_CONCURRENCY = 12
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -19,8 +22,7 @@ logger = logging.getLogger("Perf_Tester")
 # Hardcoded test pincodes
 TEST_PINCODES = ["560001", "110001"] 
 
-async def writer_task(queue: asyncio.Queue, filename: str):
-    file_initialized = False
+async def writer_task(queue: asyncio.Queue, sink):
     total_count = 0
     
     while True:
@@ -32,24 +34,19 @@ async def writer_task(queue: asyncio.Queue, filename: str):
         valid_products = [p for p in products if isinstance(p, dict)]
         
         if valid_products:
-            mode = 'a' if file_initialized else 'w'
-            with open(filename, mode, newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=valid_products[0].keys())
-                if not file_initialized:
-                    writer.writeheader()
-                    file_initialized = True
-                writer.writerows(valid_products)
+            sink.write(valid_products)
             
             count = len(valid_products)
             total_count += count
             logger.info(f"💾 Saved {count} products. Total: {total_count}")
         
         queue.task_done()
+    sink.close()
     return total_count
 
-async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queue):
+async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queue, tab_controller: AIMDController = None):
     logger.info(f"Worker {name} starting...")
-    scraper = BlinkitScraper(headless=False) # Headful for stability
+    scraper = BlinkitScraper(headless=False, tab_controller=tab_controller) # Headful for stability
     
     try:
         await scraper.start()
@@ -72,7 +69,7 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
                 
                 # 3. Parallel Category Scraping (Multi-Tab)
                 # Using the optimized method
-                products = await scraper.scrape_categories_parallel(list(categories), pincode=pincode, concurrency=5)
+                products = await scraper.scrape_categories_parallel(list(categories), pincode=pincode, concurrency=TAB_CONCURRENCY)
                 
                 if products:
                     await result_queue.put(products)
@@ -99,12 +96,13 @@ async def main():
         pin_queue.put_nowait(p)
 
     # Launch Writer
-    writer = asyncio.create_task(writer_task(result_queue, OUTPUT_FILE))
+    writer = asyncio.create_task(writer_task(result_queue, CsvSink(OUTPUT_FILE)))
 
-    # Launch Workers
+    # Launch Workers (tab count shared and tuned across workers)
+    tab_controller = AIMDController("tabs", TAB_CONCURRENCY, maximum=MAX_TAB_CONCURRENCY)
     workers = []
     for i in range(MAX_WORKERS):
-        w = asyncio.create_task(worker(f"W-{i+1}", pin_queue, result_queue))
+        w = asyncio.create_task(worker(f"W-{i+1}", pin_queue, result_queue, tab_controller))
         workers.append(w)
 
     # Wait for workers
@@ -121,19 +119,21 @@ async def main():
     logger.info(f"🏁 Test Complete in {duration:.2f}s ({minutes:.2f}m)")
     logger.info(f"📦 Total Products: {total_products}")
     logger.info(f"⚡ Speed: {total_products / minutes if minutes > 0 else 0:.2f} products/min")
+    tabs = tab_controller.summary()
+    logger.info(f"🎚️ Tabs per worker: {tabs['limit']} (peak {tabs['peak']}, {tabs['changes']} adjustments)")
 
     # Save Metrics
     metrics = {
         "Metric": [
             "Total Pincodes", "Total Products", "Total Time (Seconds)",
             "Total Time (Minutes)", "Avg Time per Pincode (s)", "Speed (Products/Min)", 
-            "Architecture"
+            "Tab Concurrency (Final / Peak)", "Architecture"
         ],
         "Value": [
             len(TEST_PINCODES), total_products, f"{duration:.2f}",
             f"{minutes:.2f}", f"{duration / len(TEST_PINCODES):.2f}",
             f"{total_products / minutes if minutes > 0 else 0:.2f}", 
-            "Hyper-Threaded (Multi-Tab)"
+            f"{tabs['limit']} / {tabs['peak']}", "Hyper-Threaded (Multi-Tab)"
         ]
     }
     perf_df = pd.DataFrame(metrics)
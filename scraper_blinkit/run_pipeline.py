@@ -20,6 +20,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger("Pipeline_Orchestrator")
 
+STREAM_TO_DB = False  # Upload while scraping (skips the separate upload step)
+
 async def main():
     input_file = "pin_codes.xlsx"
     
@@ -32,7 +34,7 @@ async def main():
 
     # Step 1: Run Scraping
     logger.info("--- Step 1: Scraping Data ---")
-    output_csv = await run_scraping(input_file=input_file, max_workers=2)
+    output_csv = await run_scraping(input_file=input_file, max_workers=2, stream_to_db=STREAM_TO_DB)
     
     if not output_csv or not os.path.exists(output_csv):
         logger.error("Scraping failed or produced no output file. Aborting upload.")
@@ -41,8 +43,12 @@ async def main():
     logger.info(f"Scraping completed. CSV ready at: {output_csv}")
 
     # Step 2: Upload Data
-    logger.info("--- Step 2: Uploading Data to Supabase ---")
-    success = process_upload(output_csv, table_name="blinkit_products")
+    if STREAM_TO_DB:
+        logger.info("--- Step 2: Skipped, rows were streamed to Supabase while scraping ---")
+        success = True
+    else:
+        logger.info("--- Step 2: Uploading Data to Supabase ---")
+        success = await process_upload(output_csv, table_name="blinkit_products")
     
     if success:
         logger.info("✅ Pipeline completed successfully!")
@@ -2,8 +2,15 @@ import asyncio
 from playwright.async_api import async_playwright, Page, BrowserContext
 from abc import ABC, abstractmethod
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .models import ProductItem, AvailabilityResult
+from .blocking import BlockingPolicy, DEFAULT_POLICY
+from .rate_limit import RateLimiter, DEFAULT_LIMITER
+from .readiness import READINESS_STATS
+from .recycling import RecyclePolicy, DEFAULT_RECYCLE_POLICY
+from .proxy_manager import ProxyManager, DEFAULT_PROXY_MANAGER
+from .circuit_breaker import CircuitBreaker, BlockedError, DEFAULT_BREAKER, response_block_reason
+from .storefront import Storefront, DEFAULT_STOREFRONT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,28 +19,67 @@ logger = logging.getLogger(__name__)
 import random
 import time
 
+# Anti-detection arguments
+STEALTH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-infobars',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-remote-fonts',
+    '--disable-gpu' # Often helpful in headless
+]
+
+async def launch_browser(playwright, headless: bool):
+    """Launches system Edge, then Chrome, then the bundled Chromium as a fallback."""
+    browsers_to_try = [
+        {'channel': 'msedge'},
+        {'channel': 'chrome'},
+        {}, # Default bundled as fallback
+    ]
+
+    for browser_kwargs in browsers_to_try:
+        # Merge stealth args
+        browser_kwargs['args'] = browser_kwargs.get('args', []) + STEALTH_ARGS
+
+        try:
+            browser = await playwright.chromium.launch(headless=headless, **browser_kwargs)
+            logger.info(f"Launched browser with kwargs: {browser_kwargs}")
+            return browser
+        except Exception as e:
+            logger.warning(f"Failed to launch browser with {browser_kwargs}: {e}")
+
+    raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+
 class BaseScraper(ABC):
-    def __init__(self, headless=False, proxy=None):
+    def __init__(self, headless=False, proxy=None, pool=None, blocking_policy: BlockingPolicy = None,
+                 rate_limiter: RateLimiter = None, proxy_manager: ProxyManager = None,
+                 circuit_breaker: CircuitBreaker = None, recycle_policy: RecyclePolicy = None,
+                 storefront: Storefront = None):
         self.headless = headless
         self.proxy = proxy
+        self.pool = pool # Optional BrowserPool; when set, the browser process is shared
+        self.blocking_policy = blocking_policy or DEFAULT_POLICY
+        self.rate_limiter = rate_limiter or DEFAULT_LIMITER # Paces navigations/fetches per site instead of fixed sleeps
+        self.recycle_policy = recycle_policy or DEFAULT_RECYCLE_POLICY # When to swap a context/browser for a fresh one
+        self.navigations = 0 # goto()s on the current context
+        self.circuit_breaker = circuit_breaker or DEFAULT_BREAKER # Pauses every worker on a site once it starts blocking
+        self.storefront = storefront or DEFAULT_STOREFRONT # Live site or a local mock; human delays on/off
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
-        self.proxies_list = []
-        
-        # Load proxies from file
-        try:
-            with open("proxies.txt", "r") as f:
-                self.proxies_list = [line.strip() for line in f if line.strip() and not line.startswith("#")]
-            logger.info(f"Loaded {len(self.proxies_list)} proxies from proxies.txt")
-        except FileNotFoundError:
-            logger.warning("proxies.txt not found. No proxy rotation available.")
-        except Exception as e:
-            logger.warning(f"Error loading proxies.txt: {e}")
+        self.session_cache = None # Subclasses set a SessionCache to persist located sessions
+        self.category_cache = None # Subclasses set a CategoryCache to reuse discovered category trees
+        self.current_pincode = None
+        # proxies.txt is loaded (with last run's scores) by the manager on first use
+        self.proxy_manager = proxy_manager or DEFAULT_PROXY_MANAGER
+        self.current_proxy = None # proxies.txt entry the current context goes through
 
     async def human_delay(self, min_seconds=1.0, max_seconds=3.0):
-        """Random delay to simulate human reaction time."""
+        """Random delay to simulate human reaction time (none in benchmark mode)."""
+        if not self.storefront.human_delays:
+            return
         delay = random.uniform(min_seconds, max_seconds)
         logger.debug(f"Sleeping for {delay:.2f}s")
         await asyncio.sleep(delay)
@@ -55,6 +101,9 @@ class BaseScraper(ABC):
     async def human_type(self, selector: str, text: str):
         """Types text with random delays between keystrokes."""
         await self.page.focus(selector)
+        if not self.storefront.human_delays:
+            await self.page.keyboard.type(text)
+            return
         for char in text:
             await self.page.keyboard.type(char)
             # Random typing speed: 50ms to 200ms usually
@@ -62,44 +111,21 @@ class BaseScraper(ABC):
         await self.human_delay(0.5, 1.0)
 
     async def start(self):
-        self.playwright = await async_playwright().start()
-        
-        # Try to launch system edge, then chrome, then bundled chromium
-        browsers_to_try = [
-            {'channel': 'msedge'},
-            {'channel': 'chrome'},
-            {}, # Default bundled as fallback
-        ]
-        
-        # Anti-detection arguments
-        stealth_args = [
-            '--disable-blink-features=AutomationControlled',
-            '--disable-infobars',
-            '--no-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-extensions',
-            '--disable-remote-fonts',
-            '--disable-gpu' # Often helpful in headless
-        ]
-
-        for browser_kwargs in browsers_to_try:
-            # Merge stealth args
-            browser_kwargs['args'] = browser_kwargs.get('args', []) + stealth_args
-            
-            try:
-                self.browser = await self.playwright.chromium.launch(headless=self.headless, **browser_kwargs)
-                logger.info(f"Launched browser with kwargs: {browser_kwargs}")
-                break
-            except Exception as e:
-                logger.warning(f"Failed to launch browser with {browser_kwargs}: {e}")
-        
-        if not self.browser:
-            raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+        if self.pool:
+            # Shared mode: borrow a slot on one of the pool's browsers instead of launching our own
+            self.browser = await self.pool.acquire()
+        else:
+            self.playwright = await async_playwright().start()
+            self.browser = await launch_browser(self.playwright, self.headless)
 
         await self._create_context_with_proxy()
 
-    async def _create_context_with_proxy(self):
-        """Creates a new browser context with a proxy (if available) and applies stealth."""
+    async def _create_context_with_proxy(self, storage_state: dict = None, avoid_proxy: str = None):
+        """Creates a new browser context with a proxy (if available) and applies stealth.
+
+        `storage_state` restores cookies/localStorage from a cached, already-located session.
+        `avoid_proxy` excludes the proxy being rotated away from.
+        """
         if self.context:
             await self.context.close()
 
@@ -119,40 +145,26 @@ class BaseScraper(ABC):
             'user_agent': chosen_ua
         }
         
-        # Proxy Selection
+        # Proxy Selection: an explicit proxy wins; otherwise the manager picks the healthiest one,
+        # keeping a pincode on the proxy its session was located through. A local mock storefront
+        # is reached directly, so its results never touch the proxy scores
         selected_proxy = self.proxy
-        if not selected_proxy and self.proxies_list:
-            # Pick a regular proxy string
-            proxy_str = random.choice(self.proxies_list)
-            # Parse it for Playwright if needed, or pass as server
-            # Format expected by Playwright: { "server": "http://ip:port", "username": "...", "password": "..." }
-            # Simplified parsing: assuming standard http://user:pass@ip:port or http://ip:port
-            logger.info(f"Rotating to proxy: {proxy_str}")
-            
-            # Basic parsing logic
-            try:
-                import urllib.parse
-                parsed = urllib.parse.urlparse(proxy_str)
-                selected_proxy = {
-                    "server": f"{parsed.scheme}://{parsed.hostname}:{parsed.port}"
-                }
-                if parsed.username:
-                    selected_proxy["username"] = parsed.username
-                if parsed.password:
-                    selected_proxy["password"] = parsed.password
-            except Exception as e:
-                logger.error(f"Failed to parse proxy {proxy_str}: {e}")
+        if not selected_proxy and not self.storefront.is_mock:
+            self.proxy_manager.release(self.current_proxy)
+            self.current_proxy = self.proxy_manager.acquire(self._proxy_session_key(), avoid=avoid_proxy)
+            if self.current_proxy:
+                logger.info(f"Rotating to proxy: {self.current_proxy}")
+                selected_proxy = ProxyManager.to_playwright(self.current_proxy)
         
         if selected_proxy:
             logger.info(f"Using Proxy: {selected_proxy.get('server')}")
             context_args['proxy'] = selected_proxy
 
+        if storage_state:
+            context_args['storage_state'] = storage_state
+
         self.context = await self.browser.new_context(**context_args)
-        
-        # PERFORMANCE OPTIMIZATION: Block heavy resources
-        await self.context.route("**/*", lambda route: route.abort() 
-            if route.request.resource_type in ["image", "media", "font"] 
-            else route.continue_())
+        self.navigations = 0
         
         # KEY STEALTH SCRIPT
         await self.context.add_init_script("""
@@ -176,16 +188,230 @@ class BaseScraper(ABC):
             # script skipped for simplicity, focusing on properties.
         """)
         
-        self.page = await self.context.new_page()
+        self.page = await self.new_page()
+
+    async def new_page(self) -> Page:
+        """Opens a tab in the current context with the blocking policy installed before any navigation."""
+        page = await self.context.new_page()
+        # PERFORMANCE OPTIMIZATION: heavy resources and trackers are dropped inside the browser
+        await self.blocking_policy.apply(self.context, page)
+        return page
+
+    async def throttle(self, url: str, cost: int = 1):
+        """Waits on the shared per-domain rate limiter before `cost` requests to `url`'s site."""
+        await self.rate_limiter.acquire(url, cost)
+
+    async def goto(self, url: str, page=None, **kwargs):
+        """page.goto (main page by default) paced by the per-domain rate limiter.
+
+        Waits while the site's circuit breaker is open, and raises BlockedError when the
+        navigation response (status, headers, final URL) is a block; the page is never
+        serialised to look for one. The outcome and latency are reported to the proxy
+        manager against the current proxy.
+        """
+        canary = await self.circuit_breaker.before(url)
+        try:
+            await self.throttle(url)
+            self.navigations += 1
+            proxy = self.current_proxy
+            started = time.perf_counter()
+            try:
+                response = await (page or self.page).goto(url, **kwargs)
+            except Exception:
+                self.proxy_manager.report(proxy, ok=False)
+                raise
+        except BaseException:
+            # Cancellation too (a tab timeout): a canary that never reports would pause the site for good
+            self.circuit_breaker.abandon(url, canary)
+            raise
+        reason = response_block_reason(response)
+        self.circuit_breaker.record(url, canary, reason)
+        status = response.status if response else None
+        self.proxy_manager.report(proxy, ok=not reason and (status or 200) < 500,
+                                  latency=time.perf_counter() - started, banned=bool(reason))
+        if reason:
+            raise BlockedError(url, reason)
+        return response
+
+    async def wait_until_ready(self, condition, ceiling_ms: int, label: str, page=None) -> bool:
+        """
+        Waits until `condition` holds, but never longer than `ceiling_ms` (the old fixed stall).
+
+        `condition` is a JS predicate polled in the page (see readiness.py), or an awaitable
+        such as `event.wait()` on an asyncio.Event a response listener sets. Time saved
+        against the ceiling is recorded per `label` in READINESS_STATS.
+        """
+        started = time.perf_counter()
+        try:
+            if isinstance(condition, str):
+                await (page or self.page).wait_for_function(condition, timeout=ceiling_ms, polling=100)
+            else:
+                await asyncio.wait_for(condition, ceiling_ms / 1000)
+            ready = True
+        except Exception:
+            # Timed out (or the page navigated away): same outcome as the old fixed wait
+            ready = False
+        READINESS_STATS.record(label, time.perf_counter() - started, ceiling_ms / 1000, ready)
+        return ready
+
+    async def restore_session(self, pincode: str) -> bool:
+        """
+        Restores a cached session for this pincode into a fresh context.
+        Returns True only if the restored location still checks out.
+        """
+        if not self.session_cache:
+            return False
+        entry = self.session_cache.load(pincode)
+        if not entry:
+            return False
 
-    async def rotate_proxy(self):
-        """Public method to trigger proxy rotation."""
+        logger.info(f"♻️ Restoring cached session for {pincode}")
+        await self._create_context_with_proxy(storage_state=entry["storage_state"])
+        self._apply_session_meta(entry.get("meta") or {})
+
+        try:
+            if await self._is_location_valid(pincode):
+                return True
+        except BlockedError:
+            # The site blocked the check, not the session: keep the cache and let the caller back off
+            raise
+        except Exception as e:
+            logger.warning(f"Cached session check failed for {pincode}: {e}")
+
+        logger.info(f"Cached session for {pincode} is stale. Falling back to full location flow.")
+        self.session_cache.invalidate(pincode)
+        return False
+
+    async def save_session(self, pincode: str):
+        """Saves the current (verified) location session for later runs."""
+        # Later contexts for this pincode stay on the proxy it was located through
+        self.proxy_manager.assign(f"pin_{pincode}", self.current_proxy)
+        if not self.session_cache or not self.context:
+            return
+        try:
+            storage_state = await self.context.storage_state()
+            self.session_cache.save(pincode, storage_state, self._session_meta())
+        except Exception as e:
+            logger.warning(f"Could not capture storage state for {pincode}: {e}")
+
+    def _session_meta(self) -> dict:
+        """Scraper fields saved alongside the storage state (ETA, store id...)."""
+        return {}
+
+    def _apply_session_meta(self, meta: dict):
+        pass
+
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """Cheap platform check that a restored session is still located. Override per platform."""
+        return False
+
+    def _category_cache_key(self) -> Optional[str]:
+        """Category trees are per store; fall back to the pincode when the store is unknown."""
+        store_id = getattr(self, "store_id", None)
+        if store_id and store_id not in ("N/A", "Unknown"):
+            return f"store_{store_id}"
+        if self.current_pincode:
+            return f"pin_{self.current_pincode}"
+        return None
+
+    def _proxy_session_key(self) -> str:
+        """Sticky-assignment key: the pincode once one is set, else this scraper instance."""
+        return f"pin_{self.current_pincode}" if self.current_pincode else f"scraper_{id(self)}"
+
+    async def rotate_proxy(self, banned: bool = True, report: bool = True):
+        """
+        Moves to the best available proxy. `banned` (403 / Access Denied) benches the
+        current one with a cooldown; otherwise it is only counted as a failure.
+        `report=False` when goto already reported the block that caused the rotation.
+        """
         logger.info("🔄 Initiating Proxy Rotation...")
-        await self._create_context_with_proxy()
+        avoid = self.current_proxy
+        if avoid and report:
+            self.proxy_manager.report(avoid, ok=False, banned=banned)
+        await self._create_context_with_proxy(avoid_proxy=avoid)
+
+    async def maybe_recycle(self, relocate: bool = True) -> bool:
+        """
+        Checkpoint between units of work: recycles the context (or the browser) when the
+        recycle policy says it has done too many navigations or the browser tree uses
+        too much memory. Returns True if it recycled.
+
+        `relocate=False` skips restoring the location, for callers about to set a new one.
+        """
+        reason, restart_browser = self.recycle_policy.check(self.navigations)
+        if not reason:
+            return False
+        await self.recycle(reason, restart_browser, relocate)
+        return True
+
+    async def recycle(self, reason: str, restart_browser: bool = False, relocate: bool = True):
+        """
+        Replaces the context (and with `restart_browser` the browser) with a fresh one that
+        carries the same cookies/localStorage and session meta, so the location survives.
+        """
+        logger.info(f"♻️ Recycling {'browser' if restart_browser else 'context'} after {reason}")
+        pincode = self.current_pincode if relocate else None
+        storage_state = None
+        if pincode and self.context:
+            try:
+                storage_state = await self.context.storage_state()
+            except Exception as e:
+                logger.warning(f"Could not capture storage state before recycling: {e}")
+        meta = self._session_meta()
+
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.warning(f"Error closing context: {e}")
+            self.context = None
+
+        if self.pool:
+            # A bloated pool browser is relaunched once its other contexts drain; move off it now
+            if restart_browser:
+                self.pool.retire(self.browser)
+            if self.pool.is_retiring(self.browser):
+                self.pool.release(self.browser)
+                self.browser = await self.pool.acquire()
+        elif restart_browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+            self.browser = await launch_browser(self.playwright, self.headless)
+
+        await self._create_context_with_proxy(storage_state=storage_state)
+        self._apply_session_meta(meta)
+        self.recycle_policy.record(restart_browser)
+
+        if pincode:
+            try:
+                if await self._is_location_valid(pincode):
+                    return
+            except BlockedError:
+                raise
+            except Exception as e:
+                logger.warning(f"Location check after recycling failed for {pincode}: {e}")
+            logger.info(f"Recycled session lost its location ({pincode}). Re-locating.")
+            await self.set_location(pincode)
 
     async def stop(self):
+        if self.current_proxy:
+            self.proxy_manager.release(self.current_proxy)
+            self.current_proxy = None
+            self.proxy_manager.save()
         if self.context:
-            await self.context.close()
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.warning(f"Error closing context: {e}")
+            self.context = None
+        if self.pool:
+            # The browser belongs to the pool; just give the slot back
+            if self.browser:
+                self.pool.release(self.browser)
+            self.browser = None
+            return
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -4,126 +4,192 @@ import logging
 import json
 import re
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
 from .base import BaseScraper
+from .session_cache import SessionCache
+from .category_tree import CategoryTree, CategoryCache
+from .concurrency import AIMDController, classify, OK, ERROR, BLOCKED, TIMEOUT
+from .circuit_breaker import BlockedError, block_reason
+from .readiness import NEXT_DATA_READY, LOCATION_ETA_READY, CATEGORY_LINKS_READY, PRODUCT_PAGE_READY
+from .extractors import COLLECT_PRODUCTS_FN, NEXT_DATA_PRODUCTS_JS, PDP_DETAILS_JS, apply_pdp_details, run_extractor, parse_payload
 from .models import ProductItem, AvailabilityResult
 from playwright.async_api import TimeoutError
 
 logger = logging.getLogger(__name__)
 
 class BlinkitScraper(BaseScraper):
-    def __init__(self, headless=False, proxy=None):
-        super().__init__(headless, proxy)
-        self.base_url = "https://blinkit.com/"
+    def __init__(self, headless=False, proxy=None, pool=None, blocking_policy=None,
+                 tab_controller: Optional[AIMDController] = None):
+        super().__init__(headless, proxy, pool, blocking_policy)
+        self.tab_controller = tab_controller # Sizes the tab semaphore instead of `concurrency` when set
+        self.base_url = self.storefront.url("https://blinkit.com/")
         self.delivery_eta = "N/A"
-
-    async def start(self):
-        await super().start()
-        # Resource blocking for performance
-        await self.page.route("**/*", self._handle_route)
-
-    async def _handle_route(self, route):
-        if route.request.resource_type in ["image", "media", "font"]:
-            await route.abort()
-        else:
-            await route.continue_()
+        self.store_id = "N/A" # merchant_id of the dark store serving the current location
+        self.session_cache = SessionCache(self.storefront.namespace("blinkit"))
+        self.category_cache = CategoryCache(self.storefront.namespace("blinkit"))
+        self.next_build_id = None # Next.js buildId of the live deployment (read once per session)
+        self._build_id_stale = False
+        self.failed_category_urls: List[str] = [] # Categories the last scrape_categories_* call could not fetch
+        self.blocked: Optional[BlockedError] = None # Block that cut the last scrape_categories_next_data call short
 
     # Removed duplicate scrape_categories_parallel method
 
     # Placeholder - step 1 is refactoring scrape_assortment
 
 
+    def _session_meta(self) -> dict:
+        return {"delivery_eta": self.delivery_eta, "store_id": self.store_id}
+
+    def _apply_session_meta(self, meta: dict):
+        self.delivery_eta = meta.get("delivery_eta", self.delivery_eta)
+        self.store_id = meta.get("store_id", self.store_id)
+
+    async def _read_store_id(self) -> Optional[str]:
+        """Reads the serving merchant_id the web app keeps once a location is set."""
+        try:
+            return await self.page.evaluate("""() => {
+                const pattern = /"?merchant_?id"?\s*[:=]\s*"?(\d+)/i;
+                // 1. Persisted app state (localStorage)
+                for (const key of Object.keys(localStorage)) {
+                    const m = (localStorage.getItem(key) || '').match(pattern);
+                    if (m) return m[1];
+                }
+                // 2. Cookies
+                const c = document.cookie.match(/merchant_?id=(\d+)/i);
+                if (c) return c[1];
+                // 3. Server-rendered state
+                const h = document.documentElement.innerHTML.match(pattern);
+                return h ? h[1] : null;
+            }""")
+        except Exception as e:
+            logger.warning(f"Could not read merchant id: {e}")
+            return None
+
+    async def _read_location_eta(self):
+        """Returns the ETA shown in the location bar (e.g. '8 minutes'), or None if no location is set."""
+        eta_el = await self.page.query_selector("div[class*='LocationBar__Title']")
+        if not eta_el:
+            return None
+        text = await eta_el.inner_text()
+        logger.info(f"Raw ETA Text: '{text}'")
+        match = re.search(r'(\d+\s*minutes?|mins?)', text, re.IGNORECASE)
+        return match.group(1).lower() if match else None
+
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """A located Blinkit session shows a delivery ETA in the location bar right away."""
+        await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+        try:
+            await self.page.wait_for_selector("div[class*='LocationBar__Title']", timeout=5000)
+        except TimeoutError:
+            return False
+        eta = await self._read_location_eta()
+        if eta:
+            self.delivery_eta = eta
+            return True
+        return False
+
     async def set_location(self, pincode: str):
         logger.info(f"Setting location to {pincode}")
+        self.current_pincode = pincode
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                await self.page.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
-                
-                # Check for blocking
-                content = await self.page.content()
-                if "Access Denied" in content or "403 Forbidden" in content:
-                    logger.error(f"🛑 BLOCKED: Access Denied or 403 detected on homepage (Attempt {attempt+1}/{max_retries}).")
-                    if attempt < max_retries - 1:
-                        await self.rotate_proxy()
-                        continue
-                    else:
-                        logger.error("🛑 Max retries reached with proxy rotation. Aborting.")
-                        return
-
-                # Humanize: Scroll a bit to look real
-                await self.human_scroll()
+        # 0. Fast path: reuse a cached, already-located session
+        if await self.restore_session(pincode):
+            if self.store_id == "N/A":
+                self.store_id = await self._read_store_id() or "N/A"
+            logger.info(f"Location restored from session cache for {pincode} (ETA: {self.delivery_eta}, Store: {self.store_id})")
+            return
 
-                # 1. Trigger Location Modal
-                logger.info("Clicking location trigger...")
+        self.store_id = "N/A" # Don't carry the previous pincode's store over a failed locate
+        max_retries = 3
+        try:
+            for attempt in range(max_retries):
                 try:
-                    # Random delay before clicking
-                    await self.human_delay()
-                    
-                    trigger_selector = "div[class*='LocationBar__']"
-                    
-                    # Check if we are already seeing the location bar
-                    is_visible = False
+                    # Blocks are detected from the navigation response; the breaker holds the
+                    # retry until its canary gets through
                     try:
-                         await self.page.wait_for_selector(trigger_selector, timeout=5000)
-                         is_visible = True
-                    except: pass
+                        await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+                    except BlockedError as e:
+                        logger.error(f"🛑 BLOCKED: {e.reason} on homepage (Attempt {attempt+1}/{max_retries}).")
+                        if attempt < max_retries - 1:
+                            await self.rotate_proxy(report=False)
+                            continue
+                        else:
+                            logger.error("🛑 Max retries reached with proxy rotation. Aborting.")
+                            return
+
+                    # Humanize: Scroll a bit to look real
+                    await self.human_scroll()
+
+                    # 1. Trigger Location Modal
+                    logger.info("Clicking location trigger...")
+                    try:
+                        # Random delay before clicking
+                        await self.human_delay()
+                    
+                        trigger_selector = "div[class*='LocationBar__']"
                     
-                    trigger_clicked = False
-                    if is_visible:
+                        # Check if we are already seeing the location bar
+                        is_visible = False
                         try:
-                            await self.page.hover(trigger_selector) 
-                            await self.human_delay(0.2, 0.5)
-                            await self.page.click(trigger_selector, force=True) 
-                            trigger_clicked = True
-                        except:
-                            # JS click fallback
-                            # Fix: Use double quotes for the outer JS string to avoid conflict with single quotes in selector
-                            await self.page.evaluate(f'document.querySelector("{trigger_selector}").click()')
-                            trigger_clicked = True
+                             await self.page.wait_for_selector(trigger_selector, timeout=5000)
+                             is_visible = True
+                        except: pass
+                    
+                        trigger_clicked = False
+                        if is_visible:
+                            try:
+                                await self.page.hover(trigger_selector) 
+                                await self.human_delay(0.2, 0.5)
+                                await self.page.click(trigger_selector, force=True) 
+                                trigger_clicked = True
+                            except:
+                                # JS click fallback
+                                # Fix: Use double quotes for the outer JS string to avoid conflict with single quotes in selector
+                                await self.page.evaluate(f'document.querySelector("{trigger_selector}").click()')
+                                trigger_clicked = True
     
-                    if not trigger_clicked:
-                        # Try text-based triggers
-                        for text_pattern in ["Delivery in", "Delivery to", "Location"]:
-                             if await self.page.is_visible(f"text={text_pattern}"):
-                                 await self.page.click(f"text={text_pattern}", force=True)
-                                 trigger_clicked = True
-                                 break
-                        
                         if not trigger_clicked:
-                            # Broad header click as last resort
-                            logger.warning("Precise location trigger not found, trying broad header click...")
-                            await self.page.click("header", force=True)
-                except Exception as e:
-                    logger.warning(f"Trigger click attempt failed: {e}")
+                            # Try text-based triggers
+                            for text_pattern in ["Delivery in", "Delivery to", "Location"]:
+                                 if await self.page.is_visible(f"text={text_pattern}"):
+                                     await self.page.click(f"text={text_pattern}", force=True)
+                                     trigger_clicked = True
+                                     break
+                        
+                            if not trigger_clicked:
+                                # Broad header click as last resort
+                                logger.warning("Precise location trigger not found, trying broad header click...")
+                                await self.page.click("header", force=True)
+                    except Exception as e:
+                        logger.warning(f"Trigger click attempt failed: {e}")
     
-                # Wait for modal with smart wait
-                modal_input = "input[name='search'], input[placeholder*='search']"
-                try:
-                    await self.page.wait_for_selector(modal_input, state="visible", timeout=10000)
-                except TimeoutError:
-                    logger.warning("Location modal not opened. Retrying trigger...")
-                    # Retry once
-                    await self.page.reload(wait_until='domcontentloaded')
-                    await self.human_delay()
-                    await self.page.click("div[class*='LocationBar__']", force=True)
-                    await self.page.wait_for_selector(modal_input, state="visible", timeout=10000)
+                    # Wait for modal with smart wait
+                    modal_input = "input[name='search'], input[placeholder*='search']"
+                    try:
+                        await self.page.wait_for_selector(modal_input, state="visible", timeout=10000)
+                    except TimeoutError:
+                        logger.warning("Location modal not opened. Retrying trigger...")
+                        # Retry once
+                        await self.page.reload(wait_until='domcontentloaded')
+                        await self.human_delay()
+                        await self.page.click("div[class*='LocationBar__']", force=True)
+                        await self.page.wait_for_selector(modal_input, state="visible", timeout=10000)
                 
-                # If we successfully opened the modal, break the retry loop and proceed
-                break
+                    # If we successfully opened the modal, break the retry loop and proceed
+                    break
                 
-            except Exception as e:
-                logger.error(f"Error setting location (Attempt {attempt+1}): {e}")
-                if attempt < max_retries - 1:
-                     await self.rotate_proxy()
-                else:
-                    try:
-                        await self.page.screenshot(path="error_blinkit_location.png")
-                    except: pass
-                    return
+                except Exception as e:
+                    logger.error(f"Error setting location (Attempt {attempt+1}): {e}")
+                    if attempt < max_retries - 1:
+                         await self.rotate_proxy(banned=False)
+                    else:
+                        try:
+                            await self.page.screenshot(path="error_blinkit_location.png")
+                        except: pass
+                        return
 
-            
+        
             # 2. Type pincode naturally
             logger.info(f"Typing pincode: {pincode}")
             try:
@@ -131,9 +197,9 @@ class BlinkitScraper(BaseScraper):
                 await self.page.click(modal_input)
                 await self.page.keyboard.press("Control+A")
                 await self.page.keyboard.press("Backspace")
-                
+            
                 await self.human_type(modal_input, pincode)
-                
+            
                 # 3. Wait for and click result
                 logger.info("Waiting for suggestions...")
                 # Improved selector: Just look for the pincode text anywhere in the list
@@ -145,31 +211,29 @@ class BlinkitScraper(BaseScraper):
                      # Fallback: click the first suggestion if specific pincode match fails
                      logger.warning("Specific pincode match failed, clicking first suggestion...")
                      await self.page.click("div[class*='LocationSearchList'] > div:nth-child(1)", force=True)
-                
+            
                 await self.page.wait_for_selector(modal_input, state="hidden", timeout=5000)
-                await self.page.wait_for_timeout(2000)
+                await self.wait_until_ready(LOCATION_ETA_READY, 2000, "location_eta")
             except Exception as e:
                 logger.warning(f"Location input interaction failed: {e}")
-            
+        
             # 4. Extract Delivery ETA
             try:
-                eta_el = await self.page.query_selector("div[class*='LocationBar__Title']")
-                if eta_el:
-                    text = await eta_el.inner_text()
-                    logger.info(f"Raw ETA Text: '{text}'")
-                    match = re.search(r'(\d+\s*minutes?|mins?)', text, re.IGNORECASE)
-                    if match:
-                        self.delivery_eta = match.group(1).lower()
-                        logger.info(f"Captured Delivery ETA: {self.delivery_eta}")
-                    else:
-                        logger.warning(f"ETA regex mismatch. Keeping: {self.delivery_eta}")
+                eta = await self._read_location_eta()
+                if eta:
+                    self.delivery_eta = eta
+                    logger.info(f"Captured Delivery ETA: {self.delivery_eta}")
+                    self.store_id = await self._read_store_id() or "N/A"
+                    logger.info(f"Captured Store (merchant) ID: {self.store_id}")
+                    # An ETA in the location bar means the location took; cache the session
+                    await self.save_session(pincode)
                 else:
-                    logger.warning("ETA Element not found")
+                    logger.warning(f"ETA not found. Keeping: {self.delivery_eta}")
             except Exception as e:
                 logger.warning(f"Could not extract ETA: {e}")
                 
             logger.info("Location set successfully")
-            
+        
         except Exception as e:
             logger.error(f"Error setting location: {e}")
             try:
@@ -178,14 +242,23 @@ class BlinkitScraper(BaseScraper):
 
     async def get_all_categories(self) -> List[str]:
         """
-        Navigates to the homepage and extracts all category URLs.
+        Returns the canonical category listings for the current store.
+
+        Served from the category cache when fresh; otherwise extracted from the
+        homepage, reduced to one listing per (cid, sub-cid) and cached.
         """
+        cache_key = self._category_cache_key()
+        tree = self.category_cache.load(cache_key) if cache_key else None
+        if tree:
+            categories = tree.listings()
+            logger.info(f"Loaded {len(categories)} categories from cache ({cache_key}).")
+            return categories
+
         logger.info("Extracting all categories from homepage...")
-        categories = set()
         try:
             if self.page.url != self.base_url:
-                await self.page.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
-                await self.page.wait_for_timeout(3000)
+                await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+                await self.wait_until_ready(CATEGORY_LINKS_READY, 3000, "category_links")
 
             # Extract all links containing '/cn/'
             links = await self.page.evaluate('''() => {
@@ -193,19 +266,20 @@ class BlinkitScraper(BaseScraper):
                     .map(a => a.href)
                     .filter(href => href.includes('/cn/'));
             }''')
-            
-            for link in links:
-                categories.add(link)
-                
-            logger.info(f"Found {len(categories)} unique category links.")
-            return list(categories)
+
+            tree = CategoryTree.from_urls("blinkit", links)
+            categories = tree.listings()
+            logger.info(f"Found {len(categories)} canonical categories from {tree.stats['links']} links "
+                        f"({tree.stats['duplicates']} duplicates, {tree.stats['parents_dropped']} parent listings dropped).")
+            if cache_key and categories:
+                self.category_cache.save(cache_key, tree)
+            return categories
         except Exception as e:
             logger.error(f"Error extracting categories: {e}")
             return []
 
-
-                    
-    def _extract_products_from_next_data(self, next_data: dict) -> Dict[str, dict]:
+    @staticmethod
+    def _extract_products_from_next_data(next_data: dict) -> Dict[str, dict]:
         """Helper to recursively find products in __NEXT_DATA__."""
         products_map = {}
         def find_products_recursive(data, collector):
@@ -223,77 +297,244 @@ class BlinkitScraper(BaseScraper):
         find_products_recursive(next_data, products_map)
         return products_map
 
+    @staticmethod
+    def _products_by_id(records: List[dict]) -> Dict[str, dict]:
+        """Keys product records returned by the in-page extractors by product_id."""
+        return {str(r['product_id']): r for r in records}
+
+    def _build_fast_item(self, pid: str, pdata: dict, url: str, pincode: str) -> dict:
+        """
+        Basic item construction for the multi-category fast paths (simplified for speed).
+        Keys stay within the sink schema (utils/sinks.py): the category URL goes in
+        product_url (uploaded as `url`) and the merchant in store_id.
+        """
+        item = {
+            "pincode_input": pincode,
+            "product_url": url,
+            "category": "Assortment", # Placeholder
+            "name": pdata.get('name') or 'N/A',
+            "price": pdata.get('price'),
+            "mrp": pdata.get('mrp'),
+            "product_id": pid,
+            # The in-page collector keeps nulls, so a present-but-null field must not reach a comparison
+            "availability": "In Stock" if (pdata.get('inventory') or 0) > 0 else "Out of Stock",
+            "scraped_at": time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        # Add other fields if available in pdata
+        if pdata.get('merchant'):
+            item['store_id'] = pdata['merchant'].get('id')
+        return item
+
     async def scrape_categories_parallel(self, category_urls: List[str], pincode: str, concurrency: int = 4) -> List[dict]:
-        """Scrapes multiple categories in parallel tabs within the same context."""
-        semaphore = asyncio.Semaphore(concurrency)
+        """
+        Scrapes multiple categories in parallel tabs within the same context.
+        URLs that could not be scraped are left in `self.failed_category_urls`.
+
+        With a tab_controller the number of open tabs follows its AIMD limit and every
+        tab reports its latency / outcome back to it; otherwise `concurrency` is fixed.
+        """
+        if self.tab_controller:
+            semaphore = self.tab_controller.semaphore()
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
         all_results = []
+        failed = []
         
         async def scrape_single_tab(url):
             async with semaphore:
-                page = await self.context.new_page()
+                started = time.perf_counter()
+                outcome = ERROR # Until a path below says otherwise
+                # Minimal wait strategy: blocking policy drops heavy resources, wait for DOM
+                page = await self.new_page()
                 try:
-                    # Minimal wait strategy: Block most things, wait for DOM
-                    await page.route("**/*", self._handle_route)
-                    
                     try:
-                        await page.goto(url, timeout=30000, wait_until='domcontentloaded')
-                        
-                        # Check for blocking
-                        content = await page.content()
-                        if "Access Denied" in content or "403 Forbidden" in content:
-                            logger.error(f"🛑 BLOCKED: Access Denied detected on {url}")
-                             # Raise a specific error to signal upper layers to abort
-                            raise Exception("BLOCKED_BY_WAF")
-
+                        await self.goto(url, page=page, timeout=30000, wait_until='domcontentloaded')
+                    except BlockedError as e:
+                        # The circuit breaker now pauses every tab and worker on the site; this
+                        # category stays failed so the resume picks it up
+                        logger.error(f"🛑 BLOCKED: {e.reason} on {url}")
+                        outcome = BLOCKED
+                        failed.append(url)
+                        return []
                     except Exception as e:
-                        if "BLOCKED_BY_WAF" in str(e):
-                            raise e
                         logger.warning(f"Nav failed {url}: {e}")
+                        outcome = classify(e)
+                        failed.append(url)
                         return []
 
-                    # Fast Path: JSON
+                    # Fast Path: JSON (product records only, filtered inside the page)
                     try:
-                        next_data = await page.evaluate("window.__NEXT_DATA__")
-                        if next_data:
-                            products_map = self._extract_products_from_next_data(next_data)
-                            items = []
-                            for pid, pdata in products_map.items():
-                                # Basic item construction (Simplified for speed)
-                                item = {
-                                    "pincode_input": pincode,
-                                    "url": url,
-                                    "category": "Assortment", # Placeholder
-                                    "name": pdata.get('name', 'N/A'),
-                                    "price": pdata.get('price', None),
-                                    "mrp": pdata.get('mrp', None),
-                                    "product_id": pid,
-                                    "availability": "In Stock" if pdata.get('inventory', 0) > 0 else "Out of Stock",
-                                    "scraped_at": time.strftime('%Y-%m-%d %H:%M:%S')
-                                }
-                                # Add other fields if available in pdata
-                                if 'merchant' in pdata:
-                                    item['merchant_id'] = pdata['merchant'].get('id')
-                                items.append(item)
-                            
+                        records = await run_extractor(page, NEXT_DATA_PRODUCTS_JS)
+                        if records is not None:
+                            products_map = self._products_by_id(records)
+                            items = [self._build_fast_item(pid, pdata, url, pincode) for pid, pdata in products_map.items()]
                             logger.info(f"⚡ Fast-scraped {len(items)} items from {url}")
+                            outcome = OK
                             return items
                     except Exception as e:
                         logger.warning(f"Fast extract failed for {url}: {e}")
+                        outcome = classify(e)
                     
+                    failed.append(url)
                     return []
                 except Exception as e:
                     logger.error(f"Tab scrape failed {url}: {e}")
+                    outcome = classify(e)
+                    failed.append(url)
                     return []
                 finally:
                     await page.close()
+                    if self.tab_controller:
+                        self.tab_controller.record(time.perf_counter() - started, outcome)
 
         tasks = [scrape_single_tab(url) for url in category_urls]
         results = await asyncio.gather(*tasks)
         for r in results:
             all_results.extend(r)
+        self.failed_category_urls = failed
             
         return all_results
 
+    async def _get_build_id(self) -> Optional[str]:
+        """Reads the Next.js buildId from the located session's __NEXT_DATA__ (cached per session)."""
+        if self.next_build_id:
+            return self.next_build_id
+        try:
+            # After a rotation the current document still carries the old id, so reload it first
+            if self._build_id_stale or not self.page.url.startswith(self.base_url):
+                await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+                self._build_id_stale = False
+            self.next_build_id = await self.page.evaluate("() => window.__NEXT_DATA__ ? window.__NEXT_DATA__.buildId : null")
+            if self.next_build_id:
+                logger.info(f"Next.js buildId: {self.next_build_id}")
+        except Exception as e:
+            logger.warning(f"Could not read Next.js buildId: {e}")
+        return self.next_build_id
+
+    def _next_data_url(self, category_url: str, build_id: str) -> str:
+        """/cn/<slug>/cid/<a>/<b>  ->  /_next/data/<buildId>/cn/<slug>/cid/<a>/<b>.json"""
+        parsed = urlparse(category_url)
+        path = parsed.path.rstrip('/')
+        url = f"{parsed.scheme}://{parsed.netloc}/_next/data/{build_id}{path}.json"
+        if parsed.query:
+            url += f"?{parsed.query}"
+        return url
+
+    async def _fetch_next_data_batch(self, data_urls: List[str]) -> List[dict]:
+        """
+        Fetches data routes concurrently from inside the located page (same cookies, no rendering).
+        Only the product records cross back to Python, as a JSON string per route.
+
+        The batch goes through the circuit breaker as one request: it waits while the
+        site is paused, and any blocked response in it trips (or re-opens) the circuit.
+        """
+        if not data_urls:
+            return []
+        canary = await self.circuit_breaker.before(data_urls[0])
+        try:
+            await self.throttle(data_urls[0], cost=len(data_urls))
+            responses = await self.page.evaluate("""async (urls) => {
+                const collect = %s;
+                return Promise.all(urls.map(async (url) => {
+                    try {
+                        const res = await fetch(url, {credentials: 'include', headers: {'x-nextjs-data': '1'}});
+                        const type = res.headers.get('content-type') || '';
+                        if (!res.ok || !type.includes('json')) {
+                            return {status: res.status, final_url: res.url, products: null};
+                        }
+                        const data = await res.json();
+                        const redirect = !!(data.pageProps && data.pageProps.__N_REDIRECT);
+                        return {status: res.status, redirect, products: JSON.stringify(collect(data))};
+                    } catch (e) {
+                        return {status: 0, products: null, error: String(e)};
+                    }
+                }));
+            }""" % COLLECT_PRODUCTS_FN, data_urls)
+        except BaseException:
+            self.circuit_breaker.abandon(data_urls[0], canary)
+            raise
+        for res in responses:
+            res["block_reason"] = block_reason(res.get("status"), None, res.get("final_url") or "")
+        reason = next((r["block_reason"] for r in responses if r["block_reason"]), None)
+        if not reason and all(r.get("status") == 0 for r in responses):
+            self.circuit_breaker.abandon(data_urls[0], canary) # Network errors say nothing about blocking
+        else:
+            self.circuit_breaker.record(data_urls[0], canary, reason)
+        return responses
+
+    async def scrape_categories_next_data(self, category_urls: List[str], pincode: str, concurrency: int = 16) -> List[dict]:
+        """
+        Scrapes categories through the Next.js data route (/_next/data/<buildId>/...json)
+        instead of rendering each page. `concurrency` fetches are in flight at once.
+
+        Categories whose data route fails fall back to scrape_categories_parallel. A 404
+        means the buildId rotated mid-run: the rest of this call uses page navigation and
+        the next call re-reads the buildId.
+
+        A block stops the call: the rows already scraped are returned, every category not
+        scraped yet is left in `self.failed_category_urls` and the block in `self.blocked`.
+        """
+        build_id = await self._get_build_id()
+        if not build_id:
+            logger.warning("No Next.js buildId available. Falling back to page navigation.")
+            return await self.scrape_categories_parallel(category_urls, pincode=pincode)
+
+        all_results = []
+        fallback_urls = []
+        skipped = [] # Left for a resume: unusable payloads, and whatever a block cut off
+        self.failed_category_urls = []
+        self.blocked = None
+
+        for start in range(0, len(category_urls), concurrency):
+            chunk = category_urls[start:start + concurrency]
+            if self.blocked:
+                skipped.extend(chunk)
+                continue
+            if self._build_id_stale:
+                fallback_urls.extend(chunk)
+                continue
+
+            responses = await self._fetch_next_data_batch([self._next_data_url(u, build_id) for u in chunk])
+
+            for url, res in zip(chunk, responses):
+                status = res.get("status")
+                if res["block_reason"]:
+                    # The breaker now pauses the site; the rest of the group is left for a resume
+                    logger.error(f"🛑 BLOCKED: {res['block_reason']} on data route for {url}")
+                    self.blocked = self.blocked or BlockedError(url, res["block_reason"])
+                    skipped.append(url)
+                    continue
+                if status == 404:
+                    # Old deployment's data routes are gone
+                    if not self._build_id_stale:
+                        logger.warning(f"Next.js buildId {build_id} rotated. Falling back to page navigation.")
+                    self._build_id_stale = True
+                    self.next_build_id = None
+                if status != 200 or res.get("products") is None or res.get("redirect"):
+                    fallback_urls.append(url)
+                    continue
+
+                try:
+                    products_map = self._products_by_id(parse_payload(res["products"]))
+                    all_results.extend([self._build_fast_item(pid, pdata, url, pincode) for pid, pdata in products_map.items()])
+                except Exception as e:
+                    # One malformed category must not drop the store group; it stays unjournalled for a resume
+                    logger.warning(f"Skipping data route for {url}: {e}")
+                    skipped.append(url)
+
+        scraped = len(category_urls) - len(fallback_urls) - len(skipped)
+        logger.info(f"⚡ Data-route scraped {scraped}/{len(category_urls)} categories ({len(all_results)} items)")
+
+        if self.blocked:
+            # Navigating the fallback tabs would run into the same block
+            skipped.extend(fallback_urls)
+        elif fallback_urls:
+            all_results.extend(await self.scrape_categories_parallel(fallback_urls, pincode=pincode))
+        # The fallback resets failed_category_urls to its own failures
+        self.failed_category_urls = self.failed_category_urls + skipped
+
+        return all_results
+
     async def scrape_assortment(self, category_url: str, pincode: str = "N/A") -> List[ProductItem]:
         logger.info(f"Scraping assortment from {category_url}")
         results: List[ProductItem] = []
@@ -315,19 +556,19 @@ class BlinkitScraper(BaseScraper):
         clicked_label = f"{category} > {subcategory}" if subcategory != "N/A" else category
         
         try:
-            await self.page.goto(category_url, timeout=60000, wait_until="domcontentloaded")
+            await self.goto(category_url, timeout=60000, wait_until="domcontentloaded")
             if self.page.url == self.base_url and "cid" in category_url:
                  logger.warning(f"Redirected to homepage. Category URL {category_url} might be invalid.")
                  return []
 
-            await self.page.wait_for_timeout(3000)
+            await self.wait_until_ready(NEXT_DATA_READY, 3000, "category_next_data")
 
             products_map = {}
             # 1. JSON Data Extraction Strategy (Primary)
             try:
-                next_data = await self.page.evaluate("window.__NEXT_DATA__")
-                if next_data:
-                    products_map = self._extract_products_from_next_data(next_data)
+                records = await run_extractor(self.page, NEXT_DATA_PRODUCTS_JS)
+                if records:
+                    products_map = self._products_by_id(records)
             except Exception as e:
                 logger.warning(f"NEXT_DATA extraction failed: {e}")
 
@@ -385,8 +626,8 @@ class BlinkitScraper(BaseScraper):
                         "product_id": pid,
                         "group_id": p.get('group_id') or p.get('groupId'),
                         "merchant_type": p.get('merchant_type') or p.get('merchantType'),
-                        "mrp": float(p.get('mrp', 0)),
-                        "price": float(p.get('price', 0)),
+                        "mrp": float(p.get('mrp') or 0),
+                        "price": float(p.get('price') or 0),
                         "weight": p.get('unit') or p.get('quantity_info') or "N/A",
                         "shelf_life_in_hours": shelf_life,
                         "eta": self.delivery_eta, 
@@ -415,10 +656,9 @@ class BlinkitScraper(BaseScraper):
             
         return results
 
-    async def scrape_availability(self, product_url: str) -> AvailabilityResult:
-        logger.info(f"Scraping availability from {product_url}")
-        
-        result: AvailabilityResult = {
+    @staticmethod
+    def _empty_availability(product_url: str) -> AvailabilityResult:
+        return {
              "input_pincode": "",
              "url": product_url,
              "platform": "blinkit",
@@ -435,97 +675,33 @@ class BlinkitScraper(BaseScraper):
              "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
              "error": None
         }
+
+    async def scrape_availability(self, product_url: str, page=None) -> AvailabilityResult:
+        """Checks one product page, on `page` (a tab of the located context) or the main page."""
+        logger.info(f"Scraping availability from {product_url}")
+        page = page or self.page
+        
+        result = self._empty_availability(product_url)
         
         try:
-            await self.page.goto(product_url, timeout=60000, wait_until="domcontentloaded")
-            await self.page.wait_for_timeout(2000) # Stabilize
+            await self.goto(product_url, page=page, timeout=60000, wait_until="domcontentloaded")
+            await self.wait_until_ready(PRODUCT_PAGE_READY, 2000, "product_page", page=page)
             
             # 1. Expand "Product Details" if necessary
             try:
                 # Look for "See all details" or similar buttons
-                see_more_btns = await self.page.query_selector_all("text='See all details'")
+                see_more_btns = await page.query_selector_all("text='See all details'")
                 for btn in see_more_btns:
                     if await btn.is_visible():
                         await btn.click()
-                        await self.page.wait_for_timeout(1000)
+                        await page.wait_for_timeout(1000)
             except: pass
 
-            content = await self.page.content()
-            
-            # 2. JSON Strategy for Core Data
-            normalized_content = content.replace(r'\"', '"').replace(r'\\', '\\')
-            start_pattern = re.compile(r'\{"product_id":')
-            decoder = json.JSONDecoder()
-            
-            target_data = None
+            # 2. Product record + detail sections in one evaluate (no full HTML / body text over IPC)
             url_id_match = re.search(r'prid/(\d+)', product_url)
-            
-            if url_id_match:
-                target_id = url_id_match.group(1)
-                for match in start_pattern.finditer(normalized_content):
-                    try:
-                        p_data, _ = decoder.raw_decode(normalized_content, match.start())
-                        if isinstance(p_data, dict) and str(p_data.get('product_id')) == target_id:
-                            target_data = p_data
-                            break
-                    except: continue
-            
-            # Fill Core Data from JSON
-            if target_data:
-                result["name"] = target_data.get('name') or target_data.get('product_name') or target_data.get('display_name') or 'N/A'
-                result["price"] = float(target_data.get('price', 0))
-                result["mrp"] = float(target_data.get('mrp', 0))
-                
-                # Inventory
-                inv = 0
-                if 'inventory' in target_data:
-                     inv = int(target_data.get('inventory') or 0)
-                result["inventory"] = inv
-                result["availability"] = "In Stock" if inv > 0 else "Out of Stock"
-            else:
-                # Fallback DOM for Core Data
-                try:
-                    name_el = await self.page.query_selector('h1')
-                    if name_el: result["name"] = await name_el.inner_text()
-                    # Add price element checks here if needed
-                except: pass
-
-            # 3. Extract Detailed Metadata (DOM Strategy)
-            # Use specific text parsing for Manufacturer, Marketed By, etc.
-            text_content = await self.page.inner_text("body")
-            
-            def extract_section(keyword):
-                try:
-                    # Logic: find text line with Keyword, extract following lines
-                    match = re.search(f"{keyword}\\n(.*?)(?:\\n\\n|\\Z)", text_content, re.IGNORECASE | re.DOTALL)
-                    if match:
-                        return match.group(1).strip()
-                except: pass
-                return None
-
-            result["manufacturer_details"] = extract_section("Manufacturer Details")
-            result["marketer_details"] = extract_section("Marketed By")
-            result["seller_details"] = extract_section("Seller Details") or extract_section("Sold By")  # Blinkit often uses "Sold By"
-
-            # 4. Variant Analysis
-            # Look for logic that indicates variants (e.g. weight buttons)
-            # This is complex on single product page, often requires looking at "Pack Sizes" section
-            try:
-                # Common selector for variants
-                variants = await self.page.query_selector_all("div[class*='PackSizeSelector']") 
-                # Or just general buttons with weights
-                if not variants:
-                    # Fallback logic: check for "Select Unit" or similar
-                    pass
-                
-                # If we assume the current product is one variant that is loaded
-                # We can look for siblings in the JSON or DOM
-                # For now, simplistic approach: "1" if no explicit selector found
-                result["variant_count"] = 1
-                result["variant_in_stock_count"] = 1 if result["availability"] == "In Stock" else 0
-                
-            except:
-                pass
+            target_id = url_id_match.group(1) if url_id_match else ""
+            details = await run_extractor(page, PDP_DETAILS_JS, target_id) or {}
+            apply_pdp_details(result, details)
                 
         except Exception as e:
             logger.error(f"Error scraping availability for {product_url}: {e}")
@@ -533,3 +709,40 @@ class BlinkitScraper(BaseScraper):
             
         return result
 
+    async def scrape_availability_parallel(self, product_urls: List[str], pincode: str = "",
+                                           concurrency: int = 4, tab_timeout: float = 45.0) -> List[AvailabilityResult]:
+        """
+        Checks many product pages at once in tabs of the already-located context
+        (the availability counterpart of scrape_categories_parallel). Results keep input order.
+
+        Every tab has its own `tab_timeout` (seconds, navigation to extraction), so one
+        slow PDP is reported with an error instead of holding up the rest of the batch.
+        """
+        if self.tab_controller:
+            semaphore = self.tab_controller.semaphore()
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
+
+        async def check_in_tab(url):
+            async with semaphore:
+                started = time.perf_counter()
+                page = await self.new_page()
+                try:
+                    result = await asyncio.wait_for(self.scrape_availability(url, page=page), tab_timeout)
+                    outcome = classify(Exception(result["error"])) if result["error"] else OK
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏱️ Tab timed out after {tab_timeout:.0f}s: {url}")
+                    result = self._empty_availability(url)
+                    result["error"] = f"Timeout: no result within {tab_timeout:.0f}s"
+                    outcome = TIMEOUT
+                finally:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                if self.tab_controller:
+                    self.tab_controller.record(time.perf_counter() - started, outcome)
+                result["input_pincode"] = pincode
+                return result
+
+        return list(await asyncio.gather(*(check_in_tab(url) for url in product_urls)))
@@ -0,0 +1,123 @@
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+class BlockingPolicy:
+    """
+    Declarative request-blocking rules enforced inside Chromium.
+
+    The URL patterns are pushed once per page through CDP `Network.setBlockedURLs`,
+    so the browser drops matching requests itself. Unlike `route("**/*", ...)`,
+    no request is paused waiting for Python to allow or abort it. Python only
+    listens for `Network.loadingFailed` notifications to keep run-wide counters.
+    """
+
+    # setBlockedURLs matches URL wildcards, not resource types, so types map to extensions
+    RESOURCE_PATTERNS = {
+        "image": [".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico"],
+        "media": [".mp4", ".webm", ".m3u8", ".mp3"],
+        "font": [".woff", ".woff2", ".ttf", ".otf", ".eot"],
+        "stylesheet": [".css"],
+    }
+
+    # Analytics / tracking hosts that never carry product data
+    TRACKER_DOMAINS = [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "googlesyndication.com",
+        "facebook.net",
+        "facebook.com/tr",
+        "clevertap-prod.com",
+        "wzrkt.com",
+        "branch.io",
+        "app.link",
+        "mixpanel.com",
+        "amplitude.com",
+        "hotjar.com",
+        "sentry.io",
+        "newrelic.com",
+        "nr-data.net",
+        "appsflyer.com",
+        "moengage.com",
+        "segment.io",
+    ]
+
+    # Blocked requests never report a size, so bytes saved are estimated from typical transfer sizes
+    AVG_BYTES = {
+        "image": 35_000,
+        "media": 400_000,
+        "font": 45_000,
+        "stylesheet": 30_000,
+        "tracker": 20_000,
+        "other": 10_000,
+    }
+
+    def __init__(self, resource_types=("image", "media", "font", "stylesheet"), block_trackers=True, extra_patterns: List[str] = None):
+        self.resource_types = list(resource_types)
+        self.block_trackers = block_trackers
+        self.extra_patterns = extra_patterns or []
+        self.stats: Dict[str, int] = {"requests_blocked": 0, "bytes_saved_estimate": 0}
+        self.blocked_by_type: Dict[str, int] = {}
+        self._patterns = self._build_patterns()
+
+    def _build_patterns(self) -> List[str]:
+        patterns = []
+        for rtype in self.resource_types:
+            for ext in self.RESOURCE_PATTERNS.get(rtype, []):
+                # Match with and without a query string (cdn.../img.jpg?w=200)
+                patterns.append(f"*{ext}")
+                patterns.append(f"*{ext}?*")
+        if "image" in self.resource_types:
+            patterns.append("*/_next/image*")
+        if self.block_trackers:
+            patterns.extend(f"*{domain}*" for domain in self.TRACKER_DOMAINS)
+        patterns.extend(self.extra_patterns)
+        return patterns
+
+    @property
+    def url_patterns(self) -> List[str]:
+        return list(self._patterns)
+
+    def _classify(self, cdp_type: str) -> str:
+        rtype = (cdp_type or "").lower()
+        if rtype in self.AVG_BYTES:
+            return rtype
+        # Scripts/XHR/beacons only match our patterns through the tracker domains
+        if rtype in ("script", "xhr", "fetch", "ping", "other") and self.block_trackers:
+            return "tracker"
+        return "other"
+
+    def _on_loading_failed(self, params: dict):
+        # Only requests dropped by setBlockedURLs carry blockedReason == "inspector"
+        if params.get("blockedReason") != "inspector":
+            return
+        rtype = self._classify(params.get("type"))
+        self.stats["requests_blocked"] += 1
+        self.stats["bytes_saved_estimate"] += self.AVG_BYTES[rtype]
+        self.blocked_by_type[rtype] = self.blocked_by_type.get(rtype, 0) + 1
+
+    async def apply(self, context, page):
+        """Installs the blocklist on a page via its own CDP session (Chromium only)."""
+        try:
+            cdp = await context.new_cdp_session(page)
+            # Fire-and-forget notifications; nothing here sits in the request path
+            cdp.on("Network.loadingFailed", self._on_loading_failed)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setBlockedURLs", {"urls": self._patterns})
+            return cdp
+        except Exception as e:
+            logger.warning(f"Could not install CDP blocking policy: {e}")
+            return None
+
+    def summary(self) -> dict:
+        return {
+            "requests_blocked": self.stats["requests_blocked"],
+            "bytes_saved_estimate": self.stats["bytes_saved_estimate"],
+            "mb_saved_estimate": round(self.stats["bytes_saved_estimate"] / 1_000_000, 2),
+            "by_type": dict(self.blocked_by_type)
+        }
+
+# Shared by every scraper in the process, so the counters cover the whole run
+DEFAULT_POLICY = BlockingPolicy()
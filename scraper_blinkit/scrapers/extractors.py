@@ -0,0 +1,184 @@
+import json
+import logging
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fields read from a product record when mapping to ProductItem / fast items
+PRODUCT_FIELDS = [
+    "product_id", "id", "name", "product_name", "display_name", "brand",
+    "mrp", "price", "inventory", "unavailable_quantity", "unit", "quantity_info",
+    "shelf_life", "shelf_life_hours", "group_id", "groupId",
+    "merchant_type", "merchantType", "merchant_id", "image_url",
+]
+
+# In-page collector: walks a Next.js payload and keeps only product records, trimmed to
+# PRODUCT_FIELDS (first occurrence per product_id, same rule as the old Python walk)
+COLLECT_PRODUCTS_FN = """(root) => {
+    const FIELDS = %s;
+    const out = [];
+    const seen = new Set();
+    const stack = [root];
+    while (stack.length) {
+        const node = stack.pop();
+        if (!node || typeof node !== 'object') continue;
+        if (Array.isArray(node)) {
+            for (let i = node.length - 1; i >= 0; i--) stack.push(node[i]);
+            continue;
+        }
+        if ('product_id' in node && ('name' in node || 'product_name' in node)) {
+            const pid = String(node.product_id);
+            if (!seen.has(pid)) {
+                seen.add(pid);
+                const rec = {};
+                for (const f of FIELDS) if (node[f] !== undefined) rec[f] = node[f];
+                if (node.merchant && typeof node.merchant === 'object') rec.merchant = {id: node.merchant.id};
+                out.push(rec);
+            }
+        }
+        const keys = Object.keys(node);
+        for (let i = keys.length - 1; i >= 0; i--) stack.push(node[keys[i]]);
+    }
+    return out;
+}""" % json.dumps(PRODUCT_FIELDS)
+
+# Category / PDP pages: products out of window.__NEXT_DATA__ as one JSON string (null if absent)
+NEXT_DATA_PRODUCTS_JS = """() => {
+    const collect = %s;
+    return window.__NEXT_DATA__ ? JSON.stringify(collect(window.__NEXT_DATA__)) : null;
+}""" % COLLECT_PRODUCTS_FN
+
+# Product page (PDP): the target product record plus the detail sections, in one round trip.
+# Same rules as the old Python path: product from __NEXT_DATA__, else the first embedded
+# (unescaped) {"product_id": ...} object whose id matches; sections via the same regexes
+# over the page text. Returns a JSON string.
+PDP_DETAILS_JS = r"""(targetId) => {
+    const collect = %s;
+    const FIELDS = %s;
+    const trim = (node) => {
+        const rec = {};
+        for (const f of FIELDS) if (node[f] !== undefined) rec[f] = node[f];
+        return rec;
+    };
+    // End index of the JSON object starting at `start` (string-aware brace matching)
+    const objectEnd = (s, start) => {
+        let depth = 0, inStr = false, esc = false;
+        for (let i = start; i < s.length; i++) {
+            const c = s[i];
+            if (inStr) {
+                if (esc) esc = false;
+                else if (c === '\\') esc = true;
+                else if (c === '"') inStr = false;
+                continue;
+            }
+            if (c === '"') inStr = true;
+            else if (c === '{') depth++;
+            else if (c === '}' && --depth === 0) return i;
+        }
+        return -1;
+    };
+
+    let product = null;
+    if (targetId && window.__NEXT_DATA__) {
+        product = collect(window.__NEXT_DATA__).find(p => String(p.product_id) === targetId) || null;
+    }
+    if (targetId && !product) {
+        const marker = '{"product_id":';
+        for (const script of document.scripts) {
+            const raw = script.textContent;
+            if (!raw || !raw.includes('product_id')) continue;
+            const text = raw.split('\\"').join('"').split('\\\\').join('\\');
+            for (let at = text.indexOf(marker); at !== -1 && !product; at = text.indexOf(marker, at + 1)) {
+                const end = objectEnd(text, at);
+                if (end < 0) continue;
+                try {
+                    const obj = JSON.parse(text.slice(at, end + 1));
+                    if (String(obj.product_id) === targetId) product = trim(obj);
+                } catch (e) {}
+            }
+            if (product) break;
+        }
+    }
+
+    const body = document.body ? document.body.innerText : '';
+    const section = (keyword) => {
+        const m = body.match(new RegExp(keyword + '\\n([\\s\\S]*?)(?:\\n\\n|$)', 'i'));
+        return m ? m[1].trim() : null;
+    };
+    const h1 = document.querySelector('h1');
+    return JSON.stringify({
+        product,
+        h1: h1 ? h1.innerText : null,
+        manufacturer: section('Manufacturer Details'),
+        marketer: section('Marketed By'),
+        seller: section('Seller Details') || section('Sold By'),
+    });
+}""" % (COLLECT_PRODUCTS_FN, json.dumps(PRODUCT_FIELDS))
+
+
+def apply_pdp_details(result: dict, details: dict) -> dict:
+    """Fills an AvailabilityResult from PDP_DETAILS_JS output (same mapping as the old DOM/JSON path)."""
+    product = details.get("product")
+    if product:
+        result["name"] = product.get('name') or product.get('product_name') or product.get('display_name') or 'N/A'
+        result["price"] = float(product.get('price', 0))
+        result["mrp"] = float(product.get('mrp', 0))
+        inv = int(product.get('inventory') or 0)
+        result["inventory"] = inv
+        result["availability"] = "In Stock" if inv > 0 else "Out of Stock"
+    elif details.get("h1"):
+        result["name"] = details["h1"]
+
+    result["manufacturer_details"] = details.get("manufacturer")
+    result["marketer_details"] = details.get("marketer")
+    result["seller_details"] = details.get("seller") # Blinkit often uses "Sold By"
+
+    # One loaded variant per PDP; pack-size siblings are not expanded here
+    result["variant_count"] = 1
+    result["variant_in_stock_count"] = 1 if result["availability"] == "In Stock" else 0
+    return result
+
+
+class ExtractionStats:
+    """Run-wide counters for in-page extraction: evaluate calls, payload bytes, Python parse time."""
+
+    def __init__(self):
+        self.calls = 0
+        self.payload_bytes = 0
+        self.parse_seconds = 0.0
+        self.records = 0
+
+    def record(self, payload_bytes: int, parse_seconds: float, records: int):
+        self.calls += 1
+        self.payload_bytes += payload_bytes
+        self.parse_seconds += parse_seconds
+        self.records += records
+
+    def summary(self) -> dict:
+        return {
+            "evaluate_calls": self.calls,
+            "payload_mb": round(self.payload_bytes / 1_000_000, 2),
+            "avg_payload_kb": round(self.payload_bytes / self.calls / 1000, 1) if self.calls else 0.0,
+            "parse_ms": round(self.parse_seconds * 1000, 1),
+            "records": self.records,
+        }
+
+# Shared by every scraper in the process, so the counters cover the whole run
+EXTRACTION_STATS = ExtractionStats()
+
+
+def parse_payload(raw: Optional[str], stats: ExtractionStats = EXTRACTION_STATS) -> Any:
+    """Decodes a JSON string returned by an extraction script and records its cost."""
+    if raw is None:
+        return None
+    t0 = time.perf_counter()
+    records = json.loads(raw)
+    stats.record(len(raw), time.perf_counter() - t0, len(records) if isinstance(records, list) else 1)
+    return records
+
+
+async def run_extractor(page, script: str, arg: Any = None, stats: ExtractionStats = EXTRACTION_STATS) -> Any:
+    """Runs an extraction script in the page (with `arg`); returns its records, or None if the page had no data."""
+    raw = await page.evaluate(script) if arg is None else await page.evaluate(script, arg)
+    return parse_payload(raw, stats)
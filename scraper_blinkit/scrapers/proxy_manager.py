@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import random
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyStats:
+    """Running health of one proxy."""
+
+    def __init__(self, data: dict = None):
+        data = data or {}
+        self.successes = data.get("successes", 0)
+        self.failures = data.get("failures", 0)
+        self.bans = data.get("bans", 0)
+        self.latency = data.get("latency")  # EWMA of successful request latency (s)
+        self.strikes = data.get("strikes", 0)  # Consecutive bans/failures; drives the cooldown length
+        self.cooldown_until = data.get("cooldown_until", 0.0)  # Wall clock, so it survives restarts
+        self.in_use = 0
+
+    def success_rate(self) -> float:
+        # Laplace-smoothed so a new proxy starts at 0.5 instead of 0 or 1
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def score(self, latency_ref: float) -> float:
+        """Higher is better: success rate, discounted by latency and by how busy the proxy is."""
+        latency = self.latency if self.latency is not None else latency_ref
+        return self.success_rate() / (1 + latency / latency_ref) / (1 + 0.25 * self.in_use)
+
+    def to_dict(self) -> dict:
+        return {"successes": self.successes, "failures": self.failures, "bans": self.bans,
+                "latency": self.latency, "strikes": self.strikes, "cooldown_until": self.cooldown_until}
+
+
+class ProxyManager:
+    """
+    Health-scored proxy pool shared by every scraper in the process.
+
+    - Each request outcome is reported with its latency; a ban (403/429/Access
+      Denied) or `max_failures` failures in a row benches the proxy for
+      `base_cooldown_s`, doubling with every further strike (capped at
+      `max_cooldown_s`). One success resets the strikes.
+    - `acquire(session_key)` is sticky: a pincode session keeps its proxy for as
+      long as that proxy is not benched, so a crawl doesn't hop IPs mid-session.
+      Otherwise the best-scoring available proxy is picked (ties broken randomly).
+    - Scores, cooldowns and sticky assignments are saved to `state_file` (atomic
+      write) so the next run starts from what this one learnt.
+    """
+
+    def __init__(self, proxies_file: str = "proxies.txt",
+                 state_file: str = os.path.join(".session_cache", "proxy_scores.json"),
+                 base_cooldown_s: float = 60.0, max_cooldown_s: float = 3600.0, max_failures: int = 3,
+                 latency_ref: float = 2.0, save_every_s: float = 30.0):
+        self.proxies_file = proxies_file
+        self.state_file = state_file
+        self.base_cooldown_s = base_cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.max_failures = max_failures
+        self.latency_ref = latency_ref
+        self.save_every_s = save_every_s
+        self.stats: Dict[str, ProxyStats] = {}
+        self.sticky: Dict[str, str] = {}
+        self.loaded = False
+        self._last_save = 0.0
+
+    # --- Loading / persistence ---
+
+    def load(self):
+        """Reads proxies.txt and the saved scores (once)."""
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            with open(self.proxies_file, "r") as f:
+                proxies = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+            logger.info(f"Loaded {len(proxies)} proxies from {self.proxies_file}")
+        except FileNotFoundError:
+            logger.warning(f"{self.proxies_file} not found. No proxy rotation available.")
+            return
+        except Exception as e:
+            logger.warning(f"Error loading {self.proxies_file}: {e}")
+            return
+
+        saved = {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Corrupt proxy score file {self.state_file}: {e}")
+
+        saved_stats = saved.get("proxies", {})
+        self.stats = {p: ProxyStats(saved_stats.get(p)) for p in proxies}
+        # Only keep sticky assignments to proxies that are still in the list
+        self.sticky = {k: p for k, p in saved.get("sticky", {}).items() if p in self.stats}
+        benched = sum(1 for s in self.stats.values() if s.cooldown_until > time.time())
+        if saved_stats:
+            logger.info(f"Restored proxy scores from {self.state_file} ({benched} proxies still cooling down)")
+
+    def save(self):
+        if not self.stats:
+            return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "saved_at": time.time(),
+                    "proxies": {p: s.to_dict() for p, s in self.stats.items()},
+                    "sticky": self.sticky,
+                }, f)
+            os.replace(tmp_path, self.state_file)
+            self._last_save = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not save proxy scores {self.state_file}: {e}")
+
+    # --- Selection ---
+
+    def available(self) -> List[str]:
+        now = time.time()
+        return [p for p, s in self.stats.items() if s.cooldown_until <= now]
+
+    def acquire(self, session_key: Optional[str] = None, avoid: Optional[str] = None) -> Optional[str]:
+        """
+        Proxy for `session_key` (sticky), or the best available one. `avoid` excludes a
+        proxy (the one being rotated away from). Returns None when there are no proxies.
+        """
+        self.load()
+        if not self.stats:
+            return None
+
+        current = self.sticky.get(session_key) if session_key else None
+        if current and current != avoid and current in self.available():
+            proxy = current
+        else:
+            candidates = [p for p in self.available() if p != avoid]
+            if not candidates:
+                # Everything is benched: take whichever comes back soonest rather than none at all
+                candidates = sorted([p for p in self.stats if p != avoid] or list(self.stats),
+                                    key=lambda p: self.stats[p].cooldown_until)[:1]
+                logger.warning(f"All proxies are cooling down; using {candidates[0]} anyway")
+            best = max(self.stats[p].score(self.latency_ref) for p in candidates)
+            proxy = random.choice([p for p in candidates if self.stats[p].score(self.latency_ref) >= best * 0.95])
+            if session_key:
+                self.sticky[session_key] = proxy
+
+        self.stats[proxy].in_use += 1
+        return proxy
+
+    def release(self, proxy: Optional[str]):
+        if proxy in self.stats:
+            self.stats[proxy].in_use = max(0, self.stats[proxy].in_use - 1)
+
+    def assign(self, session_key: str, proxy: Optional[str]):
+        """Pins a session (pincode) to the proxy it was located through."""
+        if session_key and proxy in self.stats:
+            self.sticky[session_key] = proxy
+
+    # --- Feedback ---
+
+    def report(self, proxy: Optional[str], ok: bool, latency: Optional[float] = None, banned: bool = False):
+        s = self.stats.get(proxy)
+        if s is None:
+            return
+        if ok:
+            s.successes += 1
+            s.strikes = 0
+            if latency is not None:
+                s.latency = latency if s.latency is None else 0.8 * s.latency + 0.2 * latency
+        else:
+            s.failures += 1
+            s.strikes += 1
+            if banned:
+                s.bans += 1
+            if banned or s.strikes >= self.max_failures:
+                # Doubles with every further strike; plain failures only start counting at max_failures
+                doublings = s.strikes - 1 if banned else s.strikes - self.max_failures
+                cooldown = min(self.max_cooldown_s, self.base_cooldown_s * 2 ** max(0, doublings))
+                s.cooldown_until = time.time() + cooldown
+                # Sessions pinned to it move on at their next acquire
+                logger.warning(f"🪑 Benching proxy {proxy} for {cooldown:.0f}s "
+                               f"({'ban' if banned else f'{s.strikes} failures in a row'})")
+                self.save()
+                return
+        if time.monotonic() - self._last_save >= self.save_every_s:
+            self.save()
+
+    @staticmethod
+    def to_playwright(proxy_str: str) -> Optional[dict]:
+        """'http://user:pass@ip:port' -> Playwright's {'server', 'username', 'password'}."""
+        try:
+            parsed = urllib.parse.urlparse(proxy_str)
+            proxy = {"server": f"{parsed.scheme}://{parsed.hostname}:{parsed.port}"}
+            if parsed.username:
+                proxy["username"] = parsed.username
+            if parsed.password:
+                proxy["password"] = parsed.password
+            return proxy
+        except Exception as e:
+            logger.error(f"Failed to parse proxy {proxy_str}: {e}")
+            return None
+
+    def summary(self) -> dict:
+        now = time.time()
+        return {
+            "proxies": len(self.stats),
+            "benched": sum(1 for s in self.stats.values() if s.cooldown_until > now),
+            "bans": sum(s.bans for s in self.stats.values()),
+            "sticky_sessions": len(self.sticky),
+            "best": max(self.stats, key=lambda p: self.stats[p].score(self.latency_ref)) if self.stats else None,
+        }
+
+# Shared by every scraper in the process, so one worker's ban benches the proxy for all of them
+DEFAULT_PROXY_MANAGER = ProxyManager()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Polite request rate per site: (requests per second, burst). Anything else uses DEFAULT_RATE.
+DOMAIN_RATES: Dict[str, Tuple[float, int]] = {
+    "blinkit.com": (4.0, 16),
+    "zeptonow.com": (4.0, 20),
+    "zepto.com": (4.0, 20),
+    "swiggy.com": (2.0, 8),
+}
+DEFAULT_RATE = (2.0, 8)
+
+
+def domain_of(url: str) -> str:
+    """Registrable domain used as the bucket key (api.zeptonow.com -> zeptonow.com)."""
+    host = (urlparse(url).hostname or "").lower()
+    parts = host.split(".")
+    return ".".join(parts[-2:]) if len(parts) >= 2 else host
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, at most `burst` banked.
+
+    A batch may take more tokens than are available (e.g. 16 fetches fired in one
+    Promise.all); the bucket then goes into debt and later callers wait it off, so
+    the average rate still holds. `jitter` adds up to that fraction of a token
+    interval to each wait so workers do not fire in lock-step.
+    """
+
+    def __init__(self, rate: float, burst: int, jitter: float = 0.3):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock() # Waiters are served in arrival order
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost: int = 1) -> float:
+        """Takes `cost` tokens, sleeping until at least one is available. Returns seconds waited."""
+        waited = 0.0
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                wait += random.uniform(0, self.jitter / self.rate)
+                await asyncio.sleep(wait)
+                waited = wait
+                self._refill()
+            self.tokens -= cost
+        return waited
+
+
+class RateLimiter:
+    """Per-domain token buckets shared by every scraper in the process."""
+
+    def __init__(self, rates: Dict[str, Tuple[float, int]] = None, default: Tuple[float, int] = DEFAULT_RATE):
+        self.rates = dict(DOMAIN_RATES if rates is None else rates)
+        self.default = default
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def configure(self, domain: str, rate: float, burst: int):
+        """Overrides the rate for a domain (takes effect for buckets created afterwards)."""
+        self.rates[domain] = (rate, burst)
+        self.buckets.pop(domain, None)
+
+    def bucket(self, domain: str) -> TokenBucket:
+        if domain not in self.buckets:
+            rate, burst = self.rates.get(domain, self.default)
+            self.buckets[domain] = TokenBucket(rate, burst)
+        return self.buckets[domain]
+
+    async def acquire(self, url: str, cost: int = 1) -> float:
+        domain = domain_of(url)
+        waited = await self.bucket(domain).acquire(cost)
+        stats = self.stats.setdefault(domain, {"requests": 0, "waits": 0, "wait_seconds": 0.0})
+        stats["requests"] += cost
+        if waited:
+            stats["waits"] += 1
+            stats["wait_seconds"] += waited
+        return waited
+
+    def summary(self) -> dict:
+        return {
+            domain: {**s, "wait_seconds": round(s["wait_seconds"], 1)}
+            for domain, s in self.stats.items()
+        }
+
+# Shared by every scraper in the process, so the rate is per site, not per worker
+DEFAULT_LIMITER = RateLimiter()
@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class SessionCache:
+    """
+    Persists located browser sessions on disk, keyed by (platform, pincode).
+
+    After a verified set_location we save `context.storage_state()` (cookies +
+    localStorage) together with a few scraper fields (ETA, store id...). Later runs
+    restore it straight into a new context and skip the location modal entirely.
+    Entries older than `ttl_hours` are treated as missing and removed.
+    """
+
+    def __init__(self, platform: str, cache_dir: str = ".session_cache", ttl_hours: float = 12):
+        self.platform = platform
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_hours * 3600
+
+    def _path(self, pincode: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.platform}_{pincode}.json")
+
+    def load(self, pincode: str) -> Optional[dict]:
+        """Returns {'storage_state', 'meta', 'saved_at'} for a fresh entry, else None."""
+        path = self._path(pincode)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Corrupt session cache entry {path}: {e}")
+            self.invalidate(pincode)
+            return None
+
+        age = time.time() - entry.get("saved_at", 0)
+        if age > self.ttl_seconds:
+            logger.info(f"Session cache for {self.platform}/{pincode} expired ({age / 3600:.1f}h old)")
+            self.invalidate(pincode)
+            return None
+        return entry
+
+    def save(self, pincode: str, storage_state: dict, meta: dict = None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "platform": self.platform,
+            "pincode": pincode,
+            "saved_at": time.time(),
+            "storage_state": storage_state,
+            "meta": meta or {}
+        }
+        path = self._path(pincode)
+        tmp_path = f"{path}.tmp"
+        try:
+            # Write-then-rename so parallel workers never read a half-written file
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            logger.info(f"💾 Cached session for {self.platform}/{pincode}")
+        except Exception as e:
+            logger.warning(f"Could not save session cache {path}: {e}")
+
+    def invalidate(self, pincode: str):
+        try:
+            os.remove(self._path(pincode))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not remove session cache for {pincode}: {e}")
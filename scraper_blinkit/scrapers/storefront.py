@@ -0,0 +1,56 @@
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+from .rate_limit import RateLimiter, DEFAULT_LIMITER, domain_of
+
+logger = logging.getLogger(__name__)
+
+# A local mock answers as fast as the test asks it to; the live sites' polite rates don't apply
+MOCK_RATE = (1000.0, 1000)
+
+
+class Storefront:
+    """
+    Which storefront the scrapers talk to, and whether they behave like a person.
+
+    By default every scraper talks to the live site. `configure(base_url=...)` re-points
+    every site URL (pages, data routes, APIs) at the same path on `base_url`'s origin,
+    e.g. a benchmarks/mock_storefront.py server, so runners can be load-tested offline.
+    Session, category and store caches then get a "_mock" namespace so mock entries never
+    replace live ones. With `human_delays=False` (benchmark mode) the human-like pauses
+    (human_delay, typing and scroll waits) and the runners' start-up staggers are skipped.
+    """
+
+    def __init__(self):
+        self.base_url: Optional[str] = None
+        self.human_delays = True
+
+    @property
+    def is_mock(self) -> bool:
+        return self.base_url is not None
+
+    def configure(self, base_url: Optional[str] = None, human_delays: bool = True,
+                  limiter: RateLimiter = DEFAULT_LIMITER):
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.human_delays = human_delays
+        if self.base_url:
+            limiter.configure(domain_of(self.base_url), *MOCK_RATE)
+            logger.info(f"🧪 Scraping the mock storefront at {self.base_url} (rate limit lifted, caches namespaced)")
+        if not human_delays:
+            logger.info("🧪 Benchmark mode: human delays disabled")
+
+    def url(self, live_url: str) -> str:
+        """`live_url` on the configured origin (same path and query), or unchanged for the live site."""
+        if not self.base_url:
+            return live_url
+        base = urlparse(self.base_url)
+        return urlparse(live_url)._replace(scheme=base.scheme, netloc=base.netloc).geturl()
+
+    def namespace(self, platform: str) -> str:
+        """Cache namespace for `platform`: mock sessions/stores/trees are kept apart from live ones."""
+        return f"{platform}_mock" if self.base_url else platform
+
+
+# Shared by every scraper in the process; the runners configure it from --base-url / --no-human-delay
+DEFAULT_STOREFRONT = Storefront()
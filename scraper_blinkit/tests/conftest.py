@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project's packages (scrapers, utils) the way the runners do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
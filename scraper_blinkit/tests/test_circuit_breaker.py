@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from scrapers.blinkit import BlinkitScraper
+from scrapers.circuit_breaker import BlockedError, CircuitBreaker, HALF_OPEN
+from scrapers.rate_limit import RateLimiter
+
+URL = "https://blinkit.com/cn/fresh-vegetables/cid/1487/1489"
+
+
+class HangingPage:
+    """A page whose navigations and evaluates never finish (or fail, with `error`)."""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    async def goto(self, url, **kwargs):
+        await self._hang()
+
+    async def evaluate(self, script, arg=None):
+        await self._hang()
+
+    async def _hang(self):
+        if self.error:
+            raise self.error
+        await asyncio.sleep(3600)
+
+
+def half_open_scraper(page) -> BlinkitScraper:
+    scraper = BlinkitScraper(headless=True)
+    scraper.circuit_breaker = CircuitBreaker(open_s=0.01)
+    scraper.rate_limiter = RateLimiter(rates={}, default=(1000.0, 1000))
+    scraper.page = page
+    scraper.circuit_breaker.circuit(URL).trip("HTTP 403")
+    return scraper
+
+
+async def assert_canary_handed_over(scraper):
+    circuit = scraper.circuit_breaker.circuit(URL)
+    assert not circuit.canary_in_flight
+    # The next request becomes the canary instead of waiting for a report that never comes
+    assert await asyncio.wait_for(scraper.circuit_breaker.before(URL), 1) is True
+    assert circuit.state == HALF_OPEN
+
+
+def test_cancelled_goto_canary_hands_over_the_slot():
+    async def scenario():
+        scraper = half_open_scraper(HangingPage())
+        await asyncio.sleep(0.02)
+        # The per-tab timeout in scrape_availability_parallel cancels the navigation
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scraper.goto(URL), 0.05)
+        await assert_canary_handed_over(scraper)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_batch_canary_hands_over_the_slot():
+    async def scenario():
+        scraper = half_open_scraper(HangingPage())
+        await asyncio.sleep(0.02)
+        task = asyncio.create_task(scraper._fetch_next_data_batch([URL]))
+        await asyncio.sleep(0.05)
+        assert scraper.circuit_breaker.circuit(URL).canary_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await assert_canary_handed_over(scraper)
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_evaluate_hands_over_the_slot():
+    async def scenario():
+        scraper = half_open_scraper(HangingPage(error=RuntimeError("Target page has been closed")))
+        await asyncio.sleep(0.02)
+        with pytest.raises(RuntimeError):
+            await scraper._fetch_next_data_batch([URL])
+        await assert_canary_handed_over(scraper)
+
+    asyncio.run(scenario())
+
+
+class OneSessionCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def load(self, pincode):
+        return {"storage_state": {}, "meta": {}}
+
+    def invalidate(self, pincode):
+        self.invalidated.append(pincode)
+
+
+def test_blocked_session_check_keeps_the_cached_session():
+    async def scenario():
+        scraper = BlinkitScraper(headless=True)
+        scraper.session_cache = OneSessionCache()
+
+        async def create_context(**kwargs):
+            pass
+
+        async def blocked_check(pincode):
+            raise BlockedError(URL, "HTTP 403")
+
+        scraper._create_context_with_proxy, scraper._is_location_valid = create_context, blocked_check
+        with pytest.raises(BlockedError):
+            await scraper.restore_session("560001")
+        assert scraper.session_cache.invalidated == []
+
+    asyncio.run(scenario())
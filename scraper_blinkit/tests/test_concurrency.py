@@ -0,0 +1,26 @@
+import pytest
+
+from scrapers.circuit_breaker import BlockedError
+from scrapers.concurrency import classify, OK, ERROR, BLOCKED, TIMEOUT
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__("request failed")
+        self.status = status
+
+
+@pytest.mark.parametrize("exc, outcome", [
+    (None, OK),
+    (BlockedError("https://example.com/cn/x/cid/1/2", "HTTP 403"), BLOCKED),
+    (Exception(str(BlockedError("https://example.com/", "cf-mitigated: challenge"))), BLOCKED),
+    (StatusError(403), BLOCKED),
+    (Exception("HTTP 403 Forbidden"), BLOCKED),
+    (Exception("Access Denied"), BLOCKED),
+    (TimeoutError("Timeout 40300ms exceeded"), TIMEOUT),
+    (Exception("Nav failed https://example.com/cn/snacks/cid/1403/2403"), ERROR),
+    (Exception("No product record for prid 100403"), ERROR),
+    (StatusError(500), ERROR),
+])
+def test_classify(exc, outcome):
+    assert classify(exc) == outcome
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("playwright")
+from scrapers.blinkit import BlinkitScraper
+
+GOOD_URL = "https://blinkit.com/cn/fresh-vegetables/cid/1487/1489"
+BAD_URL = "https://blinkit.com/cn/fresh-fruits/cid/1487/1490"
+
+
+def test_null_fields_do_not_break_the_fast_item():
+    pdata = {"product_id": 100001, "name": None, "price": None, "mrp": None, "inventory": None, "merchant": None}
+    item = BlinkitScraper(headless=True)._build_fast_item("100001", pdata, GOOD_URL, "560001")
+    assert item["availability"] == "Out of Stock"
+    assert item["name"] == "N/A"
+    assert item["price"] is None and item["mrp"] is None
+    assert "store_id" not in item
+
+
+def test_bad_category_does_not_drop_the_group():
+    scraper = BlinkitScraper(headless=True)
+    scraper.next_build_id = "build-1"
+
+    async def fetch(data_urls):
+        good = [{"product_id": 1, "name": "Onion 1 kg", "price": 39, "mrp": 45, "inventory": None}]
+        bad = [{"name": "record without a product id"}]
+        return [{"status": 200, "block_reason": None, "products": json.dumps(good)},
+                {"status": 200, "block_reason": None, "products": json.dumps(bad)}]
+
+    scraper._fetch_next_data_batch = fetch
+    items = asyncio.run(scraper.scrape_categories_next_data([GOOD_URL, BAD_URL], pincode="560001"))
+    assert [i["product_id"] for i in items] == ["1"]
+    assert scraper.failed_category_urls == [BAD_URL]
+
+
+def test_block_keeps_the_rows_already_scraped():
+    scraper = BlinkitScraper(headless=True)
+    scraper.next_build_id = "build-1"
+    urls = [f"https://blinkit.com/cn/aisle-{i}/cid/1487/{i}" for i in range(5)]
+    batches = []
+
+    async def fetch(data_urls):
+        batches.append(data_urls)
+        if len(batches) == 1:
+            good = [{"product_id": 1, "name": "Onion 1 kg", "price": 39, "mrp": 45, "inventory": 3}]
+            return [{"status": 200, "block_reason": None, "products": json.dumps(good)},
+                    {"status": 200, "block_reason": None, "products": json.dumps(good)}]
+        return [{"status": 200, "block_reason": None, "products": "[]"},
+                {"status": 403, "block_reason": "HTTP 403", "products": None}]
+
+    scraper._fetch_next_data_batch = fetch
+    items = asyncio.run(scraper.scrape_categories_next_data(urls, pincode="560001", concurrency=2))
+    assert [i["product_url"] for i in items] == urls[:2]
+    assert scraper.blocked and scraper.blocked.url == urls[3]
+    # Nothing is fetched after the block; everything not scraped is left for the resume
+    assert len(batches) == 2
+    assert scraper.failed_category_urls == urls[3:]
@@ -0,0 +1,38 @@
+import csv
+
+import pytest
+
+pytest.importorskip("playwright")
+from scrapers.blinkit import BlinkitScraper
+from utils.sinks import CsvSink
+from utils.store_dedup import StoreGroup, fan_out
+
+CATEGORY_URL = "https://blinkit.com/cn/fresh-vegetables/cid/1487/1489"
+PRODUCT = {"product_id": 100001, "name": "Onion 1 kg", "price": 39, "mrp": 45, "inventory": 12,
+           "merchant": {"id": 30007, "type": "express"}}
+
+
+def write_fast_path_row(path: str):
+    """Writes one fast-path row, fanned out to two pincodes, the way the runner's writer does."""
+    item = BlinkitScraper(headless=True)._build_fast_item("100001", PRODUCT, CATEGORY_URL, "560001")
+    rows = fan_out([item], StoreGroup("30007", ["560001", "560002"]))
+    sink = CsvSink(path)
+    for pincode_rows in rows.values():
+        sink.write(pincode_rows)
+    sink.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        return item, sink, list(csv.DictReader(f))
+
+
+def test_fast_path_row_keeps_every_column(tmp_path):
+    _, sink, written = write_fast_path_row(str(tmp_path / "out.csv"))
+    assert not sink.dropped
+    assert [r["pincode_input"] for r in written] == ["560001", "560002"]
+    assert all(r["product_url"] == CATEGORY_URL and r["store_id"] == "30007" for r in written)
+
+
+def test_csv_and_streamed_rows_upload_the_same_url(tmp_path):
+    pytest.importorskip("supabase")
+    from upload_blinkit_data import clean_csv_keys
+    item, _, written = write_fast_path_row(str(tmp_path / "out.csv"))
+    assert clean_csv_keys(written[0])["url"] == clean_csv_keys(item)["url"] == CATEGORY_URL
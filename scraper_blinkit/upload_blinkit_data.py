@@ -1,14 +1,17 @@
 import asyncio
-import csv
 import argparse
 import os
 import logging
 from database import Database
+from uploader import BulkUploader, PostgrestClient
+from utils.sinks import read_rows
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Blinkit_Uploader")
 
+DEAD_LETTER_FILE = "blinkit_upload_dead_letter.jsonl"
+
 def clean_csv_keys(row: dict) -> dict:
     """
     Cleans CSV row keys to match Supabase schema if necessary.
@@ -48,17 +51,19 @@ def clean_csv_keys(row: dict) -> dict:
     return {k: v for k, v in cleaned.items() if k in allowed_cols}
 
 
-def process_upload(file_path: str, table_name: str = "blinkit_products") -> bool:
+async def process_upload(file_path: str, table_name: str = "blinkit_products") -> bool:
     """
-    Reads a CSV file and uploads it to Supabase.
-    Returns True if fully successful (or partially successful), False if fatal error.
+    Reads a CSV file (or Parquet dataset) and uploads it to Supabase (or POSTGREST_URL).
+    Returns True if every row was uploaded or dead-lettered for replay, False if fatal error.
     """
     if not os.path.exists(file_path):
         logger.error(f"File {file_path} does not exist.")
         return False
 
+    # DATABASE_URL (postgres://...) loads with COPY instead of the REST API
     db = Database()
-    if not db.client:
+    client = None if db.pg else PostgrestClient.from_env()
+    if not (db.pg or client):
         logger.error("Database connection failed. Check .env file.")
         return False
 
@@ -66,28 +71,23 @@ def process_upload(file_path: str, table_name: str = "blinkit_products") -> bool
     logger.info(f"Reading {file_path}...")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                records.append(clean_csv_keys(row))
+        for row in read_rows(file_path):
+            records.append(clean_csv_keys(row))
                 
         if not records:
             logger.warning("No records found in CSV.")
             return True # Not an error, just empty
 
-        # Upload in batches of 100
-        batch_size = 100
-        total_batches = (len(records) + batch_size - 1) // batch_size
-        
-        logger.info(f"Found {len(records)} records. Uploading in {total_batches} batches...")
-        
-        for i in range(total_batches):
-            batch = records[i*batch_size : (i+1)*batch_size]
-            success = db.save_products(batch, table_name=table_name)
-            if success:
-                logger.info(f"Batch {i+1}/{total_batches} uploaded.")
-            else:
-                logger.error(f"Batch {i+1}/{total_batches} failed.")
+        if db.pg:
+            logger.info(f"Found {len(records)} records. Loading with COPY...")
+            return db.save_products(records, table_name=table_name)
+
+        logger.info(f"Found {len(records)} records. Uploading in concurrent batches...")
+        uploader = BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE)
+        stats = await uploader.upload(records, table_name)
+        if stats["dead_lettered"]:
+            logger.warning(f"{stats['dead_lettered']} rows saved to {DEAD_LETTER_FILE}. "
+                           f"Re-send them with: python upload_blinkit_data.py --replay")
                 
         logger.info("Upload process completed.")
         return True
@@ -96,14 +96,27 @@ def process_upload(file_path: str, table_name: str = "blinkit_products") -> bool
         logger.error(f"Error processing file: {e}")
         return False
 
+async def replay_dead_letters() -> bool:
+    client = PostgrestClient.from_env()
+    if not client:
+        logger.error("Database connection failed. Check .env file.")
+        return False
+    stats = await BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE).replay()
+    return stats["dead_lettered"] == 0
+
 def main():
     parser = argparse.ArgumentParser(description="Upload Blinkit CSV Data to Supabase")
-    parser.add_argument("file", type=str, help="Path to the CSV file to upload")
+    parser.add_argument("file", type=str, nargs="?", help="Path to the CSV file (or .parquet dataset) to upload")
     parser.add_argument("--table", type=str, default="blinkit_products", help="Target Supabase table name")
+    parser.add_argument("--replay", action="store_true", help=f"Re-send the rows in {DEAD_LETTER_FILE}")
     args = parser.parse_args()
 
-    process_upload(args.file, args.table)
+    if args.replay:
+        asyncio.run(replay_dead_letters())
+    elif args.file:
+        asyncio.run(process_upload(args.file, args.table))
+    else:
+        parser.error("a file to upload or --replay is required")
 
 if __name__ == "__main__":
     main()
-
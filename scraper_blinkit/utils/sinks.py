@@ -0,0 +1,245 @@
+import csv
+import glob
+import logging
+import os
+import time
+from typing import Dict, List, Tuple
+
+from .run_journal import truncate_output
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional (pip install pyarrow)
+    pa = pq = None
+
+logger = logging.getLogger("Sinks")
+
+# Fixed Blinkit row schema: (column, kind). "category" columns are low-cardinality and
+# dictionary-encoded in Parquet; "float"/"int" values that don't parse (e.g. "N/A") become null.
+BLINKIT_COLUMNS: List[Tuple[str, str]] = [
+    ("platform", "category"),
+    ("category", "category"),
+    ("subcategory", "category"),
+    ("clicked_label", "category"),
+    ("name", "text"),
+    ("brand", "category"),
+    ("base_product_id", "text"),
+    ("product_id", "text"),
+    ("group_id", "text"),
+    ("merchant_type", "category"),
+    ("mrp", "float"),
+    ("price", "float"),
+    ("weight", "category"),
+    ("shelf_life_in_hours", "int"),
+    ("eta", "category"),
+    ("availability", "category"),
+    ("inventory", "int"),
+    ("store_id", "category"),
+    ("product_url", "text"),
+    ("image_url", "text"),
+    ("scraped_at", "category"),
+    ("pincode_input", "category"),
+    ("error", "category"),
+    ("manufacturer_details", "text"),
+    ("marketer_details", "text"),
+    ("variant_count", "int"),
+    ("variant_in_stock_count", "int"),
+    ("seller_details", "text"),
+    ("served_by_store", "category"),
+]
+
+DEFAULT_ROW_GROUP_SIZE = 10_000
+
+
+def _warn_extra_keys(sink, rows: List[dict]):
+    """Logs (once per key) row keys that are not in the sink's schema and get dropped."""
+    for row in rows:
+        extra = row.keys() - sink.names - sink.dropped
+        if extra:
+            sink.dropped |= extra
+            logger.warning(f"⚠️ Columns not in the {sink.path} schema are dropped: {sorted(extra)}")
+
+
+class CsvSink:
+    """
+    Appends rows to one CSV through a persistent handle, with a fixed header.
+
+    Positions are byte offsets: every written row is in the file (flushed) as soon
+    as `write` returns, so the returned mark is immediately committable.
+    """
+    extension = ".csv"
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]] = BLINKIT_COLUMNS):
+        self.path = path
+        self.columns = columns
+        self.names = {name for name, _ in columns}
+        self.dropped = set()
+        # A resumed run keeps appending after the last committed row
+        resumed = os.path.exists(path) and os.path.getsize(path) > 0
+        self.f = open(path, 'a' if resumed else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.f, fieldnames=[name for name, _ in columns], extrasaction='ignore')
+        if not resumed:
+            self.writer.writeheader()
+        self.f.flush()
+        self.offset = os.fstat(self.f.fileno()).st_size
+
+    def write(self, rows: List[dict]) -> int:
+        """Writes rows; returns the position that covers them."""
+        if rows:
+            _warn_extra_keys(self, rows)
+            self.writer.writerows(rows)
+            self.f.flush()
+            self.offset = os.fstat(self.f.fileno()).st_size
+        return self.offset
+
+    def position(self) -> int:
+        return self.offset
+
+    def sync(self):
+        if not self.f.closed:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+
+    def close(self):
+        if not self.f.closed:
+            self.sync()
+            self.f.close()
+
+    @staticmethod
+    def truncate(path: str, position: int):
+        truncate_output(path, position)
+
+
+class ParquetSink:
+    """
+    Writes rows as a Parquet dataset: `path` is a directory of part files, one row
+    group of up to `row_group_size` rows each (pandas/pyarrow read the directory
+    as one table).
+
+    Columns follow the fixed schema; "category" columns are dictionary-encoded so
+    repeated category/brand/pincode/store strings are stored once per row group.
+    Rows are buffered in memory until a row group fills up or has waited
+    `flush_seconds`; each part is written to a temp file, fsynced and renamed, so
+    positions (the number of finished parts) never point at a partial file.
+    """
+    extension = ".parquet"
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]] = BLINKIT_COLUMNS,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: str = "zstd",
+                 flush_seconds: float = 300.0):
+        if pa is None:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.columns = columns
+        self.names = {name for name, _ in columns}
+        self.dropped = set()
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.flush_seconds = flush_seconds
+        self.schema = pa.schema([(name, self._arrow_type(kind)) for name, kind in columns])
+        self.buffer: List[dict] = []
+        self._buffered_since = 0.0
+
+        os.makedirs(path, exist_ok=True)
+        # A resumed run continues after the parts that survived truncate()
+        self.parts = len(glob.glob(os.path.join(path, "part-*.parquet")))
+
+    @staticmethod
+    def _arrow_type(kind: str):
+        if kind == "category":
+            return pa.dictionary(pa.int32(), pa.string())
+        return {"float": pa.float64(), "int": pa.int64()}.get(kind, pa.string())
+
+    @staticmethod
+    def _coerce(value, kind: str):
+        if value is None or value == "":
+            return None
+        if kind in ("float", "int"):
+            try:
+                return float(value) if kind == "float" else int(float(value))
+            except (TypeError, ValueError):
+                return None
+        return str(value)
+
+    def write(self, rows: List[dict]) -> int:
+        """Buffers rows (writing full row groups); returns the position that will cover them."""
+        if rows:
+            _warn_extra_keys(self, rows)
+            if not self.buffer:
+                self._buffered_since = time.monotonic()
+            self.buffer.extend(rows)
+        while len(self.buffer) >= self.row_group_size:
+            self._write_part(self.buffer[:self.row_group_size])
+            self.buffer = self.buffer[self.row_group_size:]
+            self._buffered_since = time.monotonic()
+        if self.buffer and time.monotonic() - self._buffered_since >= self.flush_seconds:
+            self._write_part(self.buffer)
+            self.buffer = []
+        return self.parts + (1 if self.buffer else 0)
+
+    def _write_part(self, rows: List[dict]):
+        arrays = []
+        for name, kind in self.columns:
+            values = [self._coerce(row.get(name), kind) for row in rows]
+            if kind == "category":
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, self.schema.field(name).type))
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+
+        part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        tmp = f"{part}.tmp"
+        with open(tmp, "wb") as f:
+            pq.write_table(table, f, row_group_size=len(rows), compression=self.compression,
+                           use_dictionary=[name for name, kind in self.columns if kind == "category"])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, part)
+        self.parts += 1
+
+    def position(self) -> int:
+        return self.parts
+
+    def sync(self):
+        # Parts are fsynced as they are written; buffered rows are not covered by position()
+        pass
+
+    def close(self):
+        if self.buffer:
+            self._write_part(self.buffer)
+            self.buffer = []
+
+    @staticmethod
+    def truncate(path: str, position: int):
+        """Drops parts after the last committed one (and any half-written temp file)."""
+        if not os.path.isdir(path):
+            return
+        dropped = 0
+        for part in glob.glob(os.path.join(path, "part-*.parquet*")):
+            index = int(os.path.basename(part)[5:10])
+            if index >= position or part.endswith(".tmp"):
+                os.remove(part)
+                dropped += 1
+        if dropped:
+            logger.info(f"✂️ Removed {dropped} uncommitted parts from {path}")
+
+
+SINKS: Dict[str, type] = {"csv": CsvSink, "parquet": ParquetSink}
+
+
+def open_sink(output_format: str, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+    """Opens the sink for `output_format` ("csv" or "parquet") at `path`."""
+    if output_format == "parquet":
+        return ParquetSink(path, row_group_size=row_group_size)
+    return CsvSink(path)
+
+
+def read_rows(path: str) -> List[dict]:
+    """Reads back the rows of a CSV file or Parquet dataset written by a sink."""
+    if os.path.isdir(path) or path.endswith(ParquetSink.extension):
+        if pq is None:
+            raise RuntimeError("Reading Parquet output needs pyarrow: pip install pyarrow")
+        return pq.read_table(path).to_pylist()
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
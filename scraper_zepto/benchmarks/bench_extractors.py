@@ -0,0 +1,135 @@
+"""
+Offline replay benchmark for the Zepto card parsing: no browser, no network.
+
+Runs ZeptoScraper._extract_cards (Flight/RSC decode into ProductCards) and the full
+_extract_cards + _cards_to_items path every scrape mode ends in, over the same payloads as
+bench_rsc_parser: recorded *.rsc bodies and *.flight.txt pages in benchmarks/fixtures/, plus a
+synthetic category stream (--products N) so the suite also runs on a fresh checkout.
+
+Per payload it reports throughput (products/s over the median of --repeat runs), peak traced
+memory, and the blocks/KB allocated by one run that are still alive when it returns (tracemalloc).
+Results go to --out as JSON, tagged with the git commit; --compare prints the change against
+an earlier results file.
+
+Usage:
+    python benchmarks/bench_extractors.py [--products 2000] [--repeat 5] [--out results.json] [--compare old.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scrapers.zepto import ZeptoScraper
+from bench_rsc_parser import load_payloads
+
+CATEGORY_URL = "https://www.zepto.com/cn/fruits-vegetables/fresh-fruits/cid/64374cfe/scid/09e63c15"
+SCRAPER = ZeptoScraper(headless=True)  # Never started: only its parsing methods are used
+
+
+def extract_cards(payload: str):
+    return SCRAPER._extract_cards(payload)
+
+
+def cards_to_items(payload: str):
+    return SCRAPER._cards_to_items(SCRAPER._extract_cards(payload), CATEGORY_URL, "400001")
+
+
+EXTRACTORS = {"extract_cards": extract_cards, "cards_to_items": cards_to_items}
+
+
+def measure(fn, payload, repeat: int) -> dict:
+    """Median/min wall time over `repeat` runs, then one more run under tracemalloc for memory."""
+    runs = []
+    products = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        products = len(fn(payload))
+        runs.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn(payload)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot().filter_traces(own)
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    del result
+
+    median = statistics.median(runs)
+    return {
+        "products": products,
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(min(runs) * 1000, 2),
+        "products_per_s": round(products / median) if median else None,
+        "peak_kb": round(peak / 1024, 1),
+        "alloc_blocks": sum(s.count_diff for s in diff),
+        "alloc_kb": round(sum(s.size_diff for s in diff) / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["payload"], r["extractor"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    for r in results:
+        b = old.get((r["payload"], r["extractor"]))
+        if not b or not b["products_per_s"] or not r["products_per_s"]:
+            continue
+        speed = (r["products_per_s"] / b["products_per_s"] - 1) * 100
+        print(f"  {r['payload']:<36} {r['extractor']:<16} {speed:+6.1f}% products/s, "
+              f"peak {b['peak_kb']:.0f} -> {r['peak_kb']:.0f} KB, blocks {b['alloc_blocks']} -> {r['alloc_blocks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Zepto card parsing")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # scrapers.base configures INFO logging on import
+
+    results = []
+    for name, payload in load_payloads(args.products).items():
+        print(f"\n{name} ({len(payload.encode('utf-8')) / 1_000_000:.2f} MB)")
+        for extractor, fn in EXTRACTORS.items():
+            row = {"payload": name, "extractor": extractor, "bytes": len(payload.encode("utf-8")),
+                   **measure(fn, payload, args.repeat)}
+            results.append(row)
+            print(f"  {extractor:<16} {row['median_ms']:>9.2f} ms  {row['products']:>6} products  "
+                  f"{row['products_per_s'] or 0:>9,} products/s  peak {row['peak_kb']:>8.1f} KB  {row['alloc_blocks']:>6} blocks")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"suite": "zepto_extractors", "commit": git_commit(), "created_at": datetime.now().isoformat(),
+                       "python": platform.python_version(), "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: shared Flight/RSC decoder vs the parsers it replaced.
+
+Payloads:
+  - every recorded payload in benchmarks/fixtures/ (*.rsc raw RSC bodies, *.flight.txt saved
+    category page HTML). Record one from a live session with e.g.
+        open("benchmarks/fixtures/fruits.rsc", "w").write(await response.text())
+  - a synthetic category stream (--products N cards, every fifth referencing a product row),
+    so the benchmark also runs on a fresh checkout.
+
+Usage:
+    python benchmarks/bench_rsc_parser.py [--products 2000] [--repeat 5] [--out results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scrapers.rsc import FlightStream, iter_product_cards
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def synthetic_stream(n_products: int) -> str:
+    """Category-sized Flight stream: layout/module rows, grid rows of cards and a text row."""
+    dumps = lambda v: json.dumps(v, separators=(",", ":"))
+    rows = ['0:["$","$L1",null,{"children":"$2"}]', '1:I["4512",["static/chunks/4512.js"],"ProductGrid"]']
+    cards = []
+    for i in range(n_products):
+        product = {"name": f"Product {i} 500 g", "brand": f"Brand{i % 40}", "slug": f"product-{i}"}
+        if i % 5 == 0:
+            # Every fifth card points at a shared product row instead of inlining it
+            product_row = f"{3 + i:x}"
+            rows.append(f'{product_row}:' + dumps(product))
+            product = f"${product_row}"
+        cards.append({"cardData": {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "product": product,
+            "productVariant": {"id": f"v-{i}", "formattedPacksize": "500 g", "mrp": 12000, "shelfLifeInHours": "72"},
+            "sellingPrice": 9900 + i,
+            "mrp": 12000,
+            "availableQuantity": i % 7,
+            "storeId": "store-1",
+        }})
+    # Grid rows of 24 cards, each card listed twice (rails + grid) like the live pages
+    for start in range(0, len(cards), 24):
+        chunk = cards[start:start + 24]
+        rows.append(f'{3 + n_products + start:x}:' + dumps(["$", "div", None, {"items": chunk + chunk}]))
+    rows.append(f'{4 + 2 * n_products:x}:T{len("<p>terms</p>"):x},<p>terms</p>')
+    return "\n".join(rows) + "\n"
+
+
+# --- Parsers being replaced (kept verbatim in spirit for comparison) ---
+
+def legacy_fast(text: str) -> int:
+    """scrape_assortment_fast before the decoder: per-line split + json.loads + recursive find_cards."""
+    captured = {}
+    if '"cardData":' not in text:
+        return 0
+    for line in text.split('\n'):
+        if '"cardData":' in line:
+            parts = line.split(':', 1)
+            json_part = parts[1] if len(parts) > 1 else line
+            try:
+                data = json.loads(json_part)
+
+                def find_cards(obj):
+                    cards = []
+                    if isinstance(obj, dict):
+                        if "cardData" in obj:
+                            cards.append(obj["cardData"])
+                        for k, v in obj.items():
+                            cards.extend(find_cards(v))
+                    elif isinstance(obj, list):
+                        for item in obj:
+                            cards.extend(find_cards(item))
+                    return cards
+
+                for card in find_cards(data):
+                    if "id" in card:
+                        captured[card["id"]] = card
+            except:
+                pass
+    # Cards whose product is a row reference had no name and were dropped by the old mapper
+    return sum(1 for card in captured.values() if isinstance(card.get("product"), dict) and card["product"].get("name"))
+
+
+def legacy_regex_windows(text: str) -> int:
+    """scrape_assortment before the decoder: regex over every escaped id + 2 KB windows + O(n^2) dedup."""
+    escaped = json.dumps(text)  # Inline Flight data is an escaped JS string in the HTML
+    details = {}
+    for match in re.finditer(r'\\\"id\\\":\\\"([a-f0-9\-]+)\\\"', escaped):
+        window = escaped[max(0, match.start() - 1000):match.end() + 1000]
+        entry = {}
+        qty = re.search(r'\\\"availableQuantity\\\":(\d+)', window)
+        if qty: entry['inventory'] = qty.group(1)
+        shelf = re.search(r'\\\"shelfLifeInHours\\\":\\\"([^\"]+)\\\"', window)
+        if shelf: entry['shelf_life'] = shelf.group(1)
+        pack = re.search(r'\\\"packsize\\\":(\d+)', window)
+        if pack: entry['pack_size_raw'] = pack.group(1)
+        if entry:
+            details.setdefault(match.group(1), {}).update(entry)
+    products = []
+    for pid in details:
+        if not any(p['id'] == pid for p in products):
+            products.append({'id': pid})
+    return len(products)
+
+
+def decoder(text: str) -> int:
+    return sum(1 for _ in iter_product_cards(text))
+
+
+def time_it(fn, payload, repeat):
+    runs = []
+    count = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        count = fn(payload)
+        runs.append(time.perf_counter() - t0)
+    return {"products": count, "median_ms": round(statistics.median(runs) * 1000, 2), "min_ms": round(min(runs) * 1000, 2)}
+
+
+def load_payloads(n_products: int):
+    payloads = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.rsc")) + glob.glob(os.path.join(FIXTURES_DIR, "*.flight.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            payloads[os.path.basename(path)] = f.read()
+    payloads[f"synthetic_{n_products}"] = synthetic_stream(n_products)
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flight/RSC decoder")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    for name, payload in load_payloads(args.products).items():
+        row = {"payload": name, "bytes": len(payload.encode("utf-8")),
+               "decoder": time_it(decoder, payload, args.repeat)}
+        # The legacy parsers only understand raw row text, not HTML-embedded chunks
+        raw = payload if "self.__next_f.push" not in payload else "\n".join(
+            f"{k}:{json.dumps(v)}" for k, v in FlightStream.from_html(payload).rows.items())
+        row["legacy_fast"] = time_it(legacy_fast, raw, args.repeat)
+        row["legacy_regex"] = time_it(legacy_regex_windows, raw, args.repeat)
+        results.append(row)
+
+        print(f"\n{name} ({row['bytes'] / 1_000_000:.2f} MB)")
+        for key in ("decoder", "legacy_fast", "legacy_regex"):
+            r = row[key]
+            print(f"  {key:<13} {r['median_ms']:>9.2f} ms  ({r['products']} products)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,143 @@
 import os
 import logging
-from typing import List, Dict, Any
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Optional
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+try:
+    import psycopg
+    from psycopg import sql
+except ImportError:  # Direct Postgres loading is optional (pip install "psycopg[binary]")
+    psycopg = None
+
 # Load environment variables
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger("Database")
 
+def _to_int(v):
+    return int(float(v))
+
+def _to_datetime(v):
+    return v if isinstance(v, datetime) else datetime.fromisoformat(str(v))
+
+def _to_datetimetz(v):
+    dt = _to_datetime(v)
+    return dt if dt.tzinfo else dt.astimezone()  # naive = local time, like the text format
+
+def _to_date(v):
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+# Python conversions for COPY ... (FORMAT BINARY), by Postgres type name. Binary COPY
+# sends each value in the column's wire format, so "12.5" must become Decimal("12.5")
+# for a numeric column. Other column types need the text format.
+BINARY_COERCE = {
+    "int2": _to_int, "int4": _to_int, "int8": _to_int,
+    "float4": float, "float8": float,
+    "numeric": lambda v: Decimal(str(v)),
+    "bool": lambda v: v if isinstance(v, bool) else str(v).lower() in ("true", "t", "1", "yes"),
+    "text": str, "varchar": str, "bpchar": str,
+    "timestamp": _to_datetime, "timestamptz": _to_datetimetz, "date": _to_date,
+}
+
+
+class PostgresCopyLoader:
+    """
+    Bulk-loads rows straight into Postgres with COPY FROM STDIN (psycopg 3).
+
+    `copy_format` is "text" (Postgres parses every value; works for any column type)
+    or "binary" (no server-side parsing; values are converted per BINARY_COERCE).
+    Rows are sent in one COPY per call, in a single transaction.
+    """
+
+    def __init__(self, dsn: str, copy_format: str = "text"):
+        if psycopg is None:
+            raise RuntimeError('Postgres loading needs psycopg: pip install "psycopg[binary]"')
+        if copy_format not in ("text", "binary"):
+            raise ValueError(f"Unknown COPY format: {copy_format}")
+        self.dsn = dsn
+        self.copy_format = copy_format
+        self.conn = None
+        self._column_types: Dict[str, Dict[str, tuple]] = {}
+
+    def connect(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg.connect(self.dsn)
+        return self.conn
+
+    def column_types(self, table_name: str) -> Dict[str, tuple]:
+        """column -> (type oid, type name), cached per table."""
+        if table_name not in self._column_types:
+            rows = self.connect().execute("""
+                SELECT a.attname, a.atttypid, t.typname
+                FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid
+                WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+            """, (table_name,)).fetchall()
+            self._column_types[table_name] = {name: (oid, typname) for name, oid, typname in rows}
+        return self._column_types[table_name]
+
+    def copy_rows(self, table_name: str, rows: List[Dict[str, Any]]) -> int:
+        """COPYs rows into table_name (columns taken from the first row). Raises on failure."""
+        if not rows:
+            return 0
+        columns = list(rows[0].keys())
+        statement = sql.SQL("COPY {} ({}) FROM STDIN{}").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, columns)),
+            sql.SQL(" (FORMAT BINARY)" if self.copy_format == "binary" else ""),
+        )
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur, cur.copy(statement) as copy:
+                if self.copy_format == "binary":
+                    types = self.column_types(table_name)
+                    unsupported = [c for c in columns if types[c][1] not in BINARY_COERCE]
+                    if unsupported:
+                        raise ValueError(f"Binary COPY can't convert columns {unsupported}; use copy_format='text'")
+                    copy.set_types([types[c][0] for c in columns])
+                    coerce = [BINARY_COERCE[types[c][1]] for c in columns]
+                    for row in rows:
+                        copy.write_row([None if row.get(c) in (None, "") else f(row.get(c))
+                                        for c, f in zip(columns, coerce)])
+                else:
+                    for row in rows:
+                        copy.write_row([row.get(c) for c in columns])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
 class Database:
-    def __init__(self):
+    """
+    Supabase (PostgREST) access, plus a direct Postgres COPY path for bulk loads.
+
+    A postgres:// or postgresql:// connection string (`dsn`, or DATABASE_URL in the
+    environment) selects COPY for save_products; otherwise rows go through the
+    Supabase REST client.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, copy_format: str = "text"):
         self.url = os.environ.get("SUPABASE_URL")
         self.key = os.environ.get("SUPABASE_KEY")
         self.client: Client = None
+        self.pg: Optional[PostgresCopyLoader] = None
+
+        dsn = dsn or os.environ.get("DATABASE_URL")
+        if dsn and dsn.startswith(("postgres://", "postgresql://")):
+            try:
+                self.pg = PostgresCopyLoader(dsn, copy_format)
+                logger.info(f"Postgres COPY loader enabled ({copy_format} format).")
+            except Exception as e:
+                logger.error(f"Failed to set up Postgres COPY loader: {e}")
         
         if self.url and self.key:
             try:
@@ -23,12 +146,22 @@ class Database:
             except Exception as e:
                 logger.error(f"Failed to initialize Supabase client: {e}")
         else:
-            logger.warning("SUPABASE_URL or SUPABASE_KEY not found in environment variables. Database features will be disabled.")
+            if not self.pg:
+                logger.warning("SUPABASE_URL or SUPABASE_KEY not found in environment variables. Database features will be disabled.")
 
     def save_products(self, products: List[Dict[str, Any]], table_name: str = "zepto_assortment"):
         """
         Upserts a list of products into the specified table.
         """
+        if self.pg:
+            try:
+                self.pg.copy_rows(table_name, products)
+                logger.info(f"Successfully copied {len(products)} records into {table_name}.")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to COPY data into {table_name}: {e}")
+                return False
+
         if not self.client:
             logger.warning("Supabase client not active. Skipping upload.")
             return False
@@ -1,59 +1,107 @@
 
+import argparse
 import asyncio
 import logging
+import math
 import random
 import os
 import csv
+import collections
 import subprocess
 from datetime import datetime
 import pandas as pd
 from scrapers.zepto import ZeptoScraper
+from scrapers.browser_pool import BrowserPool
+from scrapers.rate_limit import DEFAULT_LIMITER
+from scrapers.readiness import READINESS_STATS
+from scrapers.circuit_breaker import BlockedError, DEFAULT_BREAKER
+from scrapers.recycling import DEFAULT_RECYCLE_POLICY
+from scrapers.storefront import DEFAULT_STOREFRONT
+from scrapers.concurrency import AIMDController, AdaptiveSemaphore, classify, OK, BLOCKED
+from utils.store_dedup import StoreMap, resolve_stores, group_by_store, fan_out
+from utils.run_journal import RunJournal, split_by_progress
+from utils.sinks import SINKS, DEFAULT_ROW_GROUP_SIZE, open_sink
+from uploader import BulkUploader, DatabaseSink, PostgrestClient
+from upload_zepto_data import clean_csv_keys, DEAD_LETTER_FILE
 
 # Configuration
 INPUT_FILE = "pin_codes_40.xlsx"
 OUTPUT_FILE = f"zepto_assortment_parallel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 PERF_FILE = f"zepto_performance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-MAX_WORKERS = 4 
+DECISIONS_FILE = PERF_FILE.replace("performance_report", "concurrency_decisions")
+MAX_WORKERS = 8  # Workers share POOL_BROWSERS Chromium processes
+POOL_BROWSERS = 2
+USE_TURBO = True  # Replay category APIs in parallel from the located page instead of navigating
+TURBO_MIN_SUCCESS_RATE = 0.8  # Warn when fewer categories than this come back from turbo mode
+ADAPTIVE_CONCURRENCY = True  # AIMD-tune active workers and turbo wave size (fixed at the values below when off)
+INITIAL_WORKERS = 3  # Grows towards max_workers while latency and block rates stay healthy
+TURBO_CONCURRENCY = 20  # Initial API requests per turbo wave
+MAX_TURBO_CONCURRENCY = 40
+DEDUP_BY_STORE = True  # Crawl each dark store (storeId) once and copy rows to the pincodes it serves
+OUTPUT_FORMAT = "csv"  # "parquet" writes a dictionary-encoded Parquet dataset (needs pyarrow)
+ROW_GROUP_SIZE = DEFAULT_ROW_GROUP_SIZE  # Rows per Parquet row group / part file
+STREAM_TO_DB = False  # Upload batches while scraping instead of re-reading the output file afterwards
+DB_TABLE = "zepto_assortment"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Zepto_Assortment_Runner")
 
-async def writer_task(queue: asyncio.Queue, filename: str):
-    """Listens for data batches and appends to CSV."""
-    file_initialized = False
-    
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = None
-        while True:
-            try:
-                batch = await queue.get()
-                if batch is None: # Poison pill
-                    queue.task_done()
-                    break
-                    
-                # Filter valid products
-                valid_products = [p for p in batch if isinstance(p, dict) and ('Price' in p or 'Item Name' in p)]
-                
-                if valid_products:
-                    if not file_initialized:
-                        writer = csv.DictWriter(f, fieldnames=valid_products[0].keys())
-                        writer.writeheader()
-                        file_initialized = True
-                    
-                    if writer:
-                        writer.writerows(valid_products)
-                        f.flush() # Ensure data is written
-                        
-                    logger.info(f"💾 Saved {len(valid_products)} products to CSV.")
-                
+async def writer_task(queue: asyncio.Queue, sink, journal: RunJournal = None, db_sink: DatabaseSink = None):
+    """
+    Listens for (rows, units) batches and writes the rows to the output sink
+    (and, with a db_sink, streams them to the database as well).
+    Finished units are journalled with the sink position after their rows (see RunJournal),
+    once those rows are actually in the output (a Parquet sink buffers a row group first).
+    """
+    held = collections.deque()  # (units, position) waiting for their rows to reach the output
+
+    def commit_ready():
+        while held and held[0][1] <= sink.position():
+            units, position = held.popleft()
+            journal.record(units, position)
+        if journal.due():
+            # Rows must be on disk before the journal says they are
+            sink.sync()
+            journal.flush()
+
+    while True:
+        try:
+            item = await queue.get()
+            if item is None: # Poison pill
                 queue.task_done()
-            except Exception as e:
-                logger.error(f"Writer task error: {e}")
+                break
+            batch, units = item
+                
+            # Filter valid products
+            valid_products = [p for p in batch if isinstance(p, dict) and ('Price' in p or 'Item Name' in p)]
+            
+            position = sink.write(valid_products)
+            if db_sink:
+                await db_sink.put(valid_products)
+            if valid_products:
+                logger.info(f"💾 Saved {len(valid_products)} products.")
+
+            if journal:
+                if units:
+                    held.append((units, position))
+                commit_ready()
+            
+            queue.task_done()
+        except Exception as e:
+            logger.error(f"Writer task error: {e}")
+
+    sink.close() # Writes a Parquet sink's last row group and fsyncs
+    if db_sink:
+        stats = await db_sink.close()
+        logger.info(f"📤 Streamed {stats['uploaded']}/{stats['rows']} rows to {db_sink.table} ({stats['dead_lettered']} dead-lettered)")
+    if journal:
+        commit_ready()
+        journal.flush()
 
 async def performance_writer_task(queue: asyncio.Queue, filename: str):
     """Listens for performance metrics and appends to CSV."""
-    fields = ['Pincode', 'Status', 'Categories_Scraped', 'Products_Found', 'Start_Time', 'End_Time', 'Duration_Seconds', 'Error_Message']
+    fields = ['Pincode', 'Store_ID', 'Pincodes_Served', 'Status', 'Categories_Scraped', 'Products_Found', 'Category_Success_Rate', 'Categories_Failed', 'Start_Time', 'End_Time', 'Duration_Seconds', 'Error_Message']
     
     with open(filename, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=fields)
@@ -74,53 +122,102 @@ async def performance_writer_task(queue: asyncio.Queue, filename: str):
             except Exception as e:
                 logger.error(f"Performance writer task error: {e}")
 
-async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queue, perf_queue: asyncio.Queue):
+async def push_rows(result_queue: asyncio.Queue, products: list, group, categories: list, failed: list):
+    """
+    Queues one (rows, units) batch per pincode served by the group. Scraped categories
+    (even empty ones) become finished units; failed ones stay open for a resume.
+    """
+    failed = set(failed)
+    finished = [c for c in categories if c not in failed]
+    rows_by_pincode = fan_out(products, group) if products else {p: [] for p in group.pincodes}
+    for served_pincode, rows in rows_by_pincode.items():
+        await result_queue.put((rows, [(served_pincode, c) for c in finished]))
+
+async def worker(name: str, store_queue: asyncio.Queue, result_queue: asyncio.Queue, perf_queue: asyncio.Queue, pool: BrowserPool = None,
+                 journal: RunJournal = None, done: dict = None,
+                 worker_gate: AdaptiveSemaphore = None, wave_controller: AIMDController = None):
     """
     Worker:
-    1. Gets Pincode
-    2. Scrapes *All* Categories for that pincode
-    3. Pushes data to Result Queue
+    1. Gets a StoreGroup (one store + the pincodes it serves)
+    2. Scrapes *All* Categories once, located at the group's first pincode
+    3. Pushes a copy of the data per served pincode to Result Queue
     4. Pushes stats to Performance Queue
+
+    `done` maps pincode -> categories already finished in the run being resumed.
+    `worker_gate` caps how many workers crawl at once; the rest wait (without a browser
+    context) until its controller raises the limit or another worker finishes a store.
     """
     logger.info(f"Worker {name} starting...")
-    scraper = ZeptoScraper(headless=True)
+    done = done or {}
+    scraper = ZeptoScraper(headless=True, pool=pool, wave_controller=wave_controller)
     
     try:
-        await scraper.start()
-        
         while True:
             try:
-                pincode = pin_queue.get_nowait()
+                group = store_queue.get_nowait()
             except asyncio.QueueEmpty:
                 break
-            
-            logger.info(f"[{name}] Starting Pincode: {pincode}")
+
+            if worker_gate:
+                await worker_gate.acquire()
+            outcome = OK
+            pincode = group.pincode
+            logger.info(f"[{name}] Starting Pincode: {pincode} (store {group.store_id}, serves {len(group.pincodes)} pincodes)")
             start_time = datetime.now()
             products_count = 0
             categories_count = 0
             status = "Success"
             error_msg = ""
+            success_rate = ""
+            categories_failed = ""
             
             try:
-                # 1. Set Location
+                if not scraper.browser:
+                    await scraper.start()
+                # 1. Set Location (a recycle that is due happens first; no need to restore the old location)
+                await scraper.maybe_recycle(relocate=False)
                 await scraper.set_location(pincode)
                 
                 # 2. Get Categories
-                await asyncio.sleep(2)
+                if DEFAULT_STOREFRONT.human_delays:
+                    await asyncio.sleep(2)
                 categories = await scraper.get_all_categories()
                 categories_count = len(categories)
                 logger.info(f"[{name}] Found {len(categories)} categories to scrape for {pincode}")
+                if journal:
+                    for served_pincode in group.pincodes:
+                        journal.plan(served_pincode, categories)
+                # Resumed group: all its pincodes share the same finished categories
+                finished = done.get(pincode, set())
+                if finished:
+                    categories = [c for c in categories if c not in finished]
+                    logger.info(f"[{name}] Resuming {pincode}: {len(finished)} categories already done, {len(categories)} left")
                 
+                if USE_TURBO and categories:
+                    # All categories (and their pages) in parallel batches from this one tab
+                    products = await scraper.scrape_assortment_turbo(categories, pincode=pincode, concurrency=TURBO_CONCURRENCY)
+                    products_count += len(products)
+                    await push_rows(result_queue, products, group, categories, scraper.failed_category_urls)
+
+                    stats = scraper.turbo_stats
+                    success_rate = stats.get("success_rate", "")
+                    categories_failed = len(stats.get("failed", []))
+                    if success_rate != "" and success_rate < TURBO_MIN_SUCCESS_RATE:
+                        logger.warning(f"[{name}] ⚠️ Turbo success rate {success_rate:.0%} for {pincode} "
+                                       f"({categories_failed} categories failed)")
+                    categories = [] # Handled
+
                 # Scrape all categories
                 for cat_url in categories:
                     try:
+                        # Fresh context every few hundred pages (location restored) keeps Chromium's memory flat
+                        await scraper.maybe_recycle()
                         logger.info(f"[{name}] Fast Scraping {cat_url}...")
                         products = await scraper.scrape_assortment_fast(cat_url, pincode=pincode)
                         
-                        if products:
-                            products_count += len(products)
-                            # Push to writer
-                            await result_queue.put(products)
+                        products_count += len(products)
+                        # Push to writer (one copy per pincode served by this store)
+                        await push_rows(result_queue, products, group, [cat_url], scraper.failed_category_urls)
                         
                         # Short delay between categories for fast mode
                         await asyncio.sleep(0.1)
@@ -128,10 +225,25 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
                     except Exception as e:
                         logger.error(f"[{name}] Failed category {cat_url}: {e}")
                 
+            except BlockedError as e:
+                # The circuit breaker pauses every worker until a canary gets through; unfinished
+                # categories stay unjournalled for the resume
+                logger.error(f"🛑 [{name}] BLOCKED by WAF on {pincode}: {e.reason}. Moving on once the site reopens.")
+                status = "Blocked"
+                error_msg = str(e)
+                outcome = BLOCKED
             except Exception as e:
                 logger.error(f"[{name}] Failed processing {pincode}: {e}")
                 status = "Failed"
                 error_msg = str(e)
+                outcome = classify(e)
+            finally:
+                # Always hand the slot back (cancellation included), or the gate shrinks for good
+                if worker_gate:
+                    # Latency per category, so large and small stores compare fairly
+                    elapsed = (datetime.now() - start_time).total_seconds()
+                    worker_gate.controller.record(elapsed / max(1, categories_count), outcome)
+                    worker_gate.release()
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -139,9 +251,13 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
             # Send Performance Record
             perf_record = {
                 'Pincode': pincode,
+                'Store_ID': group.store_id or "N/A",
+                'Pincodes_Served': ",".join(group.pincodes),
                 'Status': status,
                 'Categories_Scraped': categories_count,
                 'Products_Found': products_count,
+                'Category_Success_Rate': success_rate,
+                'Categories_Failed': categories_failed,
                 'Start_Time': start_time.isoformat(),
                 'End_Time': end_time.isoformat(),
                 'Duration_Seconds': duration,
@@ -149,12 +265,7 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
             }
             await perf_queue.put(perf_record)
                 
-            pin_queue.task_done()
-            
-            # Anti-ban break
-            delay = random.uniform(5, 10)
-            logger.info(f"[{name}] Finished {pincode}. Cooling down for {delay:.0f}s...")
-            await asyncio.sleep(delay)
+            store_queue.task_done()
                 
     except Exception as e:
         logger.error(f"[{name}] Crashed: {e}")
@@ -162,11 +273,26 @@ async def worker(name: str, pin_queue: asyncio.Queue, result_queue: asyncio.Queu
         await scraper.stop()
         logger.info(f"Worker {name} retired.")
 
-async def main():
+async def main(resume_run_id=None, output_format=OUTPUT_FORMAT, stream_to_db=STREAM_TO_DB, max_workers=MAX_WORKERS):
+    """
+    `resume_run_id` (the timestamp in a previous output file name) continues a crashed run
+    (with the same output_format). Parquet output is a dataset directory.
+    `stream_to_db` uploads rows as they are written instead of after the run.
+    """
     if not os.path.exists(INPUT_FILE):
         logger.error(f"Input file {INPUT_FILE} not found.")
         return
 
+    sink_cls = SINKS[output_format]
+    if resume_run_id:
+        output_file = f"zepto_assortment_parallel_{resume_run_id}{sink_cls.extension}"
+    else:
+        output_file = os.path.splitext(OUTPUT_FILE)[0] + sink_cls.extension
+    journal_file = RunJournal.path_for(output_file)
+    if resume_run_id and not os.path.exists(journal_file):
+        logger.error(f"No journal found for run {resume_run_id} ({journal_file})")
+        return
+
     # 1. Read Inputs
     try:
         df = pd.read_excel(INPUT_FILE)
@@ -192,29 +318,83 @@ async def main():
         logger.error(f"Failed to read input: {e}")
         return
 
+    # Resume: drop rows after the last committed offset, skip finished pincodes
+    journal = RunJournal(journal_file)
+    done = {}
+    if resume_run_id:
+        sink_cls.truncate(output_file, journal.committed_offset())
+        completed = journal.completed_pincodes()
+        done = journal.done_categories()
+        pincodes = [p for p in pincodes if p not in completed]
+        logger.info(f"♻️ Resuming run {resume_run_id}: {len(completed)} pincodes complete, {len(pincodes)} to go")
+    if not pincodes:
+        journal.close()
+        logger.info(f"Nothing left to scrape. Output: {output_file}")
+        return
+
     # 2. Setup Queues
-    pin_queue = asyncio.Queue()
+    store_queue = asyncio.Queue()
     result_queue = asyncio.Queue()
     perf_queue = asyncio.Queue()
-    
-    for p in pincodes:
-        pin_queue.put_nowait(p)
+
+    db_sink = None
+    if stream_to_db:
+        client = PostgrestClient.from_env()
+        if client:
+            db_sink = DatabaseSink(BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE), DB_TABLE, transform=clean_csv_keys)
+        else:
+            logger.warning("Streaming needs SUPABASE_URL/SUPABASE_KEY or POSTGREST_URL; uploading after the run instead.")
 
     # 3. Launch Writers
-    writer = asyncio.create_task(writer_task(result_queue, OUTPUT_FILE))
+    writer = asyncio.create_task(writer_task(result_queue, open_sink(output_format, output_file, ROW_GROUP_SIZE),
+                                             journal, db_sink))
     perf_writer = asyncio.create_task(performance_writer_task(perf_queue, PERF_FILE))
 
     # 4. Launch Workers
     workers = []
-    actual_workers = min(MAX_WORKERS, len(pincodes))
+    actual_workers = min(max_workers, len(pincodes))
+
+    # Shared browsers: each worker leases an isolated context instead of launching Chromium
+    pool = BrowserPool(headless=True, size=min(POOL_BROWSERS, actual_workers),
+                       max_contexts_per_browser=math.ceil(actual_workers / POOL_BROWSERS))
+    await pool.start()
     
-    for i in range(actual_workers):
-        w = asyncio.create_task(worker(f"W-{i+1}", pin_queue, result_queue, perf_queue))
-        workers.append(w)
-        await asyncio.sleep(random.uniform(2, 5))
+    try:
+        # Resolve pincode -> store first so every store is crawled only once
+        if DEDUP_BY_STORE:
+            stores = await resolve_stores(pincodes, lambda: ZeptoScraper(headless=True, pool=pool),
+                                          StoreMap(DEFAULT_STOREFRONT.namespace("zepto")), concurrency=actual_workers)
+        else:
+            stores = {p: None for p in pincodes}
+        groups = group_by_store(stores)
+        if done:
+            groups = split_by_progress(groups, done)
+        for g in groups:
+            store_queue.put_nowait(g)
+
+        actual_workers = min(actual_workers, len(groups))
+        # max_workers is the ceiling; the controllers decide how much of it is used
+        if ADAPTIVE_CONCURRENCY:
+            worker_controller = AIMDController("workers", INITIAL_WORKERS, maximum=actual_workers, window=max(2, actual_workers))
+            wave_controller = AIMDController("turbo_wave", TURBO_CONCURRENCY, maximum=MAX_TURBO_CONCURRENCY)
+        else:
+            worker_controller = AIMDController("workers", actual_workers, minimum=actual_workers, maximum=actual_workers)
+            wave_controller = AIMDController("turbo_wave", TURBO_CONCURRENCY, minimum=TURBO_CONCURRENCY, maximum=TURBO_CONCURRENCY)
+        worker_gate = worker_controller.semaphore()
+        logger.info(f"Starting scraping with up to {actual_workers} workers ({worker_controller.limit} active) on {pool.size} browsers...")
 
-    # Wait for workers
-    await asyncio.gather(*workers)
+        for i in range(actual_workers):
+            w = asyncio.create_task(worker(f"W-{i+1}", store_queue, result_queue, perf_queue, pool=pool,
+                                           journal=journal, done=done,
+                                           worker_gate=worker_gate, wave_controller=wave_controller))
+            workers.append(w)
+            if DEFAULT_STOREFRONT.human_delays:
+                await asyncio.sleep(random.uniform(2, 5))
+
+        # Wait for workers
+        await asyncio.gather(*workers)
+    finally:
+        await pool.stop()
     
     # Signal writers to stop
     await result_queue.put(None)
@@ -222,18 +402,44 @@ async def main():
     
     await writer
     await perf_writer
+    journal.close()
     
-    logger.info(f"All done! \nData: {OUTPUT_FILE}\nPerformance: {PERF_FILE}")
+    readiness = READINESS_STATS.summary()
+    logger.info(f"⏩ {readiness['ready_early']}/{readiness['waits']} readiness waits resolved early, {readiness['saved_s']}s of fixed waits saved")
+    for domain, s in DEFAULT_LIMITER.summary().items():
+        logger.info(f"⏱️ {domain}: {s['requests']} requests, waited {s['wait_seconds']}s in the rate limiter ({s['waits']} waits)")
+    for domain, c in DEFAULT_BREAKER.summary().items():
+        if c["trips"]:
+            logger.info(f"🛑 {domain}: circuit tripped {c['trips']} times, {c['canaries']} canaries, paused {c['paused_s']}s (now {c['state']})")
+    recycling = DEFAULT_RECYCLE_POLICY.summary()
+    logger.info(f"♻️ Recycled {recycling['context_recycles']} contexts and {recycling['browser_restarts']} browsers "
+                f"(browser tree RSS peak {recycling['peak_rss_mb']} MB)")
+    workers_aimd = worker_controller.summary()
+    waves_aimd = wave_controller.summary()
+    logger.info(f"🎚️ Concurrency: workers {workers_aimd['limit']} (peak {workers_aimd['peak']}), "
+                f"turbo wave {waves_aimd['limit']} (peak {waves_aimd['peak']}), "
+                f"{workers_aimd['changes'] + waves_aimd['changes']} adjustments")
+    decisions = worker_controller.decisions + wave_controller.decisions
+    if decisions:
+        # Every AIMD step with its reason, in the order they happened
+        pd.DataFrame(decisions).sort_values("time", kind="stable").to_csv(DECISIONS_FILE, index=False)
+        logger.info(f"🎚️ Concurrency decisions saved to: {DECISIONS_FILE}")
+    logger.info(f"All done! \nData: {output_file}\nPerformance: {PERF_FILE}")
 
-    # Trigger Upload
-    logger.info("🚀 Starting automatic upload to Supabase...")
+    # Trigger Upload (already done batch by batch when streaming)
     try:
-        subprocess.run(["python", "upload_zepto_data.py", OUTPUT_FILE], check=True)
-        logger.info("✅ Upload complete. Dashboard is updated!")
+        if db_sink:
+            logger.info("✅ Rows were streamed to Supabase during the run. Dashboard is updated!")
+        elif DEFAULT_STOREFRONT.is_mock:
+            logger.info("🧪 Mock storefront run: skipping the automatic upload")
+        else:
+            logger.info("🚀 Starting automatic upload to Supabase...")
+            subprocess.run(["python", "upload_zepto_data.py", output_file], check=True)
+            logger.info("✅ Upload complete. Dashboard is updated!")
         print("\n\n" + "="*50)
         print(" EXECUTION COMPLETE ")
         print("="*50)
-        print(f"1. Scraped Data:   {OUTPUT_FILE}")
+        print(f"1. Scraped Data:   {output_file}")
         print(f"2. Performance:    {PERF_FILE}")
         print("3. Dashboard:      Visit http://localhost:8501 and click 'Refresh Data'")
         print("="*50 + "\n")
@@ -241,4 +447,18 @@ async def main():
          logger.error(f"Failed to auto-upload: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Zepto parallel assortment scraper")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a crashed run, e.g. 20250101_120000 from zepto_assortment_parallel_20250101_120000.csv")
+    parser.add_argument("--format", choices=sorted(SINKS), default=OUTPUT_FORMAT,
+                        help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--stream-db", action="store_true", default=STREAM_TO_DB,
+                        help="Upload rows to the database while scraping")
+    parser.add_argument("--base-url", help="Scrape this origin instead of zepto.com, e.g. benchmarks/mock_storefront.py")
+    parser.add_argument("--no-human-delay", action="store_true",
+                        help="Benchmark mode: skip human-like pauses and start-up staggers")
+    args = parser.parse_args()
+    DEFAULT_STOREFRONT.configure(args.base_url, human_delays=not args.no_human_delay)
+    asyncio.run(main(resume_run_id=args.resume, output_format=args.format, stream_to_db=args.stream_db,
+                     max_workers=args.workers))
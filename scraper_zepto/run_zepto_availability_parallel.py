@@ -3,24 +3,26 @@ import asyncio
 import logging
 import random
 import os
-import csv
 from datetime import datetime
 import pandas as pd
 from scrapers.zepto import ZeptoScraper
+from scrapers.extractors import EXTRACTION_STATS
+from utils.sinks import DEFAULT_ROW_GROUP_SIZE, open_sink
 
 # Configuration
 INPUT_FILE = "pin_codes_100.xlsx"
 OUTPUT_FILE = f"zepto_availability_parallel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 MAX_WORKERS = 4
+MAX_URLS_PER_GROUP = 100  # Larger pincode groups are split so several workers can share one pincode
+OUTPUT_FORMAT = "csv"  # "parquet" writes a dictionary-encoded Parquet dataset (needs pyarrow)
+ROW_GROUP_SIZE = DEFAULT_ROW_GROUP_SIZE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Zepto_Availability_Runner")
 
-async def writer_task(queue: asyncio.Queue, filename: str):
-    """Listens for data batches and appends to CSV."""
-    file_initialized = False
-    
+async def writer_task(queue: asyncio.Queue, sink):
+    """Listens for data batches and writes them to the output sink."""
     while True:
         try:
             batch = await queue.get()
@@ -29,24 +31,31 @@ async def writer_task(queue: asyncio.Queue, filename: str):
                 break
                 
             if batch:
-                mode = 'a' if file_initialized else 'w'
-                with open(filename, mode, newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=batch[0].keys())
-                    if not file_initialized:
-                        writer.writeheader()
-                        file_initialized = True
-                    writer.writerows(batch)
+                sink.write(batch)
                 logger.info(f"💾 Saved {len(batch)} availability records.")
             
             queue.task_done()
         except Exception as e:
             logger.error(f"Writer task error: {e}")
+    sink.close()
+
+def group_by_pincode(items: list, max_group: int = MAX_URLS_PER_GROUP) -> list:
+    """(url, pincode) pairs -> [(pincode, [urls])], in first-seen order, at most max_group URLs each."""
+    by_pincode = {}
+    for url, pincode in items:
+        by_pincode.setdefault(pincode, []).append(url)
+    groups = []
+    for pincode, urls in by_pincode.items():
+        for start in range(0, len(urls), max_group):
+            groups.append((pincode, urls[start:start + max_group]))
+    return groups
 
-async def worker(name: str, item_queue: asyncio.Queue, result_queue: asyncio.Queue):
+async def worker(name: str, group_queue: asyncio.Queue, result_queue: asyncio.Queue):
     """
     Worker:
-    1. Gets (URL, Pincode)
-    2. Scrapes Availability
+    1. Gets a (Pincode, [URLs]) group
+    2. Locates once (re-checking a session it already located there), then
+       scrapes every URL of the group in that context
     3. Pushes to Result Queue
     """
     logger.info(f"Worker {name} starting...")
@@ -57,29 +66,35 @@ async def worker(name: str, item_queue: asyncio.Queue, result_queue: asyncio.Que
         
         while True:
             try:
-                item = item_queue.get_nowait()
+                pincode, urls = group_queue.get_nowait()
             except asyncio.QueueEmpty:
                 break
             
-            url, pincode = item
-            logger.info(f"[{name}] Checking {url} at {pincode}")
-            
+            logger.info(f"[{name}] Pincode {pincode}: {len(urls)} URLs")
             try:
-                # Scrape Availability
-                products = await scraper.scrape_availability(url, pincode)
-                
-                if products:
-                    await result_queue.put(products)
-                else:
-                    logger.warning(f"[{name}] No data for {url}")
-                
+                await scraper.ensure_location(pincode)
             except Exception as e:
-                logger.error(f"[{name}] Failed {url}: {e}")
-                
-            item_queue.task_done()
+                logger.error(f"[{name}] Could not locate {pincode}: {e}")
+                group_queue.task_done()
+                continue
             
-            # Delay
-            await scraper.human_delay(1, 3)
+            for url in urls:
+                logger.info(f"[{name}] Checking {url} at {pincode}")
+                try:
+                    # Fresh context every few hundred pages (location restored) keeps Chromium's memory flat
+                    await scraper.maybe_recycle()
+                    # Scrape Availability
+                    products = await scraper.scrape_availability(url, pincode)
+                    
+                    if products:
+                        await result_queue.put(products)
+                    else:
+                        logger.warning(f"[{name}] No data for {url}")
+                    
+                except Exception as e:
+                    logger.error(f"[{name}] Failed {url}: {e}")
+                
+            group_queue.task_done()
                 
     except Exception as e:
         logger.error(f"[{name}] Crashed: {e}")
@@ -124,22 +139,25 @@ async def main():
         logger.error(f"Failed to read input: {e}")
         return
 
-    # 2. Setup Queues
-    item_queue = asyncio.Queue()
+    # 2. Setup Queues (one entry per pincode group, so each group is located once)
+    group_queue = asyncio.Queue()
     result_queue = asyncio.Queue()
     
-    for i in items:
-        item_queue.put_nowait(i)
+    groups = group_by_pincode(items)
+    for g in groups:
+        group_queue.put_nowait(g)
+    logger.info(f"{len(items)} URL checks grouped into {len(groups)} pincode batches.")
 
     # 3. Launch Writer
-    writer = asyncio.create_task(writer_task(result_queue, OUTPUT_FILE))
+    output_file = OUTPUT_FILE if OUTPUT_FORMAT == "csv" else os.path.splitext(OUTPUT_FILE)[0] + ".parquet"
+    writer = asyncio.create_task(writer_task(result_queue, open_sink(OUTPUT_FORMAT, output_file, ROW_GROUP_SIZE)))
 
     # 4. Launch Workers
     workers = []
-    actual_workers = min(MAX_WORKERS, len(items))
+    actual_workers = min(MAX_WORKERS, len(groups))
     
     for i in range(actual_workers):
-        w = asyncio.create_task(worker(f"W-{i+1}", item_queue, result_queue))
+        w = asyncio.create_task(worker(f"W-{i+1}", group_queue, result_queue))
         workers.append(w)
         await asyncio.sleep(random.uniform(1, 2))
 
@@ -150,7 +168,9 @@ async def main():
     await result_queue.put(None)
     await writer
     
-    logger.info(f"All done! Output saved to: {OUTPUT_FILE}")
+    extraction = EXTRACTION_STATS.summary()
+    logger.info(f"📦 {extraction['evaluate_calls']} extraction evaluates, {extraction['payload_mb']} MB over IPC, {extraction['parse_ms']} ms parsing")
+    logger.info(f"All done! Output saved to: {output_file}")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,21 +2,81 @@ import asyncio
 from playwright.async_api import async_playwright
 from abc import ABC, abstractmethod
 import logging
+import time
 import random
+from typing import Optional
+from .rate_limit import RateLimiter, DEFAULT_LIMITER
+from .readiness import READINESS_STATS
+from .recycling import RecyclePolicy, DEFAULT_RECYCLE_POLICY
+from .circuit_breaker import CircuitBreaker, BlockedError, DEFAULT_BREAKER, response_block_reason
+from .storefront import Storefront, DEFAULT_STOREFRONT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Anti-detection arguments
+STEALTH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-infobars',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-remote-fonts',
+    '--disable-gpu' # Often helpful in headless
+]
+
+async def launch_browser(playwright, headless: bool):
+    """Launches system Edge, then Chrome, then the bundled Chromium as a fallback."""
+    browsers_to_try = [
+        {'channel': 'msedge'},
+        {'channel': 'chrome'},
+        {}, # Default bundled as fallback
+    ]
+
+    for browser_kwargs in browsers_to_try:
+        # Merge stealth args
+        browser_kwargs['args'] = browser_kwargs.get('args', []) + STEALTH_ARGS
+
+        try:
+            browser = await playwright.chromium.launch(headless=headless, **browser_kwargs)
+            logger.info(f"Launched browser with kwargs: {browser_kwargs}")
+            return browser
+        except Exception as e:
+            logger.warning(f"Failed to launch browser with {browser_kwargs}: {e}")
+
+    raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+
+# Each context picks its own UA so sessions sharing a pooled browser don't look identical
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+]
+
 class BaseScraper(ABC):
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, pool=None, rate_limiter: RateLimiter = None,
+                 circuit_breaker: CircuitBreaker = None, recycle_policy: RecyclePolicy = None,
+                 storefront: Storefront = None):
         self.headless = headless
+        self.pool = pool # Optional BrowserPool; when set, the browser process is shared
+        self.rate_limiter = rate_limiter or DEFAULT_LIMITER # Paces navigations/fetches per site instead of fixed sleeps
+        self.recycle_policy = recycle_policy or DEFAULT_RECYCLE_POLICY # When to swap a context/browser for a fresh one
+        self.navigations = 0 # goto()s on the current context
+        self.circuit_breaker = circuit_breaker or DEFAULT_BREAKER # Pauses every worker on a site once it starts blocking
+        self.storefront = storefront or DEFAULT_STOREFRONT # Live site or a local mock; human delays on/off
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self.session_cache = None # Subclasses set a SessionCache to persist located sessions
+        self.category_cache = None # Subclasses set a CategoryCache to reuse discovered category trees
+        self.current_pincode = None
+        self.located_pincode = None # Pincode this session was last located at by ensure_location
 
     async def human_delay(self, min_seconds=1.0, max_seconds=3.0):
-        """Random delay to simulate human reaction time."""
+        """Random delay to simulate human reaction time (none in benchmark mode)."""
+        if not self.storefront.human_delays:
+            return
         delay = random.uniform(min_seconds, max_seconds)
         # logger.debug(f"Sleeping for {delay:.2f}s")
         await asyncio.sleep(delay)
@@ -38,6 +98,9 @@ class BaseScraper(ABC):
     async def human_type(self, selector: str, text: str):
         """Types text with random delays between keystrokes."""
         await self.page.focus(selector)
+        if not self.storefront.human_delays:
+            await self.page.keyboard.type(text)
+            return
         for char in text:
             await self.page.keyboard.type(char)
             # Random typing speed: 50ms to 200ms usually
@@ -45,44 +108,26 @@ class BaseScraper(ABC):
         await self.human_delay(0.5, 1.0)
 
     async def start(self):
-        self.playwright = await async_playwright().start()
-        
-        # Try to launch system edge, then chrome, then bundled chromium
-        browsers_to_try = [
-            {'channel': 'msedge'},
-            {'channel': 'chrome'},
-            {}, # Default bundled as fallback
-        ]
-        
-        # Anti-detection arguments
-        stealth_args = [
-            '--disable-blink-features=AutomationControlled',
-            '--disable-infobars',
-            '--no-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-extensions',
-            '--disable-remote-fonts',
-            '--disable-gpu' # Often helpful in headless
-        ]
-
-        for browser_kwargs in browsers_to_try:
-            # Merge stealth args
-            browser_kwargs['args'] = browser_kwargs.get('args', []) + stealth_args
-            
-            try:
-                self.browser = await self.playwright.chromium.launch(headless=self.headless, **browser_kwargs)
-                logger.info(f"Launched browser with kwargs: {browser_kwargs}")
-                break
-            except Exception as e:
-                logger.warning(f"Failed to launch browser with {browser_kwargs}: {e}")
-        
-        if not self.browser:
-            raise Exception("Could not launch any browser (Chromium, Chrome, or Edge)")
+        if self.pool:
+            # Shared mode: borrow a slot on one of the pool's browsers instead of launching our own
+            self.browser = await self.pool.acquire()
+        else:
+            self.playwright = await async_playwright().start()
+            self.browser = await launch_browser(self.playwright, self.headless)
+
+        await self._create_context()
+
+    async def _create_context(self, storage_state: dict = None):
+        """Creates a fresh stealth context. `storage_state` restores a cached, located session."""
+        if self.context:
+            await self.context.close()
 
         self.context = await self.browser.new_context(
              viewport={'width': 1920, 'height': 1080},
-             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+             user_agent=random.choice(USER_AGENTS),
+             storage_state=storage_state
         )
+        self.navigations = 0
         
         # KEY STEALTH SCRIPT: Remove navigator.webdriver property
         await self.context.add_init_script("""
@@ -93,9 +138,220 @@ class BaseScraper(ABC):
         
         self.page = await self.context.new_page()
 
+    async def throttle(self, url: str, cost: int = 1):
+        """Waits on the shared per-domain rate limiter before `cost` requests to `url`'s site."""
+        await self.rate_limiter.acquire(url, cost)
+
+    async def goto(self, url: str, page=None, **kwargs):
+        """page.goto (main page by default) paced by the per-domain rate limiter.
+
+        Waits while the site's circuit breaker is open, and raises BlockedError when the
+        navigation response (status, headers, final URL) is a block.
+        """
+        canary = await self.circuit_breaker.before(url)
+        try:
+            await self.throttle(url)
+            self.navigations += 1
+            response = await (page or self.page).goto(url, **kwargs)
+        except BaseException:
+            # Cancellation too (a tab timeout): a canary that never reports would pause the site for good
+            self.circuit_breaker.abandon(url, canary)
+            raise
+        reason = response_block_reason(response)
+        self.circuit_breaker.record(url, canary, reason)
+        if reason:
+            raise BlockedError(url, reason)
+        return response
+
+    async def wait_until_ready(self, condition, ceiling_ms: int, label: str, page=None) -> bool:
+        """
+        Waits until `condition` holds, but never longer than `ceiling_ms` (the old fixed stall).
+
+        `condition` is a JS predicate polled in the page (see readiness.py), or an awaitable
+        such as `event.wait()` on an asyncio.Event a response listener sets. Time saved
+        against the ceiling is recorded per `label` in READINESS_STATS.
+        """
+        started = time.perf_counter()
+        try:
+            if isinstance(condition, str):
+                await (page or self.page).wait_for_function(condition, timeout=ceiling_ms, polling=100)
+            else:
+                await asyncio.wait_for(condition, ceiling_ms / 1000)
+            ready = True
+        except Exception:
+            # Timed out (or the page navigated away): same outcome as the old fixed wait
+            ready = False
+        READINESS_STATS.record(label, time.perf_counter() - started, ceiling_ms / 1000, ready)
+        return ready
+
+    async def ensure_location(self, pincode: str, verify: bool = True):
+        """
+        Locates the session at `pincode` unless it already is.
+
+        A session this scraper already located there is re-checked with _is_location_valid
+        (skipped with verify=False, for per-URL calls inside an already checked batch) and
+        only re-located if the check fails. A locate that did not resolve a store is not
+        remembered, so the next call tries again instead of scraping an unlocated session.
+        """
+        if self.located_pincode == pincode:
+            if not verify:
+                return
+            try:
+                if await self._is_location_valid(pincode):
+                    return
+            except BlockedError:
+                raise
+            except Exception as e:
+                logger.warning(f"Location check failed for {pincode}: {e}")
+            logger.info(f"Session lost its location ({pincode}). Re-locating.")
+        self.located_pincode = None
+        await self.set_location(pincode)
+        # set_location logs and swallows its own failures; only a resolved store counts
+        if self._has_store():
+            self.located_pincode = pincode
+        else:
+            logger.warning(f"Could not locate the session at {pincode}; will retry on the next call.")
+
+    async def restore_session(self, pincode: str) -> bool:
+        """
+        Restores a cached session for this pincode into a fresh context.
+        Returns True only if the restored location still checks out.
+        """
+        if not self.session_cache:
+            return False
+        entry = self.session_cache.load(pincode)
+        if not entry:
+            return False
+
+        logger.info(f"♻️ Restoring cached session for {pincode}")
+        await self._create_context(storage_state=entry["storage_state"])
+        self._apply_session_meta(entry.get("meta") or {})
+
+        try:
+            if await self._is_location_valid(pincode):
+                return True
+        except BlockedError:
+            # The site blocked the check, not the session: keep the cache and let the caller back off
+            raise
+        except Exception as e:
+            logger.warning(f"Cached session check failed for {pincode}: {e}")
+
+        logger.info(f"Cached session for {pincode} is stale. Falling back to full location flow.")
+        self.session_cache.invalidate(pincode)
+        return False
+
+    async def save_session(self, pincode: str):
+        """Saves the current (verified) location session for later runs."""
+        if not self.session_cache or not self.context:
+            return
+        try:
+            storage_state = await self.context.storage_state()
+            self.session_cache.save(pincode, storage_state, self._session_meta())
+        except Exception as e:
+            logger.warning(f"Could not capture storage state for {pincode}: {e}")
+
+    def _session_meta(self) -> dict:
+        """Scraper fields saved alongside the storage state (ETA, store id...)."""
+        return {}
+
+    def _apply_session_meta(self, meta: dict):
+        pass
+
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """Cheap platform check that a restored session is still located. Override per platform."""
+        return False
+
+    def _has_store(self) -> bool:
+        """Whether the session resolved a store (the last set_location took)."""
+        store_id = getattr(self, "store_id", None)
+        return bool(store_id) and store_id not in ("N/A", "Unknown")
+
+    def _category_cache_key(self) -> Optional[str]:
+        """Category trees are per store; fall back to the pincode when the store is unknown."""
+        if self._has_store():
+            return f"store_{self.store_id}"
+        if self.current_pincode:
+            return f"pin_{self.current_pincode}"
+        return None
+
+    async def maybe_recycle(self, relocate: bool = True) -> bool:
+        """
+        Checkpoint between units of work: recycles the context (or the browser) when the
+        recycle policy says it has done too many navigations or the browser tree uses
+        too much memory. Returns True if it recycled.
+
+        `relocate=False` skips restoring the location, for callers about to set a new one.
+        """
+        reason, restart_browser = self.recycle_policy.check(self.navigations)
+        if not reason:
+            return False
+        await self.recycle(reason, restart_browser, relocate)
+        return True
+
+    async def recycle(self, reason: str, restart_browser: bool = False, relocate: bool = True):
+        """
+        Replaces the context (and with `restart_browser` the browser) with a fresh one that
+        carries the same cookies/localStorage and session meta, so the location survives.
+        """
+        logger.info(f"♻️ Recycling {'browser' if restart_browser else 'context'} after {reason}")
+        pincode = self.current_pincode if relocate else None
+        storage_state = None
+        if pincode and self.context:
+            try:
+                storage_state = await self.context.storage_state()
+            except Exception as e:
+                logger.warning(f"Could not capture storage state before recycling: {e}")
+        meta = self._session_meta()
+
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.warning(f"Error closing context: {e}")
+            self.context = None
+
+        if self.pool:
+            # A bloated pool browser is relaunched once its other contexts drain; move off it now
+            if restart_browser:
+                self.pool.retire(self.browser)
+            if self.pool.is_retiring(self.browser):
+                self.pool.release(self.browser)
+                self.browser = await self.pool.acquire()
+        elif restart_browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+            self.browser = await launch_browser(self.playwright, self.headless)
+
+        await self._create_context(storage_state=storage_state)
+        self._apply_session_meta(meta)
+        self.recycle_policy.record(restart_browser)
+
+        if pincode:
+            try:
+                if await self._is_location_valid(pincode):
+                    return
+            except BlockedError:
+                raise
+            except Exception as e:
+                logger.warning(f"Location check after recycling failed for {pincode}: {e}")
+            logger.info(f"Recycled session lost its location ({pincode}). Re-locating.")
+            await self.set_location(pincode)
+
     async def stop(self):
         if self.context:
-            await self.context.close()
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.warning(f"Error closing context: {e}")
+            self.context = None
+        if self.pool:
+            # The browser belongs to the pool; just give the slot back
+            if self.browser:
+                self.pool.release(self.browser)
+            self.browser = None
+            return
         if self.browser:
             await self.browser.close()
         if self.playwright:
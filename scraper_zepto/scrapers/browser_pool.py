@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import List
+from playwright.async_api import async_playwright, Browser
+from .base import launch_browser
+
+logger = logging.getLogger(__name__)
+
+class BrowserPool:
+    """
+    Shares a small, fixed number of Chromium processes between many scraper sessions.
+
+    Each scraper still gets its own BrowserContext (own proxy, cookies, user agent),
+    but contexts are cheap compared to a full browser process, so 10-20 pincode
+    sessions fit in the RAM that two standalone browsers used to take.
+
+    Usage:
+        pool = BrowserPool(headless=True, size=2)
+        await pool.start()
+        scraper = ZeptoScraper(headless=True, pool=pool)
+        await scraper.start()   # leases a slot on the least-loaded browser
+        ...
+        await scraper.stop()    # closes the context and returns the slot
+        await pool.stop()
+    """
+
+    def __init__(self, headless=True, size=2, max_contexts_per_browser=8):
+        self.headless = headless
+        self.size = size
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.playwright = None
+        self.browsers: List[Browser] = []
+        self.leases: List[int] = []
+        self._owner = {} # id(browser) -> pool index (kept for relaunched browsers too)
+        self.retiring = set() # Pool indexes to relaunch once their contexts have drained (memory guard)
+        self._slots = asyncio.Semaphore(size * max_contexts_per_browser)
+        self._lock = asyncio.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.max_contexts_per_browser
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        for i in range(self.size):
+            browser = await launch_browser(self.playwright, self.headless)
+            self._owner[id(browser)] = i
+            self.browsers.append(browser)
+            self.leases.append(0)
+        logger.info(f"🧩 Browser pool ready: {self.size} browsers x {self.max_contexts_per_browser} contexts")
+
+    async def acquire(self) -> Browser:
+        """Waits for a free slot and returns the least-loaded healthy browser."""
+        await self._slots.acquire()
+        async with self._lock:
+            # A retiring browser takes no new contexts while it still has some
+            idx = min(range(len(self.browsers)), key=lambda i: (i in self.retiring and self.leases[i] > 0, self.leases[i]))
+
+            # Relaunch a browser that crashed (e.g. killed by the OOM killer) or was retired and has drained
+            retired = idx in self.retiring and self.leases[idx] == 0
+            if retired or not self.browsers[idx].is_connected():
+                if retired:
+                    logger.info(f"♻️ Relaunching retired pool browser #{idx}")
+                    self.retiring.discard(idx)
+                    try:
+                        await self.browsers[idx].close()
+                    except Exception as e:
+                        logger.warning(f"Error closing retired pool browser: {e}")
+                else:
+                    logger.warning(f"Pool browser #{idx} disconnected. Relaunching...")
+                try:
+                    browser = await launch_browser(self.playwright, self.headless)
+                    self._owner[id(browser)] = idx
+                    self.browsers[idx] = browser
+                except Exception:
+                    self._slots.release()
+                    raise
+
+            self.leases[idx] += 1
+            logger.info(f"Leased browser #{idx} (active contexts: {self.leases})")
+            return self.browsers[idx]
+
+    def retire(self, browser: Browser):
+        """Marks a (leaked, bloated) browser for relaunch once every context on it is released."""
+        idx = self._owner.get(id(browser))
+        if idx is not None:
+            self.retiring.add(idx)
+
+    def is_retiring(self, browser: Browser) -> bool:
+        return self._owner.get(id(browser)) in self.retiring
+
+    def release(self, browser: Browser):
+        """Returns a slot previously obtained from acquire()."""
+        idx = self._owner.get(id(browser))
+        if idx is None:
+            logger.warning("Released a browser that does not belong to this pool.")
+            return
+        self.leases[idx] = max(0, self.leases[idx] - 1)
+        self._slots.release()
+
+    async def stop(self):
+        for browser in self.browsers:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing pool browser: {e}")
+        self.browsers = []
+        self.leases = []
+        self._owner = {}
+        self.retiring = set()
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
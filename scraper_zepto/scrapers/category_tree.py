@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# (category id, sub-category id or None) for a listing URL, per platform
+def _blinkit_key(url: str) -> Optional[Tuple[str, Optional[str]]]:
+    # /cn/<slug>/cid/<cid>        (parent listing)
+    # /cn/<slug>/cid/<cid>/<scid> (sub-category listing)
+    m = re.search(r'/cid/(\d+)(?:/(\d+))?', url)
+    return (m.group(1), m.group(2)) if m else None
+
+def _zepto_key(url: str) -> Optional[Tuple[str, Optional[str]]]:
+    # /cn/<cat>/<sub>/cid/<uuid>/scid/<uuid>
+    m = re.search(r'/cid/([^/?#]+)(?:/scid/([^/?#]+))?', url)
+    return (m.group(1), m.group(2)) if m else None
+
+def _instamart_key(url: str) -> Optional[Tuple[str, Optional[str]]]:
+    # category-listing?categoryName=...&taxonomyId=...[&filterId=...|&filterName=...]
+    # collection-listing?collectionId=...
+    query = {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+    if "collectionId" in query:
+        return (f"collection:{query['collectionId']}", None)
+    parent = query.get("taxonomyId") or query.get("categoryName")
+    if not parent:
+        return None
+    return (parent, query.get("filterId") or query.get("filterName"))
+
+KEY_FUNCS = {
+    "blinkit": _blinkit_key,
+    "zepto": _zepto_key,
+    "instamart": _instamart_key,
+}
+
+
+class CategoryTree:
+    """
+    Canonical category tree for one platform, keyed by category id (cid / taxonomyId).
+
+    Homepages link the same listing under several slugs, and link both a parent
+    listing and its sub-categories, which hold the same products. The tree keeps
+    one URL per (cid, scid) and drops a parent listing once any of its children
+    are known, so every product is fetched from exactly one listing.
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self.nodes: Dict[str, Dict[str, str]] = {} # cid -> {scid ("" for the parent listing): url}
+        self.stats = {"links": 0, "duplicates": 0, "parents_dropped": 0, "unkeyed": 0}
+
+    @classmethod
+    def from_urls(cls, platform: str, urls: List[str]) -> "CategoryTree":
+        tree = cls(platform)
+        for url in urls:
+            tree.add(url)
+        return tree
+
+    def _canonical_url(self, url: str) -> str:
+        parsed = urlparse(url)
+        # Instamart listings are addressed by their query string; the others by path only
+        query = f"?{parsed.query}" if self.platform == "instamart" and parsed.query else ""
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}{query}"
+
+    def add(self, url: str):
+        self.stats["links"] += 1
+        key = KEY_FUNCS[self.platform](url)
+        if not key:
+            # Unrecognised shape: keep it, deduplicated on the URL itself
+            self.stats["unkeyed"] += 1
+            key = (self._canonical_url(url), None)
+        cid, scid = key
+        children = self.nodes.setdefault(cid, {})
+        if (scid or "") in children:
+            self.stats["duplicates"] += 1
+            return
+        children[scid or ""] = self._canonical_url(url)
+
+    def listings(self) -> List[str]:
+        """Non-overlapping listing URLs: every sub-category, plus parents that have none."""
+        urls = []
+        dropped = 0
+        for cid in sorted(self.nodes):
+            children = self.nodes[cid]
+            subs = [url for scid, url in sorted(children.items()) if scid]
+            if subs:
+                urls.extend(subs)
+                dropped += 1 if "" in children else 0
+            elif "" in children:
+                urls.append(children[""])
+        self.stats["parents_dropped"] = dropped
+        return urls
+
+    def to_dict(self) -> dict:
+        return {"platform": self.platform, "nodes": self.nodes}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CategoryTree":
+        tree = cls(data["platform"])
+        tree.nodes = data.get("nodes", {})
+        return tree
+
+
+class CategoryCache:
+    """Keeps discovered category trees on disk per (platform, store) with a TTL."""
+
+    def __init__(self, platform: str, cache_dir: str = ".session_cache", ttl_hours: float = 24):
+        self.platform = platform
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_hours * 3600
+
+    def _path(self, key: str) -> str:
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+        return os.path.join(self.cache_dir, f"categories_{self.platform}_{safe_key}.json")
+
+    def load(self, key: str) -> Optional[CategoryTree]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Corrupt category cache {path}: {e}")
+            return None
+        if time.time() - entry.get("saved_at", 0) > self.ttl_seconds:
+            return None
+        return CategoryTree.from_dict(entry["tree"])
+
+    def save(self, key: str, tree: CategoryTree):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"saved_at": time.time(), "tree": tree.to_dict()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not save category cache {path}: {e}")
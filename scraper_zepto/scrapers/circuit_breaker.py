@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from .rate_limit import domain_of
+
+logger = logging.getLogger(__name__)
+
+# Statuses a WAF / bot manager answers with instead of the page
+BLOCK_STATUSES = {403, 429}
+# Header -> value prefix that marks a challenge or block page even on a 200/503
+BLOCK_HEADERS = {
+    "cf-mitigated": "challenge",     # Cloudflare managed challenge
+    "x-amzn-waf-action": "",         # AWS WAF (captcha / challenge / block)
+    "x-datadome": "",                # DataDome bot manager
+    "x-akamai-bot": "",              # Akamai Bot Manager deny action
+}
+# Navigation that ends up on one of these paths was redirected to a challenge
+BLOCK_URL_MARKERS = ("/captcha", "/challenge", "/cdn-cgi/challenge", "/blocked", "/access-denied")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BlockedError(Exception):
+    """Raised when a response is a WAF block. The message keeps the BLOCKED_BY_WAF marker."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"BLOCKED_BY_WAF: {reason} ({url})")
+        self.url = url
+        self.reason = reason
+
+
+def block_reason(status: Optional[int], headers: Optional[dict] = None, url: str = "") -> Optional[str]:
+    """Why a response looks like a block (None if it doesn't). Uses status, headers and final URL only."""
+    if status in BLOCK_STATUSES:
+        return f"HTTP {status}"
+    for name, prefix in BLOCK_HEADERS.items():
+        value = (headers or {}).get(name)
+        if value is not None and value.lower().startswith(prefix):
+            return f"{name}: {value}"
+    lowered = url.lower()
+    for marker in BLOCK_URL_MARKERS:
+        if marker in lowered:
+            return f"redirected to {marker}"
+    return None
+
+
+def response_block_reason(response) -> Optional[str]:
+    """block_reason for a Playwright navigation response (None when goto returned no response)."""
+    if response is None:
+        return None
+    return block_reason(response.status, response.headers, response.url)
+
+
+class Circuit:
+    """
+    Breaker state for one site.
+
+    CLOSED: requests flow. A block opens the circuit: every request for the site waits
+    for `open_for` seconds. Then the first waiter goes through alone as the canary
+    (HALF_OPEN) while the rest keep waiting. A clean canary closes the circuit and
+    releases everyone; a blocked canary re-opens it for twice as long (up to
+    `max_open_s`). A canary that fails for another reason (timeout...) hands the
+    canary slot to the next waiter.
+    """
+
+    def __init__(self, domain: str, open_s: float = 60.0, max_open_s: float = 900.0):
+        self.domain = domain
+        self.open_s = open_s
+        self.max_open_s = max_open_s
+        self.state = CLOSED
+        self.open_for = open_s
+        self.opened_until = 0.0
+        self.canary_in_flight = False
+        self.trips = 0
+        self.canaries = 0
+        self.paused_s = 0.0
+        self._opened_at = 0.0
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake every waiter so it re-reads the state, then arm a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def before(self) -> bool:
+        """Waits until a request may go out. Returns True if the caller is the canary."""
+        while True:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and not self.canary_in_flight:
+                delay = self.opened_until - time.monotonic()
+                if delay <= 0:
+                    self.state = HALF_OPEN
+                    self.canary_in_flight = True
+                    self.canaries += 1
+                    logger.info(f"🐤 {self.domain}: sending canary request")
+                    return True
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._changed.wait()
+
+    def trip(self, reason: str):
+        if self.state == CLOSED:
+            self.trips += 1
+            self._opened_at = time.monotonic()
+        self.state = OPEN
+        self.canary_in_flight = False
+        self.opened_until = time.monotonic() + self.open_for
+        logger.error(f"🛑 {self.domain} circuit OPEN ({reason}): pausing all workers for {self.open_for:.0f}s")
+        self.open_for = min(self.max_open_s, self.open_for * 2)
+        self._notify()
+
+    def record(self, canary: bool, reason: Optional[str]):
+        """Outcome of a request. `reason` is the block reason, None for a clean response."""
+        if reason:
+            # In-flight requests that started before the trip don't extend the pause
+            if self.state == CLOSED or canary:
+                self.trip(reason)
+        elif canary:
+            self.state = CLOSED
+            self.canary_in_flight = False
+            self.open_for = self.open_s
+            paused = time.monotonic() - self._opened_at
+            self.paused_s += paused
+            logger.info(f"✅ {self.domain} circuit CLOSED after {paused:.0f}s: canary got through, resuming")
+            self._notify()
+
+    def abandon(self, canary: bool):
+        """The request failed without telling block from not-block; let another waiter be the canary."""
+        if canary and self.state == HALF_OPEN:
+            self.state = OPEN
+            self.canary_in_flight = False
+            self.opened_until = time.monotonic()
+            self._notify()
+
+
+class CircuitBreaker:
+    """Per-site circuits shared by every scraper in the process."""
+
+    def __init__(self, open_s: float = 60.0, max_open_s: float = 900.0):
+        self.open_s = open_s
+        self.max_open_s = max_open_s
+        self.circuits: Dict[str, Circuit] = {}
+
+    def circuit(self, url: str) -> Circuit:
+        domain = domain_of(url)
+        if domain not in self.circuits:
+            self.circuits[domain] = Circuit(domain, self.open_s, self.max_open_s)
+        return self.circuits[domain]
+
+    async def before(self, url: str) -> bool:
+        return await self.circuit(url).before()
+
+    def record(self, url: str, canary: bool, reason: Optional[str]):
+        self.circuit(url).record(canary, reason)
+
+    def abandon(self, url: str, canary: bool):
+        self.circuit(url).abandon(canary)
+
+    def summary(self) -> dict:
+        return {
+            domain: {"state": c.state, "trips": c.trips, "canaries": c.canaries, "paused_s": round(c.paused_s, 1)}
+            for domain, c in self.circuits.items()
+        }
+
+# Shared by every scraper in the process, so a block pauses every worker on that site
+DEFAULT_BREAKER = CircuitBreaker()
@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import logging
+import re
+import statistics
+import time
+from typing import Deque, List, Optional
+
+from .circuit_breaker import BlockedError
+
+logger = logging.getLogger(__name__)
+
+# Outcomes a caller can record; the last two count as congestion signals
+OK, ERROR, BLOCKED, TIMEOUT = "ok", "error", "blocked", "timeout"
+# A 403 named as a status in an error message, not any "403" in a URL, product id or "40300ms"
+HTTP_403 = re.compile(r"\b(?:HTTP|status)\s*:?\s*403\b", re.IGNORECASE)
+
+
+def classify(exc: Optional[BaseException]) -> str:
+    """Maps a scrape exception to an outcome (None means success)."""
+    if exc is None:
+        return OK
+    if isinstance(exc, BlockedError) or getattr(exc, "status", None) == 403:
+        return BLOCKED
+    # Errors that only survive as text (e.g. an availability result's "error") keep the marker
+    text = f"{type(exc).__name__} {exc}"
+    if "BLOCKED_BY_WAF" in text or "Access Denied" in text or HTTP_403.search(text):
+        return BLOCKED
+    if "Timeout" in text:
+        return TIMEOUT
+    return ERROR
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit for one kind of concurrency
+    (workers, tabs per worker).
+
+    Callers record the latency and outcome of every unit of work. A block or timeout
+    cuts the limit by `decrease` straight away (at most once per `cooldown_s`, so one
+    burst of failures is one cut). Every `window` samples the limit grows by
+    `increase` if congestion stayed under `max_error_rate` and the median latency is
+    within `latency_tolerance` of the best median seen so far.
+
+    Every change is kept in `decisions` for the performance report.
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int = 1, maximum: int = 16,
+                 increase: int = 1, decrease: float = 0.5, window: int = 20,
+                 max_error_rate: float = 0.05, latency_tolerance: float = 1.5, cooldown_s: float = 10.0):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.peak = self.limit
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.cooldown_s = cooldown_s
+
+        self.baseline_latency: Optional[float] = None
+        self.decisions: List[dict] = []
+        self.counts = {OK: 0, ERROR: 0, BLOCKED: 0, TIMEOUT: 0}
+        self._latencies: List[float] = []
+        self._window_outcomes: List[str] = []
+        self._last_cut = 0.0
+
+    def semaphore(self) -> "AdaptiveSemaphore":
+        """A gate that admits up to the controller's current limit."""
+        return AdaptiveSemaphore(self)
+
+    def record(self, latency: float, outcome: str = OK):
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        self._window_outcomes.append(outcome)
+        if outcome == OK:
+            self._latencies.append(latency)
+
+        if outcome in (BLOCKED, TIMEOUT):
+            self._cut(f"{outcome} signal")
+        if len(self._window_outcomes) >= self.window:
+            self._evaluate()
+
+    def _evaluate(self):
+        outcomes, latencies = self._window_outcomes, self._latencies
+        self._window_outcomes, self._latencies = [], []
+
+        congestion = sum(1 for o in outcomes if o in (BLOCKED, TIMEOUT)) / len(outcomes)
+        if congestion > self.max_error_rate:
+            self._cut(f"congestion {congestion:.0%} over window")
+            return
+        if not latencies:
+            return
+
+        median = statistics.median(latencies)
+        if self.baseline_latency is None or median < self.baseline_latency:
+            self.baseline_latency = median
+        if median > self.baseline_latency * self.latency_tolerance:
+            self._decide(self.limit, f"hold: median {median:.2f}s vs baseline {self.baseline_latency:.2f}s")
+        elif self.limit < self.maximum:
+            self._decide(min(self.maximum, self.limit + self.increase), f"healthy: median {median:.2f}s")
+
+    def _cut(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown_s:
+            return
+        self._last_cut = now
+        # Latency under the old limit no longer says anything about the new one
+        self._window_outcomes, self._latencies = [], []
+        self._decide(max(self.minimum, int(self.limit * self.decrease)), reason)
+
+    def _decide(self, new_limit: int, reason: str):
+        old = self.limit
+        self.limit = new_limit
+        self.peak = max(self.peak, new_limit)
+        self.decisions.append({
+            "time": time.strftime("%H:%M:%S"),
+            "controller": self.name,
+            "from": old,
+            "to": new_limit,
+            "reason": reason,
+        })
+        if new_limit != old:
+            arrow = "⬆️" if new_limit > old else "⬇️"
+            logger.info(f"{arrow} {self.name} concurrency {old} -> {new_limit} ({reason})")
+
+    def summary(self) -> dict:
+        return {
+            "limit": self.limit,
+            "peak": self.peak,
+            "changes": sum(1 for d in self.decisions if d["from"] != d["to"]),
+            **self.counts,
+        }
+
+
+class AdaptiveSemaphore:
+    """asyncio.Semaphore whose size follows an AIMDController's limit."""
+
+    def __init__(self, controller: AIMDController):
+        self.controller = controller
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    async def acquire(self):
+        while self.in_use >= self.controller.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self._waiters.remove(waiter)
+        self.in_use += 1
+
+    def release(self):
+        self.in_use -= 1
+        # Wake as many waiters as there are free slots under the current limit
+        free = self.controller.limit - self.in_use
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Product cards out of the page's inline Flight data (self.__next_f), resolved and trimmed to the
+# fields rsc.to_product_card reads, as one JSON string (null if the page carries no Flight data).
+# Text (T) rows never hold cards, so a plain line split is enough in-page.
+FLIGHT_CARDS_JS = """() => {
+    const chunks = (self.__next_f || []).filter(c => c && c[0] === 1).map(c => c[1]);
+    if (!chunks.length) return null;
+    const rows = new Map();
+    const cardLines = [];
+    for (const line of chunks.join('').split('\\n')) {
+        const m = /^([0-9a-fA-F]+):(.*)$/s.exec(line);
+        if (!m) continue;
+        rows.set(m[1].toLowerCase(), m[2]);
+        if (m[2].includes('"cardData"')) cardLines.push(m[2]);
+    }
+    const resolve = (v) => {
+        if (typeof v !== 'string' || !v.startsWith('$')) return v;
+        const m = /^\\$[L@]?([0-9a-fA-F]+)$/.exec(v);
+        const raw = m && rows.get(m[1].toLowerCase());
+        if (!raw) return v;
+        try { return JSON.parse(raw.replace(/^[A-Z]+/, '')); } catch (e) { return v; }
+    };
+    const pick = (obj, keys) => {
+        const out = {};
+        if (obj && typeof obj === 'object') for (const k of keys) if (obj[k] !== undefined) out[k] = obj[k];
+        return out;
+    };
+    const cards = [];
+    const seen = new Set();
+    for (const line of cardLines) {
+        let data;
+        try { data = JSON.parse(line.replace(/^[A-Z]+/, '')); } catch (e) { continue; }
+        const stack = [data];
+        while (stack.length) {
+            const node = stack.pop();
+            if (!node || typeof node !== 'object') continue;
+            if (!Array.isArray(node) && node.cardData !== undefined) {
+                const card = resolve(node.cardData);
+                if (card && card.id && !seen.has(card.id)) {
+                    seen.add(card.id);
+                    const rec = pick(card, ['id', 'sellingPrice', 'discountedSellingPrice', 'mrp', 'availableQuantity', 'storeId']);
+                    rec.product = pick(resolve(card.product), ['name', 'brand', 'slug']);
+                    rec.productVariant = pick(resolve(card.productVariant), ['id', 'slug', 'mrp', 'formattedPacksize', 'shelfLifeInHours']);
+                    cards.push(rec);
+                }
+            }
+            for (const v of Object.values(node)) if (v && typeof v === 'object') stack.push(v);
+        }
+    }
+    return JSON.stringify(cards);
+}"""
+
+
+class ExtractionStats:
+    """Run-wide counters for in-page extraction: evaluate calls, payload bytes, Python parse time."""
+
+    def __init__(self):
+        self.calls = 0
+        self.payload_bytes = 0
+        self.parse_seconds = 0.0
+        self.records = 0
+
+    def record(self, payload_bytes: int, parse_seconds: float, records: int):
+        self.calls += 1
+        self.payload_bytes += payload_bytes
+        self.parse_seconds += parse_seconds
+        self.records += records
+
+    def summary(self) -> dict:
+        return {
+            "evaluate_calls": self.calls,
+            "payload_mb": round(self.payload_bytes / 1_000_000, 2),
+            "avg_payload_kb": round(self.payload_bytes / self.calls / 1000, 1) if self.calls else 0.0,
+            "parse_ms": round(self.parse_seconds * 1000, 1),
+            "records": self.records,
+        }
+
+# Shared by every scraper in the process, so the counters cover the whole run
+EXTRACTION_STATS = ExtractionStats()
+
+
+def parse_payload(raw: Optional[str], stats: ExtractionStats = EXTRACTION_STATS) -> Optional[list]:
+    """Decodes a JSON string returned by an extraction script and records its cost."""
+    if raw is None:
+        return None
+    t0 = time.perf_counter()
+    records = json.loads(raw)
+    stats.record(len(raw), time.perf_counter() - t0, len(records))
+    return records
+
+
+async def run_extractor(page, script: str, stats: ExtractionStats = EXTRACTION_STATS) -> Optional[list]:
+    """Runs an extraction script in the page; returns its records, or None if the page had no data."""
+    return parse_payload(await page.evaluate(script), stats)
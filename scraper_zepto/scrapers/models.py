@@ -40,3 +40,17 @@ class AvailabilityResult(TypedDict):
     inventory: Optional[int]
     scraped_at: str
     error: Optional[str]
+
+class ProductCard(TypedDict):
+    """A product card decoded from Zepto's Flight/RSC payloads (prices in rupees)."""
+    id: str
+    name: str
+    brand: str
+    mrp: Optional[float]
+    price: Optional[float]
+    pack_size: str
+    inventory: Optional[int]
+    shelf_life_in_hours: Optional[str]
+    store_id: Optional[str]
+    slug: Optional[str]
+    variant_id: Optional[str]
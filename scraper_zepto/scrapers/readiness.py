@@ -0,0 +1,34 @@
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Zepto waits are response-driven: callers pass an awaitable (e.g. an asyncio.Event set by a
+# response listener) to BaseScraper.wait_until_ready instead of a page predicate
+
+
+class ReadinessStats:
+    """Run-wide counters for readiness waits: how often each resolved early and the time saved."""
+
+    def __init__(self):
+        self.by_label: Dict[str, Dict[str, float]] = {}
+
+    def record(self, label: str, waited: float, ceiling: float, ready: bool):
+        s = self.by_label.setdefault(label, {"waits": 0, "ready": 0, "waited_s": 0.0, "saved_s": 0.0})
+        s["waits"] += 1
+        s["waited_s"] += waited
+        if ready:
+            s["ready"] += 1
+            s["saved_s"] += max(0.0, ceiling - waited)
+
+    def summary(self) -> dict:
+        return {
+            "waits": sum(s["waits"] for s in self.by_label.values()),
+            "ready_early": sum(s["ready"] for s in self.by_label.values()),
+            "saved_s": round(sum(s["saved_s"] for s in self.by_label.values()), 1),
+            "by_label": {label: {**s, "waited_s": round(s["waited_s"], 1), "saved_s": round(s["saved_s"], 1)}
+                         for label, s in self.by_label.items()},
+        }
+
+# Shared by every scraper in the process, so the counters cover the whole run
+READINESS_STATS = ReadinessStats()
@@ -0,0 +1,260 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, Optional, Set, Union
+from .models import ProductCard
+
+logger = logging.getLogger(__name__)
+
+# Inline Flight chunks in the SSR HTML: self.__next_f.push([1,"<escaped row text>"])
+NEXT_F_PUSH = re.compile(r'self\.__next_f\.push\(\[1,\s*"((?:[^"\\]|\\.)*)"\]\)', re.S)
+ROW_ID = re.compile(rb'[0-9a-fA-F]+')
+REF = re.compile(r'^\$[L@]?([0-9a-fA-F]+)(?::(.*))?$')
+
+
+class FlightStream:
+    """
+    Decoder for the React Server Components "Flight" row format.
+
+    A payload is a sequence of rows `<hex id>:<TAG?><data>`:
+      - JSON rows:     `5:{"cardData":...}` / `5:["$","div",...]`  (terminated by newline)
+      - text rows:     `1a:T<hex byte length>,<raw text>`          (length-prefixed, may contain newlines)
+      - other tags:    `I` (module), `HL` (hint), `E` (error)...   (JSON after the tag, kept as-is)
+
+    The payload is scanned once to index row boundaries. Rows are only json-decoded
+    when something needs them: rows mentioning `cardData` while iterating cards, any
+    other row when a card references it ("$<id>", "$L<id>", "$@<id>", optionally
+    with a ":path").
+    """
+
+    def __init__(self, payload: Union[str, bytes]):
+        self._raw: Dict[str, bytes] = {} # row id -> undecoded JSON bytes
+        self._parsed: Dict[str, Any] = {} # row id -> decoded value (text rows land here directly)
+        self.bad_rows = 0
+        data = payload.encode("utf-8") if isinstance(payload, str) else payload
+        self._parse(data)
+
+    @classmethod
+    def from_html(cls, html: str) -> "FlightStream":
+        """Builds a stream from the `self.__next_f.push` chunks embedded in SSR HTML."""
+        chunks = []
+        for match in NEXT_F_PUSH.finditer(html):
+            try:
+                chunks.append(json.loads(f'"{match.group(1)}"'))
+            except ValueError:
+                continue
+        return cls("".join(chunks))
+
+    @classmethod
+    def from_json(cls, value: Any) -> "FlightStream":
+        """Wraps an already-parsed JSON API body as a single-row stream."""
+        stream = cls(b"")
+        stream._parsed["0"] = value
+        return stream
+
+    @classmethod
+    def from_text(cls, text: str) -> "FlightStream":
+        """Accepts a raw RSC body, an HTML page carrying inline chunks, or a plain JSON body."""
+        if "self.__next_f.push" in text:
+            return cls.from_html(text)
+        if text.lstrip().startswith(("{", "[")):
+            try:
+                return cls.from_json(json.loads(text))
+            except ValueError:
+                pass
+        return cls(text)
+
+    def _parse(self, data: bytes):
+        pos = 0
+        end = len(data)
+        while pos < end:
+            colon = data.find(b":", pos)
+            if colon == -1:
+                break
+            row_id = data[pos:colon].strip()
+            if not ROW_ID.fullmatch(row_id):
+                # Not at a row boundary (garbage / truncated stream): skip to the next line
+                newline = data.find(b"\n", pos)
+                if newline == -1:
+                    break
+                pos = newline + 1
+                continue
+
+            key = row_id.decode("ascii").lower()
+            body = colon + 1
+
+            if data[body:body + 1] == b"T":
+                # Text row: byte length in hex, then exactly that many bytes (no terminator)
+                comma = data.find(b",", body)
+                try:
+                    length = int(data[body + 1:comma], 16)
+                except ValueError:
+                    self.bad_rows += 1
+                    pos = data.find(b"\n", body) + 1 or end
+                    continue
+                self._parsed[key] = data[comma + 1:comma + 1 + length].decode("utf-8", "replace")
+                pos = comma + 1 + length
+                continue
+
+            newline = data.find(b"\n", body)
+            if newline == -1:
+                newline = end
+            # Strip a leading tag (I, HL, E...) before the JSON value
+            while body < newline and 65 <= data[body] <= 90:
+                body += 1
+            self._raw[key] = data[body:newline]
+            pos = newline + 1
+
+    def row(self, key: str) -> Any:
+        """Decoded value of a row (None if missing or malformed)."""
+        if key in self._parsed:
+            return self._parsed[key]
+        raw = self._raw.pop(key, None)
+        if raw is None:
+            return None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            self.bad_rows += 1
+            value = None
+        self._parsed[key] = value
+        return value
+
+    @property
+    def rows(self) -> Dict[str, Any]:
+        """All rows, decoded (forces every pending row)."""
+        for key in list(self._raw):
+            self.row(key)
+        return self._parsed
+
+    def resolve(self, value: Any, _seen: Optional[Set[str]] = None) -> Any:
+        """Returns `value` with row references replaced by the rows they point to (deep, cycle safe)."""
+        if isinstance(value, str):
+            if not value.startswith("$") or len(value) < 2:
+                return value
+            if value.startswith("$$"):
+                return value[1:]
+            match = REF.match(value)
+            if not match:
+                return value # $undefined, $D<date>, $n<bigint>... are left as-is
+            key = match.group(1).lower()
+            if key not in self._raw and key not in self._parsed:
+                return value
+            _seen = _seen or set()
+            if key in _seen:
+                return None
+            target = self.resolve(self.row(key), _seen | {key})
+            # Newer React versions address into a row: "$5:props:children"
+            if match.group(2):
+                for part in match.group(2).split(":"):
+                    try:
+                        target = target[int(part)] if isinstance(target, list) else target[part]
+                    except (KeyError, IndexError, ValueError, TypeError):
+                        return None
+            return target
+        if isinstance(value, dict):
+            return {k: self.resolve(v, _seen) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(v, _seen) for v in value]
+        return value
+
+    def _resolve_fields(self, card: dict) -> dict:
+        """Resolves only the top-level references of a card (product/productVariant rows)."""
+        refs = {k: v for k, v in card.items() if isinstance(v, str) and v.startswith("$")}
+        if not refs:
+            return card
+        card = dict(card)
+        for k, v in refs.items():
+            card[k] = self.resolve(v)
+        return card
+
+    def iter_card_data(self) -> Iterator[dict]:
+        """Yields every `cardData` object in stream order (duplicates included)."""
+        found = []
+
+        def collect(obj):
+            card = obj.get("cardData")
+            if card is not None:
+                found.append(card)
+            return obj
+
+        keys = [k for k, raw in self._raw.items() if b'"cardData"' in raw]
+        keys += [k for k, v in self._parsed.items() if not isinstance(v, str)]
+        for key in keys:
+            found.clear()
+            if key in self._raw:
+                # One C-level decode per row; the hook picks cards up as objects are built
+                try:
+                    self._parsed[key] = json.loads(self._raw.pop(key), object_hook=collect)
+                except ValueError:
+                    self.bad_rows += 1
+                    continue
+            else:
+                stack = [self._parsed[key]]
+                while stack:
+                    node = stack.pop()
+                    if isinstance(node, dict):
+                        collect(node)
+                        stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+                    elif isinstance(node, list):
+                        stack.extend(v for v in node if isinstance(v, (dict, list)))
+            for card in list(found):
+                if isinstance(card, str):
+                    card = self.resolve(card)
+                if isinstance(card, dict):
+                    yield card
+
+
+def _paise(value) -> Optional[float]:
+    try:
+        return float(value) / 100.0 if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_product_card(card: dict) -> Optional[ProductCard]:
+    """Normalises a Zepto `cardData` object (prices in paise) into a ProductCard."""
+    pid = card.get("id")
+    product_info = card.get("product") or {}
+    variant_info = card.get("productVariant") or {}
+    name = product_info.get("name")
+    if not pid or not name:
+        return None
+
+    price = _paise(card.get("sellingPrice", card.get("discountedSellingPrice")))
+    mrp = _paise(card.get("mrp", variant_info.get("mrp")))
+    inventory = card.get("availableQuantity")
+
+    return {
+        "id": pid,
+        "name": name,
+        "brand": product_info.get("brand") or "Unknown",
+        "mrp": mrp,
+        "price": price,
+        "pack_size": variant_info.get("formattedPacksize") or "N/A",
+        "inventory": inventory,
+        "shelf_life_in_hours": variant_info.get("shelfLifeInHours"),
+        "store_id": card.get("storeId"),
+        "slug": product_info.get("slug") or variant_info.get("slug"),
+        "variant_id": variant_info.get("id"),
+    }
+
+
+def iter_product_cards(payload: Union[str, bytes, FlightStream], seen: Optional[Set[str]] = None) -> Iterator[ProductCard]:
+    """
+    Generator over the distinct product cards of an RSC body / SSR HTML page.
+
+    Pass the same `seen` set across several payloads to dedup a whole category crawl.
+    """
+    stream = payload if isinstance(payload, FlightStream) else (
+        FlightStream.from_text(payload) if isinstance(payload, str) else FlightStream(payload)
+    )
+    seen = seen if seen is not None else set()
+    for raw in stream.iter_card_data():
+        pid = raw.get("id")
+        if not pid or pid in seen:
+            continue
+        card = to_product_card(stream._resolve_fields(raw))
+        if card:
+            seen.add(pid)
+            yield card
@@ -5,25 +5,89 @@ import logging
 import json
 import re
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional
 from .base import BaseScraper
-from .models import ProductItem
-from urllib.parse import quote
+from .session_cache import SessionCache
+from .category_tree import CategoryTree, CategoryCache
+from .models import ProductItem, ProductCard
+from .rsc import FlightStream, iter_product_cards, to_product_card
+from .extractors import FLIGHT_CARDS_JS, run_extractor
+from .circuit_breaker import BlockedError, block_reason
+from .concurrency import AIMDController, classify, OK, ERROR, BLOCKED
+from urllib.parse import quote, urlparse, parse_qs
 
 logger = logging.getLogger(__name__)
 
 class ZeptoScraper(BaseScraper):
-    def __init__(self, headless=False):
-        super().__init__(headless)
-        self.base_url = "https://www.zepto.com/"
+    # Category listing endpoint the web app pages through (replayed in turbo mode)
+    CATEGORY_API = "https://bff-gateway.zepto.com/lms/api/v2/get_page"
+    # Headers copied from the site's own API calls (auth/session/store context)
+    API_CONTEXT_HEADERS = {
+        "storeid", "store_id", "store_ids", "store_etas", "app_version", "appversion", "platform",
+        "session_id", "sessionid", "device_id", "deviceid", "x-xsrf-token", "x-csrf-secret",
+        "request_id", "tenant", "marketplace_type", "compatible_components"
+    }
+    TURBO_MAX_PAGES = 10 # Hard cap on pagination waves per category
+
+    def __init__(self, headless=False, pool=None, wave_controller: Optional[AIMDController] = None):
+        super().__init__(headless, pool)
+        self.wave_controller = wave_controller # Sizes turbo waves instead of `concurrency` when set
+        self.base_url = self.storefront.url("https://www.zepto.com/")
+        self.category_api = self.storefront.url(self.CATEGORY_API)
         self.delivery_eta = "N/A"
         self.store_id = "N/A"
         self.clicked_location_label = "N/A"
+        self.session_cache = SessionCache(self.storefront.namespace("zepto"))
+        self.category_cache = CategoryCache(self.storefront.namespace("zepto"))
+        # Turbo mode context, captured from the site's own bff-gateway calls during set_location
+        self.location_data = {"store_id": None, "latitude": None, "longitude": None}
+        self.api_headers = {}
+        self.turbo_stats = {}
+        self.failed_category_urls: List[str] = [] # Categories the last scrape_assortment_* call could not fetch
+
+    def _session_meta(self) -> dict:
+        return {
+            "delivery_eta": self.delivery_eta,
+            "store_id": self.store_id,
+            "clicked_location_label": self.clicked_location_label,
+            "location_data": self.location_data,
+            "api_headers": self.api_headers
+        }
+
+    def _apply_session_meta(self, meta: dict):
+        self.delivery_eta = meta.get("delivery_eta", self.delivery_eta)
+        self.store_id = meta.get("store_id", self.store_id)
+        self.clicked_location_label = meta.get("clicked_location_label", self.clicked_location_label)
+        self.location_data = meta.get("location_data") or self.location_data
+        self.api_headers = meta.get("api_headers") or self.api_headers
+
+    async def _is_location_valid(self, pincode: str) -> bool:
+        """A located Zepto session renders the delivery ETA in the header without any modal."""
+        await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+        try:
+            await self.page.wait_for_selector("div[data-testid='eta-container'], p[class*='eta']", timeout=5000)
+            return self.store_id != "N/A"
+        except Exception:
+            return False
 
     async def set_location(self, pincode: str):
         logger.info(f"Setting location to {pincode}")
+        self.current_pincode = pincode
+
+        # Fast path: reuse a cached, already-located session
+        if await self.restore_session(pincode):
+            logger.info(f"Location restored from session cache for {pincode} (Store: {self.store_id})")
+            return
+
+        # Don't carry the previous pincode's store over a failed locate
+        self.store_id = "N/A"
+        self.location_data = {"store_id": None, "latitude": None, "longitude": None}
+
+        # Record the store/coordinates/auth headers the site itself sends to the API
+        self.page.on("request", self._capture_api_context)
+
         try:
-            await self.page.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
+            await self.goto(self.base_url, timeout=60000, wait_until='domcontentloaded')
             await self.human_delay()
 
             # Location interaction logic
@@ -67,7 +131,7 @@ class ZeptoScraper(BaseScraper):
                     await self.page.click(input_selector)
                     await self.page.keyboard.press("Control+A")
                     await self.page.keyboard.press("Backspace")
-                    await self.page.keyboard.type(pincode, delay=100)
+                    await self.page.keyboard.type(pincode, delay=100 if self.storefront.human_delays else 0)
                     logger.info(f"Typed pincode: {pincode}")
                     
                     await self.human_delay()
@@ -156,10 +220,52 @@ class ZeptoScraper(BaseScraper):
             except Exception as e:
                  logger.warning(f"Could not capture Store ID: {e}")
 
+            if self.store_id == "N/A" and self.location_data.get("store_id"):
+                self.store_id = self.location_data["store_id"]
+                logger.info(f"Captured Store ID from API headers: {self.store_id}")
+            elif self.store_id != "N/A":
+                self.location_data["store_id"] = self.store_id
+
+            # A resolved store id means the location took; cache the session for later runs
+            if self.store_id != "N/A":
+                await self.save_session(pincode)
+
         except Exception as e:
             logger.error(f"Error setting location: {e}")
+        finally:
+            self.page.remove_listener("request", self._capture_api_context)
+
+    def _capture_api_context(self, request):
+        """Request listener: keeps the latest store id, coordinates and API headers."""
+        try:
+            if "bff-gateway" not in request.url and not request.url.startswith(self.category_api):
+                return
+            headers = request.headers
+            kept = {k: v for k, v in headers.items() if k.lower() in self.API_CONTEXT_HEADERS}
+            if kept:
+                self.api_headers.update(kept)
+
+            store_id = headers.get("storeid") or headers.get("store_id")
+            if store_id:
+                # store_ids can be a comma separated list; the first one is the primary store
+                self.location_data["store_id"] = store_id.split(",")[0]
+
+            query = parse_qs(urlparse(request.url).query)
+            for key, field in (("latitude", "latitude"), ("lat", "latitude"), ("longitude", "longitude"), ("lng", "longitude")):
+                if key in query:
+                    self.location_data[field] = query[key][0]
+        except Exception:
+            pass
 
     async def get_all_categories(self) -> List[str]:
+        # Cached tree for this store (no homepage re-crawl)
+        cache_key = self._category_cache_key()
+        tree = self.category_cache.load(cache_key) if cache_key else None
+        if tree:
+            categories = tree.listings()
+            logger.info(f"Loaded {len(categories)} categories from cache ({cache_key})")
+            return categories
+
         logger.info("Extracting category links...")
         try:
             await self.page.wait_for_selector("a[href*='/cn/']", timeout=10000)
@@ -170,8 +276,13 @@ class ZeptoScraper(BaseScraper):
                         .filter(href => href.includes('/cn/') && href.includes('/cid/'))
                 }
             """)
-            categories = list(set(hrefs))
-            logger.info(f"Found {len(categories)} unique category links")
+            # One listing per (cid, scid); parent listings with sub-categories are dropped
+            tree = CategoryTree.from_urls("zepto", hrefs)
+            categories = tree.listings()
+            logger.info(f"Found {len(categories)} canonical category links ({tree.stats['links']} links, "
+                        f"{tree.stats['duplicates']} duplicates, {tree.stats['parents_dropped']} parents dropped)")
+            if cache_key and categories:
+                self.category_cache.save(cache_key, tree)
             return categories
         except Exception as e:
             logger.error(f"Error extracting categories: {e}")
@@ -204,7 +315,7 @@ class ZeptoScraper(BaseScraper):
         self.page.on("response", handle_response)
 
         try:
-            await self.page.goto(category_url, timeout=60000)
+            await self.goto(category_url, timeout=60000)
             await self.human_delay(3)
             await self.human_scroll()
             await self.human_delay(2)
@@ -218,15 +329,7 @@ class ZeptoScraper(BaseScraper):
         logger.info(f"Captured {len(captured_data)} responses. Parsing...")
         
         # Extract Category/Sub from URL if possible
-        cat_name = "Unknown"
-        sub_name = "Unknown"
-        try:
-            if "/cn/" in category_url:
-                parts = category_url.split("/cn/")[1].split("/")
-                if len(parts) >= 2:
-                    cat_name = parts[0].replace("-", " ").title()
-                    sub_name = parts[1].replace("-", " ").title()
-        except: pass
+        cat_name, sub_name = self._category_names(category_url)
 
         # Helper to parse product from dict
         def parse_product_from_dict(p_data: dict) -> Optional[ProductItem]:
@@ -255,7 +358,7 @@ class ZeptoScraper(BaseScraper):
                 # URL construction
                 slug = p_data.get("slug")
                 pvid = p_data.get("id") # Using ID as PVID often works or store_product_id
-                url_part = f"/pn/{slug}/pvid/{pvid}" if slug else f"/pvid/{pvid}"
+                url_part = self._product_path(slug, pvid)
                 
                 return {
                     "Category": cat_name,
@@ -279,15 +382,21 @@ class ZeptoScraper(BaseScraper):
                 return None
 
         # Process all captures
+        seen_ids = set() # base_product_id (product page path) already emitted, from either payload shape
+        card_ids = set() # Card ids the decoder already yielded
+
+        def add_card(card: ProductCard):
+            item = self._card_to_item(card, cat_name, sub_name, pincode,
+                                      base_product_id=self._product_path(card["slug"], card["id"]))
+            if item["base_product_id"] not in seen_ids:
+                seen_ids.add(item["base_product_id"])
+                products.append(item)
+
         for capture in captured_data:
             content = capture.get("data")
             
             # CASE 1: JSON Response (API)
             if isinstance(content, dict) or isinstance(content, list):
-                # Traverse to find products
-                # Usually in props -> pageProps -> initialReduxState -> ... -> products
-                # Or simply a list of products in search/category response
-                
                 # Flatten simple lists
                 items_to_check = []
                 if isinstance(content, list):
@@ -296,163 +405,23 @@ class ZeptoScraper(BaseScraper):
                     # Check common keys
                     if "products" in content: items_to_check.extend(content["products"])
                     if "items" in content: items_to_check.extend(content["items"])
-                    # Deep check for storeProducts
-                    # This is a naive recursive finder could be better but sticking to known patterns
-                    # Let's try to just dump the whole dict values if they look like products
-                    pass
 
                 for item in items_to_check:
                     if isinstance(item, dict):
                         p = parse_product_from_dict(item)
-                        if p and not any(x['base_product_id'] == p['base_product_id'] for x in products):
+                        if p and p['base_product_id'] not in seen_ids:
+                            seen_ids.add(p['base_product_id'])
                             products.append(p)
 
-            # CASE 2: HTML/String Response (SSR Flight Data)
-            if isinstance(content, str) and len(content) > 10000:
-                # Regex parsing logic for Flight/HTML string
-                # Matches: href="/pn/..." ... >Name</a> ... >Price</td>
-                
-                # First pass: Build a map of product details from JSON blocks (Inventory, Shelf Life, Pack Size)
-                # Key = PVID (id in JSON), Value = dict of attributes
-                product_details_map = {}
-                try:
-                    # Find all "id":"UUID" occurrences in the Flight data (escaped quotes)
-                    # We capture a window around it to find other properties
-                    # The properties usually follow or precede closely in the same object
-                    
-                    # Pattern look for id with some context
-                    # Flight data is messy, but usually "id" is close to "availableQuantity"
-                    # We iterate over all matches of id="UUID"
-                    id_matches = re.finditer(r'\\\"id\\\":\\\"([a-f0-9\-]+)\\\"', content)
-                    
-                    for match in id_matches:
-                        pvid_key = match.group(1)
-                        start = max(0, match.start() - 1000)
-                        end = min(len(content), match.end() + 1000)
-                        window = content[start:end]
-                        
-                        # To ensure we are in the same object, we should ideally parse syntax
-                        # But for now, we look for tight proximity or "availableQuantity"
-                        # Warning: Window might overlap multiple objects. 
-                        # We try to find the "closest" value. 
-                        # Actually, looking at debug data, "availableQuantity" comes BEFORE "id" sometimes.
-                        # {"availableQuantity":12,"baseProductId":...,"id":"..."}
-                        
-                        details = {}
-                        
-                        # Inventory
-                        qty_match = re.search(r'\\\"availableQuantity\\\":(\d+)', window)
-                        if qty_match: 
-                            # Check if this quantity is "closer" to this ID than another?
-                            # For now, take it. Most blocks are distinct.
-                            details['inventory'] = qty_match.group(1)
-                        
-                        # Shelf Life
-                        sl_match = re.search(r'\\\"shelfLifeInHours\\\":\\\"([^\"]+)\\\"', window)
-                        if sl_match: details['shelf_life'] = sl_match.group(1)
-                        
-                        # Pack Size (raw from store)
-                        ps_match = re.search(r'\\\"packsize\\\":(\d+)', window)
-                        if ps_match: details['pack_size_raw'] = ps_match.group(1)
-                        
-                        # Update map
-                        if details:
-                            if pvid_key not in product_details_map:
-                                product_details_map[pvid_key] = {}
-                            product_details_map[pvid_key].update(details)
-                            
-                    logger.info(f"Built details map with {len(product_details_map)} items")
-                    
-                except Exception as e:
-                    logger.warning(f"Error building details map: {e}")
+                # Card-shaped API bodies go through the shared decoder
+                for card in iter_product_cards(FlightStream.from_json(content), card_ids):
+                    add_card(card)
 
-                link_matches = re.finditer(r'href=\"(/pn/[^\"]+)\"', content)
-                
-                for match in link_matches:
-                    try:
-                        url_part = match.group(1)
-                        if "pvid" not in url_part: continue 
-                        
-                        start_idx = match.end()
-                        snippet = content[start_idx:start_idx+800] 
-                        
-                        pvid = url_part.split("pvid/")[1] if "pvid/" in url_part else ""
-                        
-                        # Name
-                        name_match = re.search(r'>([^<]+)</a>', snippet)
-                        product_name = "Unknown"
-                        pack_size = "N/A"
-                        brand = "Unknown"
-                        price_extracted = None
-                        
-                        if name_match:
-                            raw_name = name_match.group(1).replace("<!-- -->", "").strip()
-                            product_name = re.sub(r'^\d+\.\s*', '', raw_name)
-                            
-                        # Pack Size Regex (from Name)
-                        # Matches "500g", "1 kg", "1pc", "Pack of 2"
-                        if product_name != "Unknown":
-                            size_match = re.search(r'(\d+(?:\.\d+)?\s*(?:g|kg|ml|l|litres|pc|pcs|unit|bunch|pack|bunches)\b)', product_name, re.IGNORECASE)
-                            if size_match:
-                                pack_size = size_match.group(1)
-                                
-                        # Brand from URL (Always try this)
-                        if "/pn/" in url_part:
-                            try:
-                                slug = url_part.split("/pn/")[1]
-                                brand_slug = slug.split("-")[0]
-                                brand = brand_slug.title()
-                            except: pass
-                            
-                        # Refine Brand if " - " exists in Name (overrides slug if valid)
-                        if product_name != "Unknown" and " - " in product_name:
-                            parts = product_name.split(" - ")
-                            if len(parts) > 1 and len(parts[0]) < 20: 
-                                    brand = parts[0]
-
-                        # Lookup details
-                        inventory = "N/A"
-                        shelf_life = "N/A"
-                        
-                        if pvid in product_details_map:
-                            details = product_details_map[pvid]
-                            inventory = details.get('inventory', "N/A")
-                            shelf_life = details.get('shelf_life', "N/A")
-                            
-                            # Fallback for pack size if regex failed
-                            if pack_size == "N/A" and 'pack_size_raw' in details:
-                                pack_size = details['pack_size_raw'] # Might need unit appened, but raw is better than N/A
-                        
-                        # Price
-                        price_match = re.search(r'<td>(₹\d+)</td>', snippet)
-                        price = "N/A"
-                        if price_match:
-                            price = price_match.group(1).replace('₹', '')
-                        elif price_extracted:
-                            price = str(price_extracted)
-
-                        if not any(p['base_product_id'] == url_part for p in products):
-                            item: ProductItem = {
-                                "Category": cat_name,
-                                "Subcategory": sub_name,
-                                "Item Name": product_name,
-                                "Brand": brand, 
-                                "Mrp": price, 
-                                "Price": price,
-                                "Weight/pack_size": pack_size,
-                                "Delivery ETA": self.delivery_eta,
-                                "availability": "In Stock" if inventory != "0" and inventory != "N/A" else "Out of Stock",
-                                "inventory": inventory,
-                                "store_id": self.store_id,
-                                "base_product_id": url_part,
-                                "shelf_life_in_hours": shelf_life,
-                                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                                "pincode_input": pincode,
-                                "clicked_label": self.clicked_location_label
-                            }
-                            products.append(item)
-                    except Exception as e:
-                        pass
+            # CASE 2: HTML/String Response (SSR Flight Data)
+            if isinstance(content, str):
+                # One pass over the Flight rows (inline __next_f chunks or a raw RSC body)
+                for card in iter_product_cards(content, card_ids):
+                    add_card(card)
                         
         logger.info(f"Scraped {len(products)} products from Flight/JSON data")
 
@@ -463,16 +432,22 @@ class ZeptoScraper(BaseScraper):
         products: List[ProductItem] = []
         
         try:
-            await self.set_location(pincode)
+            # Located once per pincode batch (see run_zepto_availability_parallel), not per URL
+            await self.ensure_location(pincode, verify=False)
             
             # Navigate to product page
-            await self.page.goto(product_url, timeout=60000)
+            await self.goto(product_url, timeout=60000)
             await self.human_delay(2)
             
             # We can reuse the same capturing logic or just DOM parsing since it's a single page
             # For speed/simplicity on single page, DOM + Next.js data is often enough
             
-            content = await self.page.content()
+            # Product cards from the page's Flight data, resolved in-page (no full HTML over IPC)
+            try:
+                cards = [c for c in map(to_product_card, await run_extractor(self.page, FLIGHT_CARDS_JS) or []) if c]
+            except Exception as e:
+                logger.warning(f"Flight card extraction failed for {product_url}: {e}")
+                cards = []
             
             # Extract Data from NEXT_DATA or similar if possible, or Fallback to DOM
             # Zepto uses standard Next.js often
@@ -525,11 +500,24 @@ class ZeptoScraper(BaseScraper):
                     pack_size = await ps_el.inner_text()
             except: pass
 
+            # Prefer the product's own card from the page's Flight data over DOM text
+            brand = "Unknown"
+            shelf_life = "N/A"
+            card = self._find_product_card(cards, product_url)
+            if card:
+                name = card["name"] or name
+                brand = card["brand"]
+                if card["price"] is not None: price = str(card["price"])
+                if card["mrp"] is not None: mrp = str(card["mrp"])
+                if card["inventory"] is not None: inventory = str(card["inventory"])
+                if card["pack_size"] != "N/A": pack_size = card["pack_size"]
+                shelf_life = card["shelf_life_in_hours"] or "N/A"
+
             item: ProductItem = {
                 "Category": "Availability Check",
                 "Subcategory": "Direct Link",
                 "Item Name": name,
-                "Brand": "Unknown", # Could extract
+                "Brand": brand,
                 "Mrp": mrp,
                 "Price": price,
                 "Weight/pack_size": pack_size,
@@ -538,7 +526,7 @@ class ZeptoScraper(BaseScraper):
                 "inventory": inventory,
                 "store_id": self.store_id,
                 "base_product_id": product_url,
-                "shelf_life_in_hours": "N/A",
+                "shelf_life_in_hours": shelf_life,
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "pincode_input": pincode,
                 "clicked_label": self.clicked_location_label,
@@ -550,12 +538,21 @@ class ZeptoScraper(BaseScraper):
             
         return products
 
+    def _find_product_card(self, cards: List[ProductCard], product_url: str) -> Optional[ProductCard]:
+        """Card for the product page's pvid (first card if the URL has no pvid)."""
+        pvid_match = re.search(r'/pvid/([^/?#]+)', product_url)
+        if not pvid_match:
+            return cards[0] if cards else None
+        pvid = pvid_match.group(1)
+        return next((c for c in cards if pvid in (c["id"], c["variant_id"])), None)
+
     async def fetch_category_content(self, url: str) -> str:
         """
         Fetches the raw content of a URL using the browser's fetch API.
         This maintains cookies/headers but avoids page rendering overhead.
         """
         try:
+            await self.throttle(url)
             content = await self.page.evaluate(f"""
                 async () => {{
                     try {{
@@ -576,14 +573,9 @@ class ZeptoScraper(BaseScraper):
             logger.error(f"Fast fetch failed for {url}: {e}")
             return None
 
-    async def scrape_assortment_fast(self, category_url: str, pincode: str = None) -> List[ProductItem]:
-        """
-        Scrapes assortment using network interception to capture React Server Components (RSC) data.
-        This is more robust than regex on HTML, ensuring Price, Name, and Inventory are captured.
-        """
-        logger.info(f"Fast Scraping: {category_url}")
-        
-        # Extract Category/Sub from URL if possible
+    @staticmethod
+    def _category_names(category_url: str):
+        """Category / Subcategory names from a /cn/<category>/<subcategory>/... URL."""
         cat_name = "Unknown"
         sub_name = "Unknown"
         try:
@@ -593,51 +585,76 @@ class ZeptoScraper(BaseScraper):
                     cat_name = parts[0].replace("-", " ").title()
                     sub_name = parts[1].replace("-", " ").title()
         except: pass
+        return cat_name, sub_name
+
+    def _extract_cards(self, text: str, seen: set = None) -> Dict[str, ProductCard]:
+        """Decodes the product cards (keyed by id) of an RSC stream, SSR page or JSON body."""
+        # Optimization: skip payloads without product data before decoding
+        if not text or ('"cardData":' not in text and '\\"cardData\\":' not in text):
+            return {}
+        return {card["id"]: card for card in iter_product_cards(text, seen)}
+
+    @staticmethod
+    def _product_path(slug: Optional[str], pvid: str) -> str:
+        """base_product_id of the Flight/JSON path: the product page path the site links to."""
+        return f"/pn/{slug}/pvid/{pvid}" if slug else f"/pvid/{pvid}"
+
+    def _card_to_item(self, card: ProductCard, cat_name: str, sub_name: str, pincode: str,
+                      base_product_id: Optional[str] = None) -> ProductItem:
+        """
+        Maps a decoded ProductCard to a ProductItem (shared by every Zepto scrape path).
+        `base_product_id` defaults to the bare card id, as the fast/turbo paths always stored it.
+        """
+        inventory = card["inventory"]
+        return {
+            "Category": cat_name,
+            "Subcategory": sub_name,
+            "Item Name": card["name"],
+            "Brand": card["brand"],
+            "Mrp": card["mrp"] if card["mrp"] is not None else "N/A",
+            "Price": card["price"] if card["price"] is not None else "N/A",
+            "Weight/pack_size": card["pack_size"],
+            "Delivery ETA": self.delivery_eta,
+            "availability": "In Stock" if (inventory and inventory > 0) else "Out of Stock",
+            "inventory": inventory if inventory is not None else "0",
+            "store_id": card["store_id"] or self.store_id,
+            "base_product_id": base_product_id or card["id"],
+            "shelf_life_in_hours": card["shelf_life_in_hours"] or "N/A",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "pincode_input": pincode,
+            "clicked_label": self.clicked_location_label
+        }
+
+    def _cards_to_items(self, cards: dict, category_url: str, pincode: str) -> List[ProductItem]:
+        cat_name, sub_name = self._category_names(category_url)
+        return [self._card_to_item(card, cat_name, sub_name, pincode) for card in cards.values()]
+
+    async def scrape_assortment_fast(self, category_url: str, pincode: str = None) -> List[ProductItem]:
+        """
+        Scrapes assortment using network interception to capture React Server Components (RSC) data.
+        This is more robust than regex on HTML, ensuring Price, Name, and Inventory are captured.
+        """
+        logger.info(f"Fast Scraping: {category_url}")
 
         captured_products = {}
+        # Set once product cards were decoded and no other data response is still being read
+        cards_ready = asyncio.Event()
+        in_flight = 0
         
         # Define capture logic
         async def handle_response(response):
+            nonlocal in_flight
             try:
                 ct = response.headers.get("content-type", "")
                 if "application/json" in ct or "text/x-component" in ct:
-                    text = await response.text()
-                    
-                    # Optimization: check if line likely contains product data before heavy parsing
-                    if '"cardData":' not in text:
-                        return
-
-                    # Parse RSC/JSON for products
-                    # Strategy: Split by lines (RSC) or just parse JSON
-                    lines = text.split('\n')
-                    for line in lines:
-                        if '"cardData":' in line:
-                            # Try to strip RSC prefix (ID:JSON) if present
-                            parts = line.split(':', 1)
-                            json_part = parts[1] if len(parts) > 1 else line
-                                
-                            try:
-                                data = json.loads(json_part)
-                                
-                                # Recursive search for cardData
-                                def find_cards(obj):
-                                    cards = []
-                                    if isinstance(obj, dict):
-                                        if "cardData" in obj:
-                                            cards.append(obj["cardData"])
-                                        for k, v in obj.items():
-                                            cards.extend(find_cards(v))
-                                    elif isinstance(obj, list):
-                                        for item in obj:
-                                            cards.extend(find_cards(item))
-                                    return cards
-
-                                cards = find_cards(data)
-                                for card in cards:
-                                    if "id" in card:
-                                        captured_products[card["id"]] = card
-                            except:
-                                pass
+                    in_flight += 1
+                    try:
+                        text = await response.text()
+                        captured_products.update(self._extract_cards(text))
+                    finally:
+                        in_flight -= 1
+                    if captured_products and in_flight == 0:
+                        cards_ready.set()
             except:
                 pass
 
@@ -648,68 +665,194 @@ class ZeptoScraper(BaseScraper):
             # Navigate
             # Use 'domcontentloaded' or 'networkidle' depending on speed. 
             # networkidle is safer for RSC which streams after load.
-            await self.page.goto(category_url, timeout=45000, wait_until='networkidle')
+            await self.goto(category_url, timeout=45000, wait_until='networkidle')
             
-            # Small fallback wait to ensure stream completes
-            await asyncio.sleep(2)
+            # Stream complete once the product responses are decoded; 2s is the old fixed wait
+            await self.wait_until_ready(cards_ready.wait(), 2000, "category_cards")
             
         except Exception as e:
             logger.error(f"Error navigating to {category_url}: {e}")
+            self.failed_category_urls = [category_url]
+        else:
+            self.failed_category_urls = []
         finally:
             self.page.remove_listener("response", handle_response)
 
         # Convert captured data to ProductItem
-        products: List[ProductItem] = []
-        
-        for pid, card in captured_products.items():
-            try:
-                # Basic Checks
-                product_info = card.get('product', {})
-                variant_info = card.get('productVariant', {})
-                
-                name = product_info.get('name')
-                if not name: continue 
-                    
-                # Price (paise -> rupees)
-                price = None
-                if 'sellingPrice' in card:
-                    price = float(card['sellingPrice']) / 100.0
-                elif 'discountedSellingPrice' in card:
-                    price = float(card['discountedSellingPrice']) / 100.0
-                    
-                mrp = None
-                if 'mrp' in card:
-                     mrp = float(card['mrp']) / 100.0
-                elif 'mrp' in variant_info:
-                     mrp = float(variant_info['mrp']) / 100.0
-                     
-                inventory = card.get('availableQuantity')
-                
-                # Format fields
-                item: ProductItem = {
-                    "Category": cat_name,
-                    "Subcategory": sub_name,
-                    "Item Name": name,
-                    "Brand": product_info.get('brand', "Unknown"),
-                    "Mrp": mrp if mrp is not None else "N/A",
-                    "Price": price if price is not None else "N/A",
-                    "Weight/pack_size": variant_info.get('formattedPacksize', "N/A"),
-                    "Delivery ETA": self.delivery_eta,
-                    "availability": "In Stock" if (inventory and inventory > 0) else "Out of Stock",
-                    "inventory": inventory if inventory is not None else "0",
-                    "store_id": card.get('storeId', self.store_id),
-                    "base_product_id": pid,
-                    "shelf_life_in_hours": variant_info.get('shelfLifeInHours', "N/A"),
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "pincode_input": pincode,
-                    "clicked_label": self.clicked_location_label
-                }
-                products.append(item)
-            except Exception as e:
-                 # logger.warning(f"Failed to parse product card: {e}")
-                 pass
+        products = self._cards_to_items(captured_products, category_url, pincode)
 
         logger.info(f"Fast scraped {len(products)} products from {category_url}")
         return products
 
+    @staticmethod
+    def _category_ids(category_url: str):
+        """(cid, scid) from a /cn/<cat>/<sub>/cid/<uuid>/scid/<uuid> URL."""
+        cid = re.search(r'/cid/([^/?#]+)', category_url)
+        scid = re.search(r'/scid/([^/?#]+)', category_url)
+        return (cid.group(1) if cid else None, scid.group(1) if scid else None)
 
+    def _category_api_url(self, category_url: str, page_number: int) -> Optional[str]:
+        cid, scid = self._category_ids(category_url)
+        if not cid or not scid:
+            return None
+        params = f"page_type=SUBCATEGORY&version=v2&cid={cid}&scid={scid}&page_number={page_number}"
+        if self.location_data.get("latitude") and self.location_data.get("longitude"):
+            params += f"&latitude={self.location_data['latitude']}&longitude={self.location_data['longitude']}"
+        return f"{self.category_api}?{params}"
+
+    async def _fetch_batch(self, requests: List[dict]) -> List[dict]:
+        """
+        Fires all requests at once from inside the located page (Promise.all over fetch).
+        Each request is {url, headers}; returns [{status, text, block_reason}] in the same order.
+
+        The batch goes through the circuit breaker as one request: it waits while the
+        site is paused, and any blocked response in it trips (or re-opens) the circuit.
+        """
+        if not requests:
+            return []
+        canary = await self.circuit_breaker.before(requests[0]["url"])
+        try:
+            await self.throttle(requests[0]["url"], cost=len(requests))
+            responses = await self.page.evaluate("""async (requests) => Promise.all(requests.map(async (req) => {
+                try {
+                    const res = await fetch(req.url, {credentials: 'include', headers: req.headers});
+                    return {status: res.status, final_url: res.url, text: res.ok ? await res.text() : null};
+                } catch (e) {
+                    return {status: 0, text: null};
+                }
+            }))""", requests)
+        except BaseException:
+            self.circuit_breaker.abandon(requests[0]["url"], canary)
+            raise
+        for res in responses:
+            res["block_reason"] = block_reason(res.get("status"), None, res.get("final_url") or "")
+        reason = next((r["block_reason"] for r in responses if r["block_reason"]), None)
+        if not reason and all(r.get("status") == 0 for r in responses):
+            self.circuit_breaker.abandon(requests[0]["url"], canary) # Network errors say nothing about blocking
+        else:
+            self.circuit_breaker.record(requests[0]["url"], canary, reason)
+        return responses
+
+    def _waves(self, items: list, concurrency: int):
+        """Consecutive chunks of `items`; each one is sized by the wave_controller's current limit if set."""
+        start = 0
+        while start < len(items):
+            size = self.wave_controller.limit if self.wave_controller else concurrency
+            yield items[start:start + size]
+            start += size
+
+    async def _fetch_wave(self, requests: List[dict]) -> List[dict]:
+        """_fetch_batch that reports the wave's latency and outcome to the wave_controller."""
+        started = time.perf_counter()
+        outcome = ERROR
+        try:
+            responses = await self._fetch_batch(requests)
+            if any(r["block_reason"] for r in responses):
+                outcome = BLOCKED
+            elif any(r.get("status") for r in responses):
+                outcome = OK
+            return responses
+        except Exception as e:
+            outcome = classify(e)
+            raise
+        finally:
+            if self.wave_controller:
+                self.wave_controller.record(time.perf_counter() - started, outcome)
+
+    async def scrape_assortment_turbo(self, category_urls: List[str], pincode: str = None, concurrency: int = 20) -> List[ProductItem]:
+        """
+        Turbo mode: replays the category API for every category in parallel from the
+        located page instead of navigating to each one (see optimization_plan.md).
+
+        1. Page 0 of every category goes out as one Promise.all wave (`concurrency` per wave,
+           or the wave_controller's AIMD limit when set).
+        2. Categories that returned new cards get their next page in the following wave.
+        3. Categories whose API call failed are fetched once as an RSC payload (`RSC: 1`).
+
+        Per-category outcome is kept in self.turbo_stats so callers can spot degradation.
+        """
+        api_headers = {"accept": "application/json", **self.api_headers}
+        if self.location_data.get("store_id") and "storeid" not in api_headers:
+            api_headers["storeid"] = self.location_data["store_id"]
+
+        cards_by_category = {url: {} for url in category_urls}
+        api_ok = set()
+        api_failed = []
+        pages_fetched = 0
+        t0 = time.perf_counter()
+
+        # 1 & 2. API waves: (category_url, page_number) still to fetch
+        pending = []
+        for url in category_urls:
+            if self._category_api_url(url, 0):
+                pending.append((url, 0))
+            else:
+                api_failed.append(url)
+
+        while pending:
+            next_pending = []
+            for chunk in self._waves(pending, concurrency):
+                responses = await self._fetch_wave(
+                    [{"url": self._category_api_url(url, page_no), "headers": api_headers} for url, page_no in chunk]
+                )
+                pages_fetched += len(chunk)
+
+                for (url, page_no), res in zip(chunk, responses):
+                    if res["block_reason"]:
+                        logger.error(f"🛑 BLOCKED: {res['block_reason']} from category API ({url})")
+                        raise BlockedError(url, res["block_reason"])
+                    cards = self._extract_cards(res.get("text"))
+                    new_ids = cards.keys() - cards_by_category[url].keys()
+                    if not cards:
+                        # Page 0 with nothing usable means the API path failed for this category
+                        if page_no == 0:
+                            api_failed.append(url)
+                        continue
+                    api_ok.add(url)
+                    cards_by_category[url].update(cards)
+
+                    has_more = '"hasReachedEnd":false' in res["text"].replace(" ", "")
+                    if new_ids and has_more and page_no + 1 < self.TURBO_MAX_PAGES:
+                        next_pending.append((url, page_no + 1))
+            pending = next_pending
+
+        # 3. RSC fallback for categories the API didn't serve
+        rsc_ok = set()
+        if api_failed:
+            logger.info(f"Turbo: {len(api_failed)} categories fell back to RSC fetch")
+            rsc_headers = {"RSC": "1", "accept": "text/x-component"}
+            for chunk in self._waves(api_failed, concurrency):
+                responses = await self._fetch_wave([{"url": url, "headers": rsc_headers} for url in chunk])
+                pages_fetched += len(chunk)
+                for url, res in zip(chunk, responses):
+                    if res["block_reason"]:
+                        logger.error(f"🛑 BLOCKED: {res['block_reason']} on RSC fetch ({url})")
+                        raise BlockedError(url, res["block_reason"])
+                    cards = self._extract_cards(res.get("text"))
+                    if cards:
+                        rsc_ok.add(url)
+                        cards_by_category[url].update(cards)
+
+        products: List[ProductItem] = []
+        for url, cards in cards_by_category.items():
+            products.extend(self._cards_to_items(cards, url, pincode))
+
+        elapsed = time.perf_counter() - t0
+        failed = [url for url in category_urls if url not in api_ok and url not in rsc_ok]
+        self.failed_category_urls = failed
+        total = len(category_urls)
+        self.turbo_stats = {
+            "categories": total,
+            "api_ok": len(api_ok),
+            "rsc_ok": len(rsc_ok),
+            "failed": failed,
+            "success_rate": round((total - len(failed)) / total, 3) if total else 0.0,
+            "requests": pages_fetched,
+            "seconds": round(elapsed, 2),
+            "items_per_min": round(len(products) / elapsed * 60) if elapsed > 0 else 0
+        }
+        logger.info(
+            f"⚡ Turbo scraped {len(products)} products from {total - len(failed)}/{total} categories "
+            f"(API {len(api_ok)}, RSC {len(rsc_ok)}) in {elapsed:.1f}s (~{self.turbo_stats['items_per_min']} items/min)"
+        )
+        return products
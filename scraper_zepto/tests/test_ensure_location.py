@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from scrapers.zepto import ZeptoScraper
+
+
+class FlakyLocateScraper(ZeptoScraper):
+    """set_location resolves a store only from the `succeed_from`-th attempt on."""
+
+    def __init__(self, succeed_from: int):
+        super().__init__(headless=True)
+        self.succeed_from = succeed_from
+        self.locates = 0
+
+    async def set_location(self, pincode: str):
+        self.locates += 1
+        self.store_id = "store-1" if self.locates >= self.succeed_from else "N/A"
+
+
+def test_failed_locate_is_retried_on_the_next_call():
+    async def scenario():
+        scraper = FlakyLocateScraper(succeed_from=2)
+        # scrape_availability calls with verify=False, which used to trust a failed locate
+        await scraper.ensure_location("560001", verify=False)
+        assert scraper.located_pincode is None
+        await scraper.ensure_location("560001", verify=False)
+        assert scraper.located_pincode == "560001"
+        await scraper.ensure_location("560001", verify=False)
+        assert scraper.locates == 2
+
+    asyncio.run(scenario())
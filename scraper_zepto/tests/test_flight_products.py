@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("playwright")
+from scrapers.zepto import ZeptoScraper
+
+CATEGORY_URL = "https://www.zepto.com/cn/fruits-vegetables/fresh-vegetables/cid/1/scid/2"
+PVID = "7f3c2a10-0000-4000-8000-000000000001"
+PRODUCT_PATH = f"/pn/onion-1-kg/pvid/{PVID}"
+
+# The same product, once as a plain API product and once as a card in a Flight/RSC body
+API_BODY = {"products": [{"id": PVID, "name": "Onion 1 kg", "slug": "onion-1-kg",
+                          "mrp": 4500, "sellingPrice": 3900, "availableQuantity": 12}]}
+FLIGHT_BODY = json.dumps({"layout": [{"cardData": {
+    "id": PVID, "sellingPrice": 3900, "mrp": 4500, "availableQuantity": 12,
+    "product": {"name": "Onion 1 kg", "brand": "Fresh", "slug": "onion-1-kg"},
+    "productVariant": {"id": "v1", "formattedPacksize": "1 kg"},
+}}]}) + " " * 10000
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+        self.status = 200
+        self.url = "https://www.zepto.com/api/rsc"
+        self.headers = {"content-type": "application/json" if isinstance(body, dict) else "text/x-component"}
+
+    async def json(self):
+        if not isinstance(self.body, dict):
+            raise ValueError("not JSON")
+        return self.body
+
+    async def text(self):
+        return self.body
+
+
+class ReplayPage:
+    """Plays the given responses to the response listeners on navigation."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.listeners = []
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    async def replay(self):
+        for body in self.bodies:
+            for handler in list(self.listeners):
+                await handler(Response(body))
+
+
+def scrape(bodies):
+    scraper = ZeptoScraper(headless=True)
+    scraper.page = ReplayPage(bodies)
+
+    async def goto(url, **kwargs):
+        await scraper.page.replay()
+
+    async def idle(*args, **kwargs):
+        pass
+
+    scraper.goto, scraper.human_delay, scraper.human_scroll = goto, idle, idle
+    return asyncio.run(scraper.scrape_assortment(CATEGORY_URL, "560001"))
+
+
+@pytest.mark.parametrize("bodies", [[API_BODY], [FLIGHT_BODY]])
+def test_both_payload_shapes_use_the_product_path(bodies):
+    assert [p["base_product_id"] for p in scrape(bodies)] == [PRODUCT_PATH]
+
+
+def test_product_in_both_payloads_is_emitted_once():
+    assert [p["base_product_id"] for p in scrape([API_BODY, FLIGHT_BODY])] == [PRODUCT_PATH]
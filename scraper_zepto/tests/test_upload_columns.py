@@ -0,0 +1,29 @@
+import os
+import re
+
+import pytest
+
+pytest.importorskip("supabase")
+from upload_zepto_data import clean_csv_keys
+from utils.sinks import ZEPTO_COLUMNS
+from utils.store_dedup import StoreGroup, fan_out
+
+SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "schema.sql")
+
+
+def table_columns(table: str) -> set:
+    """Column names of `table` as declared in schema.sql."""
+    with open(SCHEMA, encoding="utf-8") as f:
+        body = re.search(rf"create table public\.{table} \((.*?)\n\);", f.read(), re.S).group(1)
+    return {line.split()[0] for line in body.strip().splitlines()}
+
+
+def test_fanned_out_row_fits_the_table():
+    # Every column the sinks write, as a CSV re-read or the streaming DatabaseSink would see it
+    row = {name: "1" for name, _ in ZEPTO_COLUMNS}
+    rows = fan_out([row], StoreGroup("store-1", ["560001", "560002"]))
+    columns = table_columns("zepto_assortment")
+    for pincode, pincode_rows in rows.items():
+        cleaned = clean_csv_keys(pincode_rows[0])
+        assert set(cleaned) <= columns
+        assert cleaned["pincode_input"] == pincode
@@ -1,15 +1,18 @@
 
 import asyncio
-import csv
 import argparse
 import os
 import logging
 from database import Database
+from uploader import BulkUploader, PostgrestClient
+from utils.sinks import read_rows
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Zepto_Uploader")
 
+DEAD_LETTER_FILE = "zepto_upload_dead_letter.jsonl"
+
 def clean_csv_keys(row: dict) -> dict:
     """
     Cleans CSV row keys to match Supabase schema if necessary.
@@ -35,9 +38,6 @@ def clean_csv_keys(row: dict) -> dict:
         if old_key in cleaned:
             cleaned[new_key] = cleaned.pop(old_key)
             
-    # Remove unused keys or keys that don't match table
-    # We keep: name, brand, mrp, price, pack_size, category, subcategory, availability, inventory, store_id, base_product_id, shelf_life_in_hours, scraped_at, pincode_input
-    
     # Type conversion
     numeric_fields = ['price', 'mrp', 'inventory']
     for key in numeric_fields:
@@ -55,61 +55,80 @@ def clean_csv_keys(row: dict) -> dict:
                 except:
                     cleaned[key] = None
 
-    # Filter only allowed columns (approximate list based on DB schema assumptions)
-    # If the table is dynamic or has specific cols, extra keys might cause error
     # Let's clean up empty strings to None
     for k, v in cleaned.items():
         if v == "":
             cleaned[k] = None
-            
-    return cleaned
 
-def main():
-    parser = argparse.ArgumentParser(description="Upload Zepto CSV Data to Supabase")
-    parser.add_argument("file", type=str, help="Path to the CSV file to upload")
-    parser.add_argument("--table", type=str, default="zepto_assortment", help="Target Supabase table name")
-    args = parser.parse_args()
+    # Allowed columns (zepto_assortment in schema.sql); PostgREST rejects the whole batch on an unknown key
+    allowed_cols = {
+        "scraped_at", "name", "brand", "mrp", "price", "pack_size",
+        "category", "subcategory", "availability", "inventory",
+        "store_id", "base_product_id", "shelf_life_in_hours", "eta",
+        "pincode_input", "clicked_label"
+    }
+
+    return {k: v for k, v in cleaned.items() if k in allowed_cols}
 
-    if not os.path.exists(args.file):
-        logger.error(f"File {args.file} does not exist.")
+async def upload(file_path: str, table_name: str):
+    if not os.path.exists(file_path):
+        logger.error(f"File {file_path} does not exist.")
         return
 
+    # DATABASE_URL (postgres://...) loads with COPY instead of the REST API
     db = Database()
-    if not db.client:
+    client = None if db.pg else PostgrestClient.from_env()
+    if not (db.pg or client):
         logger.error("Database connection failed. Check .env file.")
         return
 
     records = []
-    logger.info(f"Reading {args.file}...")
+    logger.info(f"Reading {file_path}...")
     
     try:
-        with open(args.file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                records.append(clean_csv_keys(row))
+        for row in read_rows(file_path):
+            records.append(clean_csv_keys(row))
                 
         if not records:
             logger.warning("No records found in CSV.")
             return
 
-        # Upload in batches of 100
-        batch_size = 100
-        total_batches = (len(records) + batch_size - 1) // batch_size
-        
-        logger.info(f"Found {len(records)} records. Uploading in {total_batches} batches...")
-        
-        for i in range(total_batches):
-            batch = records[i*batch_size : (i+1)*batch_size]
-            success = db.save_products(batch, table_name=args.table)
-            if success:
-                logger.info(f"Batch {i+1}/{total_batches} uploaded.")
-            else:
-                logger.error(f"Batch {i+1}/{total_batches} failed.")
+        if db.pg:
+            logger.info(f"Found {len(records)} records. Loading with COPY...")
+            db.save_products(records, table_name=table_name)
+            return
+
+        logger.info(f"Found {len(records)} records. Uploading in concurrent batches...")
+        stats = await BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE).upload(records, table_name)
+        if stats["dead_lettered"]:
+            logger.warning(f"{stats['dead_lettered']} rows saved to {DEAD_LETTER_FILE}. "
+                           f"Re-send them with: python upload_zepto_data.py --replay")
                 
         logger.info("Upload process completed.")
         
     except Exception as e:
         logger.error(f"Error processing file: {e}")
 
+async def replay():
+    client = PostgrestClient.from_env()
+    if not client:
+        logger.error("Database connection failed. Check .env file.")
+        return
+    await BulkUploader(client, dead_letter_file=DEAD_LETTER_FILE).replay()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload Zepto CSV Data to Supabase")
+    parser.add_argument("file", type=str, nargs="?", help="Path to the CSV file (or .parquet dataset) to upload")
+    parser.add_argument("--table", type=str, default="zepto_assortment", help="Target Supabase table name")
+    parser.add_argument("--replay", action="store_true", help=f"Re-send the rows in {DEAD_LETTER_FILE}")
+    args = parser.parse_args()
+
+    if args.replay:
+        asyncio.run(replay())
+    elif args.file:
+        asyncio.run(upload(args.file, args.table))
+    else:
+        parser.error("a file to upload or --replay is required")
+
 if __name__ == "__main__":
     main()
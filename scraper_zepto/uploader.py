@@ -0,0 +1,314 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("BulkUploader")
+
+# Statuses worth retrying (rate limits, gateway hiccups, overloaded database)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """A failed insert; `status` is the HTTP status (None for network errors)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+    @property
+    def too_large(self) -> bool:
+        return self.status == 413
+
+
+class PostgrestClient:
+    """
+    Minimal PostgREST insert client (stdlib only, run in a thread per request).
+
+    Works against Supabase (`<SUPABASE_URL>/rest/v1`) or any plain PostgREST, e.g. a
+    local one in front of a scratch Postgres for tests (POSTGREST_URL).
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str] = None, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Content-Type": "application/json", "Prefer": "return=minimal", **(headers or {})}
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> Optional["PostgrestClient"]:
+        """POSTGREST_URL (+ optional POSTGREST_TOKEN) wins over SUPABASE_URL/SUPABASE_KEY."""
+        postgrest_url = os.environ.get("POSTGREST_URL")
+        if postgrest_url:
+            token = os.environ.get("POSTGREST_TOKEN")
+            return cls(postgrest_url, {"Authorization": f"Bearer {token}"} if token else {})
+        url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+        if url and key:
+            return cls(f"{url.rstrip('/')}/rest/v1", {"apikey": key, "Authorization": f"Bearer {key}"})
+        return None
+
+    def _post(self, table: str, body: bytes, on_conflict: str = None):
+        url, headers = f"{self.base_url}/{table}", self.headers
+        if on_conflict:
+            # Upsert: rows that hit the unique key update the existing row instead of failing
+            url += f"?on_conflict={on_conflict}"
+            headers = {**headers, "Prefer": "return=minimal,resolution=merge-duplicates"}
+        request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode("utf-8", "replace")[:300]
+            raise UploadError(f"HTTP {e.code}: {detail}", e.code) from None
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise UploadError(f"Network error: {e}") from None
+
+    async def insert(self, table: str, body: bytes, on_conflict: str = None):
+        await asyncio.to_thread(self._post, table, body, on_conflict)
+
+
+class BulkUploader:
+    """
+    Uploads rows in concurrent batches with retries and a dead-letter file.
+
+    - At most `concurrency` inserts are in flight.
+    - The batch size adapts: it grows by `grow` while inserts finish under
+      `target_latency`, halves when they are slower than twice that or the server
+      rejects the payload as too large (413), and never exceeds `max_payload_bytes`.
+    - Retryable failures (network, 408/429/5xx) back off exponentially with full
+      jitter, up to `max_retries` times.
+    - A batch the server rejects as bad (other 4xx) is split in half, up to
+      `max_split_depth` times, so one bad row doesn't sink its neighbours.
+    - Whatever still fails is appended to `dead_letter_file` (JSONL, one batch per
+      line) and can be re-sent later with `replay()`.
+
+    With `on_conflict` (comma-separated unique columns) batches are upserted
+    instead of inserted.
+    """
+
+    def __init__(self, client: PostgrestClient, concurrency: int = 4, batch_size: int = 500,
+                 min_batch_size: int = 50, max_batch_size: int = 5000, max_payload_bytes: int = 2_000_000,
+                 target_latency: float = 1.0, grow: float = 1.25, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0, max_split_depth: int = 6,
+                 dead_letter_file: str = "upload_dead_letter.jsonl", on_conflict: str = None):
+        self.client = client
+        self.on_conflict = on_conflict
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_payload_bytes = max_payload_bytes
+        self.target_latency = target_latency
+        self.grow = grow
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_split_depth = max_split_depth
+        self.dead_letter_file = dead_letter_file
+        self.stats = {"rows": 0, "uploaded": 0, "batches": 0, "retries": 0, "splits": 0, "dead_lettered": 0}
+
+    # --- Batching ---
+
+    def _next_batch(self, rows: List[dict], start: int) -> List[bytes]:
+        """Serialized rows from `start`, cut at the current batch size or the payload limit."""
+        encoded, size = [], 2
+        for row in rows[start:start + self.batch_size]:
+            line = json.dumps(row, default=str, separators=(",", ":")).encode("utf-8")
+            if encoded and size + len(line) + 1 > self.max_payload_bytes:
+                break
+            encoded.append(line)
+            size += len(line) + 1
+        return encoded
+
+    def _adapt(self, latency: float, rows: int):
+        if latency > self.target_latency * 2:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif latency < self.target_latency and rows >= self.batch_size:
+            self.batch_size = min(self.max_batch_size, int(self.batch_size * self.grow) + 1)
+
+    # --- Sending ---
+
+    async def _send(self, table: str, encoded: List[bytes], depth: int = 0) -> List[Tuple[List[bytes], str]]:
+        """Inserts one batch; returns the (rows, error) chunks that could not be inserted."""
+        body = b"[" + b",".join(encoded) + b"]"
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                await self.client.insert(table, body, self.on_conflict)
+                self._adapt(time.monotonic() - started, len(encoded))
+                self.stats["uploaded"] += len(encoded)
+                return []
+            except UploadError as e:
+                # Bisect rejected batches (only a few levels: an error every row shares isn't worth a request per row)
+                if e.too_large or (not e.retryable and len(encoded) > 1 and depth < self.max_split_depth):
+                    if e.too_large:
+                        self.batch_size = max(self.min_batch_size, min(self.batch_size, len(encoded)) // 2)
+                    if len(encoded) == 1:
+                        logger.error(f"❌ Single row too large for {table}: {e}")
+                        return [(encoded, str(e))]
+                    self.stats["splits"] += 1
+                    half = len(encoded) // 2
+                    return (await self._send(table, encoded[:half], depth + 1)
+                            + await self._send(table, encoded[half:], depth + 1))
+                if not e.retryable or attempt == self.max_retries:
+                    logger.error(f"❌ Batch of {len(encoded)} rows to {table} failed: {e}")
+                    return [(encoded, str(e))]
+                self.stats["retries"] += 1
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                logger.warning(f"⚠️ {e} - retrying {len(encoded)} rows in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+        return [(encoded, "retries exhausted")]
+
+    def _dead_letter(self, table: str, encoded: List[bytes], error: str):
+        with open(self.dead_letter_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "table": table,
+                "failed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "error": error,
+                "rows": [json.loads(line) for line in encoded],
+            }) + "\n")
+        self.stats["dead_lettered"] += len(encoded)
+
+    async def upload(self, rows: List[Dict[str, Any]], table: str) -> dict:
+        """Uploads all rows to `table`; returns the stats (failed rows are dead-lettered)."""
+        self.stats["rows"] += len(rows)
+        started = time.monotonic()
+        gate = asyncio.Semaphore(self.concurrency)
+        tasks = []
+
+        async def run(encoded: List[bytes]):
+            try:
+                for failed, error in await self._send(table, encoded):
+                    self._dead_letter(table, failed, error)
+            finally:
+                gate.release()
+
+        position = 0
+        while position < len(rows):
+            await gate.acquire()
+            # Cut the batch only when a slot is free, so it uses the latest adapted size
+            encoded = self._next_batch(rows, position)
+            position += len(encoded)
+            self.stats["batches"] += 1
+            tasks.append(asyncio.create_task(run(encoded)))
+        await asyncio.gather(*tasks)
+
+        elapsed = time.monotonic() - started
+        logger.info(f"📤 {self.stats['uploaded']}/{self.stats['rows']} rows to {table} in {elapsed:.1f}s "
+                    f"({self.stats['batches']} batches, final size {self.batch_size}, {self.stats['retries']} retries, "
+                    f"{self.stats['dead_lettered']} dead-lettered)")
+        return self.summary()
+
+    async def replay(self, dead_letter_file: str = None) -> dict:
+        """Re-sends every dead-lettered batch; batches that fail again stay in the file."""
+        path = dead_letter_file or self.dead_letter_file
+        if not os.path.exists(path):
+            logger.info(f"No dead-letter file at {path}.")
+            return self.summary()
+
+        by_table: Dict[str, List[dict]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    by_table.setdefault(entry["table"], []).extend(entry["rows"])
+
+        # Failures are re-appended to a fresh file, which then replaces the old one
+        tmp = f"{path}.replay"
+        self.dead_letter_file = tmp
+        try:
+            for table, rows in by_table.items():
+                logger.info(f"♻️ Replaying {len(rows)} dead-lettered rows to {table}")
+                await self.upload(rows, table)
+        finally:
+            self.dead_letter_file = path
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+        else:
+            os.remove(path)
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {**self.stats, "batch_size": self.batch_size}
+
+
+class DatabaseSink:
+    """
+    Streams rows into a table while the scrape is still running.
+
+    The runner's writer task `put()`s every batch it writes; a background task
+    re-cuts them into uploader-sized chunks and uploads up to `uploader.concurrency`
+    chunks at once. At most `max_pending` batches wait in memory, so a slow database
+    pushes back on the writer instead of growing without bound. A partial chunk is
+    sent after `flush_seconds` without new rows, and `close()` flushes the rest.
+    Failed rows end up in the uploader's dead-letter file like any other upload.
+    """
+
+    def __init__(self, uploader: BulkUploader, table: str, transform: Callable[[dict], dict] = None,
+                 max_pending: int = 50, flush_seconds: float = 10.0):
+        self.uploader = uploader
+        self.table = table
+        self.transform = transform
+        self.flush_seconds = flush_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.gate = asyncio.Semaphore(uploader.concurrency)
+        self.tasks: List[asyncio.Task] = []
+        self.consumer = asyncio.create_task(self._run())
+
+    async def put(self, rows: List[dict]):
+        if rows:
+            await self.queue.put([self.transform(r) for r in rows] if self.transform else list(rows))
+
+    async def _dispatch(self, chunk: List[dict]):
+        await self.gate.acquire()
+
+        async def run():
+            try:
+                await self.uploader.upload(chunk, self.table)
+            except Exception as e:
+                logger.error(f"❌ Streaming upload to {self.table} failed: {e}")
+            finally:
+                self.gate.release()
+
+        self.tasks = [t for t in self.tasks if not t.done()]
+        self.tasks.append(asyncio.create_task(run()))
+
+    async def _run(self):
+        pending: List[dict] = []
+        while True:
+            try:
+                rows = await asyncio.wait_for(self.queue.get(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                # Quiet period: send what we have so it reaches the dashboard
+                if pending:
+                    await self._dispatch(pending)
+                    pending = []
+                continue
+            if rows is None:
+                break
+            pending.extend(rows)
+            while len(pending) >= self.uploader.batch_size:
+                size = self.uploader.batch_size
+                await self._dispatch(pending[:size])
+                pending = pending[size:]
+        if pending:
+            await self._dispatch(pending)
+        await asyncio.gather(*self.tasks)
+
+    async def close(self) -> dict:
+        """Flushes everything still buffered and waits for in-flight uploads."""
+        await self.queue.put(None)
+        await self.consumer
+        return self.uploader.summary()
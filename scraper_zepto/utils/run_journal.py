@@ -0,0 +1,150 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .store_dedup import StoreGroup
+
+logger = logging.getLogger("RunJournal")
+
+class RunJournal:
+    """
+    Append-only journal of completed work units for one runner invocation.
+
+    Lives next to the output CSV (`<output>.journal`, SQLite in WAL mode) and records
+    every finished (pincode, category) unit together with the output file offset
+    right after its rows were written. A crashed run is resumed by truncating the
+    output back to the last committed offset and re-queueing only unfinished units.
+
+    Writes are buffered and committed every `flush_every` units or `flush_seconds`,
+    so the writer task pays for one transaction per batch of units, not per row.
+    The caller must fsync the output before `flush()` so a committed offset never
+    points past data that is not on disk.
+    """
+
+    def __init__(self, path: str, flush_every: int = 200, flush_seconds: float = 5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._pending_units: List[Tuple[str, str, int, float]] = []
+        self._pending_plan: List[Tuple[str, str]] = []
+        self._pending_offset: Optional[int] = None
+        self._last_flush = time.monotonic()
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS plan (pincode TEXT, category TEXT, PRIMARY KEY (pincode, category));
+            CREATE TABLE IF NOT EXISTS units (
+                pincode TEXT, category TEXT, output_offset INTEGER, completed_at REAL,
+                PRIMARY KEY (pincode, category)
+            );
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def path_for(output_file: str) -> str:
+        return f"{output_file}.journal"
+
+    # --- Metadata ---
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        self.conn.commit()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    # --- Recording (buffered) ---
+
+    def plan(self, pincode: str, categories: Iterable[str]):
+        """Records the categories a pincode has to cover (so partial pincodes can be resumed)."""
+        self._pending_plan.extend((pincode, c) for c in categories)
+
+    def record(self, units: Iterable[Tuple[str, str]], offset: int):
+        """Marks units done; `offset` is the output size after their rows were written."""
+        now = time.time()
+        self._pending_units.extend((p, c, offset, now) for p, c in units)
+        self._pending_offset = offset
+
+    def due(self) -> bool:
+        return bool(self._pending_units or self._pending_plan) and (
+            len(self._pending_units) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_seconds
+        )
+
+    def flush(self):
+        """Commits buffered plan/units in one transaction."""
+        if not (self._pending_units or self._pending_plan):
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO plan (pincode, category) VALUES (?, ?)", self._pending_plan)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO units (pincode, category, output_offset, completed_at) VALUES (?, ?, ?, ?)",
+                self._pending_units
+            )
+            if self._pending_offset is not None:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('committed_offset', ?)",
+                                  (str(self._pending_offset),))
+        self._pending_units = []
+        self._pending_plan = []
+        self._last_flush = time.monotonic()
+
+    # --- Resume ---
+
+    def committed_offset(self) -> int:
+        return int(self.get_meta("committed_offset", "0"))
+
+    def done_categories(self) -> Dict[str, Set[str]]:
+        done: Dict[str, Set[str]] = {}
+        for pincode, category in self.conn.execute("SELECT pincode, category FROM units"):
+            done.setdefault(pincode, set()).add(category)
+        return done
+
+    def planned_categories(self) -> Dict[str, Set[str]]:
+        planned: Dict[str, Set[str]] = {}
+        for pincode, category in self.conn.execute("SELECT pincode, category FROM plan"):
+            planned.setdefault(pincode, set()).add(category)
+        return planned
+
+    def completed_pincodes(self) -> Set[str]:
+        """Pincodes whose every planned category has been committed."""
+        done = self.done_categories()
+        return {p for p, cats in self.planned_categories().items() if cats and cats <= done.get(p, set())}
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+
+def truncate_output(output_file: str, offset: int):
+    """Drops rows written after the last committed journal offset (they get re-scraped)."""
+    if not os.path.exists(output_file):
+        return
+    size = os.path.getsize(output_file)
+    if size > offset:
+        with open(output_file, "r+b") as f:
+            f.truncate(offset)
+        logger.info(f"✂️ Truncated {output_file} from {size} to {offset} bytes (uncommitted rows)")
+
+
+def split_by_progress(groups: List[StoreGroup], done: Dict[str, Set[str]]) -> List[StoreGroup]:
+    """
+    Splits StoreGroups so every pincode in a group has the same finished categories.
+
+    A resumed group can then skip its finished categories and still fan the rows
+    out to all of its pincodes without duplicating any of them.
+    """
+    result = []
+    for group in groups:
+        by_progress: Dict[frozenset, List[str]] = {}
+        for pincode in group.pincodes:
+            by_progress.setdefault(frozenset(done.get(pincode, ())), []).append(pincode)
+        result.extend(StoreGroup(group.store_id, pins) for pins in by_progress.values())
+    return result
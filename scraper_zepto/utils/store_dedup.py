@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("StoreDedup")
+
+class StoreMap:
+    """
+    Disk cache of pincode -> serving store id for one platform.
+
+    Dark-store assignments change rarely, so later runs can group pincodes by
+    store without locating them again. Entries older than `ttl_hours` are ignored.
+    """
+
+    def __init__(self, platform: str, cache_dir: str = ".session_cache", ttl_hours: float = 24):
+        self.platform = platform
+        self.path = os.path.join(cache_dir, f"store_map_{platform}.json")
+        self.ttl_seconds = ttl_hours * 3600
+        self.entries: Dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring corrupt store map {self.path}: {e}")
+
+    def get(self, pincode: str) -> Optional[str]:
+        entry = self.entries.get(pincode)
+        if not entry or time.time() - entry.get("saved_at", 0) > self.ttl_seconds:
+            return None
+        return entry.get("store_id")
+
+    def set(self, pincode: str, store_id: str):
+        self.entries[pincode] = {"store_id": store_id, "saved_at": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save store map {self.path}: {e}")
+
+
+class StoreGroup:
+    """Pincodes served by one store. The first pincode is the one the crawl is located at."""
+
+    def __init__(self, store_id: Optional[str], pincodes: List[str]):
+        self.store_id = store_id
+        self.pincodes = pincodes
+
+    @property
+    def pincode(self) -> str:
+        return self.pincodes[0]
+
+    def __repr__(self):
+        return f"StoreGroup({self.store_id}, {self.pincodes})"
+
+
+async def resolve_stores(pincodes: List[str], make_scraper: Callable, store_map: StoreMap, concurrency: int = 4) -> Dict[str, Optional[str]]:
+    """
+    Maps every pincode to its serving store id.
+
+    Cached mappings are used as-is; the rest are located with `make_scraper()`
+    scrapers (set_location only, which itself reuses cached sessions). Pincodes
+    whose store cannot be read map to None and are crawled on their own.
+    """
+    stores: Dict[str, Optional[str]] = {}
+    pending = asyncio.Queue()
+    for p in pincodes:
+        cached = store_map.get(p)
+        if cached:
+            stores[p] = cached
+        else:
+            pending.put_nowait(p)
+
+    logger.info(f"🗺️ Store map: {len(stores)} pincodes cached, {pending.qsize()} to resolve")
+
+    async def resolver(name: str):
+        scraper = make_scraper()
+        try:
+            await scraper.start()
+            while True:
+                try:
+                    pincode = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    await scraper.set_location(pincode)
+                    store_id = scraper.store_id if scraper.store_id not in (None, "", "N/A", "Unknown") else None
+                except Exception as e:
+                    logger.warning(f"[{name}] Could not resolve store for {pincode}: {e}")
+                    store_id = None
+                stores[pincode] = store_id
+                if store_id:
+                    store_map.set(pincode, store_id)
+                logger.info(f"[{name}] {pincode} -> store {store_id}")
+        except Exception as e:
+            logger.error(f"[{name}] Store resolver crashed: {e}")
+        finally:
+            await scraper.stop()
+
+    if not pending.empty():
+        workers = min(concurrency, pending.qsize())
+        await asyncio.gather(*(resolver(f"R-{i+1}") for i in range(workers)))
+        store_map.save()
+
+    # Anything a crashed resolver never got to is crawled on its own
+    for p in pincodes:
+        stores.setdefault(p, None)
+    return stores
+
+
+def group_by_store(stores: Dict[str, Optional[str]]) -> List[StoreGroup]:
+    """One group per distinct store; unresolved pincodes each get their own group."""
+    by_store: Dict[str, List[str]] = {}
+    groups = []
+    for pincode in sorted(stores):
+        store_id = stores[pincode]
+        if store_id is None:
+            groups.append(StoreGroup(None, [pincode]))
+        else:
+            by_store.setdefault(store_id, []).append(pincode)
+    groups.extend(StoreGroup(store_id, pins) for store_id, pins in by_store.items())
+
+    saved = len(stores) - len(groups)
+    if stores:
+        logger.info(f"🏬 {len(stores)} pincodes -> {len(groups)} store crawls ({saved / len(stores):.0%} of crawls skipped)")
+    return groups
+
+
+def fan_out(rows: List[dict], group: StoreGroup, pincode_field: str = "pincode_input") -> Dict[str, List[dict]]:
+    """Copies one store's rows to every pincode it serves, tagging each with `served_by_store`."""
+    served_by = group.store_id or "N/A"
+    out = {}
+    for pincode in group.pincodes:
+        out[pincode] = [{**row, pincode_field: pincode, "served_by_store": served_by} for row in rows]
+    return out